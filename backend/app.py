@@ -1,108 +1,44 @@
 # Import necessary libraries
-from flask import Flask, request, jsonify  # For creating the Flask API server and handling HTTP requests
-from pymongo import MongoClient, TEXT  # To interact with MongoDB database
-from bson import ObjectId  # To handle MongoDB Object IDs
-from sentence_transformers import SentenceTransformer  # For generating embeddings from text
-import numpy as np  # For numerical operations (though not directly used in this snippet)
-from generator import converse_with_llm  # Custom module to interact with an LLM for movie recommendations
-from apiKey import MONGO_CONNECTION_STRING  # Import MongoDB connection string from a separate file
+from flask import Blueprint, Flask, Response, g, request, jsonify  # For creating the Flask API server and handling HTTP requests
+from generator import converse_with_llm, llm_budget, stream_llm  # Custom module to interact with an LLM for movie recommendations
+import generator  # For the LLM circuit breaker state
 from flask_cors import CORS  # To enable Cross-Origin Resource Sharing (CORS) for the API
-import spacy  # For natural language processing (NLP) tasks like tokenization and keyword extraction
+from keyword_extraction import extract_keywords  # Keyword extraction from spaCy docs
+from functools import lru_cache  # For memoizing keyword extraction
+from concurrent.futures import ThreadPoolExecutor  # For parallel searches and LLM calls in batches
 import logging  # For logging information during execution
+import json  # For encoding streamed events
+import os  # For detecting the reloader child process
+import time  # For request latency metrics
+import config  # Runtime settings (vector search backend, limits, ...)
+import resources  # Lazily built MongoDB client, models and caches
+from synonyms import GENRE_SYNONYMS, ORIGIN_SYNONYMS, THEME_SYNONYMS  # Synonym tables for query understanding
+from query_matcher import SynonymMatcher  # Compiled single-pass synonym matcher
+from movie_fields import GENRE_LABEL_TMDB_IDS, ORIGIN_LANGUAGE_CODES, atlas_filter, genre_ids_for  # Pre-filter fields
+from lexical_index import reciprocal_rank_fusion  # Merges vector and BM25 rankings
+from vector_index import PROJECTED_FIELDS  # Fields returned for every movie
+from timing import span  # Per-stage timing spans, exported as /metrics histograms
+from metrics import LLM_FALLBACKS, REGISTRY, REQUEST_SECONDS, REQUESTS  # Prometheus registry, HTTP and fallback metrics
+from profiling import SampledProfiler  # Runtime-switchable sampled cProfile hooks
+from singleflight import SingleFlight  # Coalesces identical in-flight queries
+from result_cache import canonical_query  # Normalized query used as the coalescing key
 
 # Set up logging configuration to display logs at the INFO level
 logging.basicConfig(level=logging.INFO)
 
-# Connect to MongoDB using the provided connection string
-client = MongoClient(MONGO_CONNECTION_STRING)
-db = client["movie_app"]  # Access the "movie_app" database
-movies_collection = db["movies"]  # Access the "movies" collection within the database
-history_collection = db["search_history"]  # Access the "search_history" collection for storing query history
-
-# Load a pre-trained spaCy model for NLP tasks
-nlp = spacy.load("en_core_web_sm")
-
-# Load a pre-trained sentence transformer model for generating embeddings
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Initialize the Flask application
-app = Flask(__name__)
-
-# Enable CORS for all routes under /api/*
-CORS(app, resources={r"/api/*": {"origins": "*"}})
-
-# Define genre synonyms to map user input to specific genres
-GENRE_SYNONYMS = {
-    "romance": ["romance", "romantic", "love", "rom-com", "relationship", "heartwarming"],
-    "action": ["action", "adventure", "fight", "combat", "explosions", "chase", "martial arts"],
-    "comedy": ["comedy", "funny", "humor", "satire", "laugh", "parody", "slapstick"],
-    "horror": ["horror", "scary", "thriller", "fear", "ghost", "haunted", "supernatural"],
-    "sci-fi": ["sci-fi", "science fiction", "space", "alien", "future", "technology", "time travel", "robot"],
-    "fantasy": ["fantasy", "magic", "mythical", "dragons", "sorcery", "medieval", "epic quest"],
-    "drama": ["drama", "emotional", "realistic", "life story", "tragedy", "family drama", "serious tone", "slice of life"],
-    "mystery": ["mystery", "detective", "investigation", "whodunit", "suspense", "unsolved", "clues"],
-    "crime": ["crime", "mafia", "heist", "gangster", "law", "courtroom", "underworld", "criminal"],
-    "animation": ["animation", "animated", "cartoon", "pixar", "disney", "anime", "family-friendly"],
-    "documentary": ["documentary", "true story", "non-fiction", "biography", "docuseries", "real events"],
-    "biography": ["biography", "based on true story", "real life", "famous person", "historical figure"],
-    "war": ["war", "military", "battle", "soldier", "army", "conflict", "historical war"],
-    "history": ["history", "historical", "period drama", "ancient", "past events", "timepiece"],
-    "family": ["family", "kids", "wholesome", "all ages", "lighthearted", "feel-good"],
-    "musical": ["musical", "singing", "dancing", "music", "performance", "broadway", "songs"],
-    "sports": ["sports", "athlete", "competition", "football", "basketball", "boxing", "team", "coach"],
-    "western": ["western", "cowboy", "wild west", "gunslinger", "sheriff", "desert"],
-    "spy": ["spy", "espionage", "secret agent", "CIA", "MI6", "undercover", "covert"],
-    "post-apocalyptic": ["post-apocalyptic", "wasteland", "end of the world", "dystopian", "collapse", "survival"],
-    "psychological": ["psychological", "mind-bending", "twist", "mental", "inner conflict", "inception-like"],
-    "superhero": ["superhero", "marvel", "dc", "powers", "hero", "villain", "mutant", "saving the world"],
-    "zombie": ["zombie", "undead", "infected", "outbreak", "virus", "walking dead", "apocalypse"],
-    "samurai": ["samurai", "ronin", "katana", "feudal japan", "bushido", "shogun", "edo era"],
-}
-
-ORIGIN_SYNONYMS = {
-    "korean": ["korean", "south korea", "k-drama", "k-movie", "film korea"],
-    "japanese": ["japanese", "japan", "j-drama", "japanese film", "film jepang"],
-    "indonesian": ["indonesian", "indonesia", "indo", "local film", "film indonesia"],
-    "french": ["french", "france", "film prancis"],
-    "indian": ["indian", "bollywood", "india", "hindi film", "tamil", "telugu", "film india"],
-    "thai": ["thai", "thailand", "film thailand", "thai drama", "thai movie"],
-    "chinese": ["chinese", "china", "film china", "chinese movie", "c-drama"],
-    "british": ["british", "uk", "united kingdom", "film inggris", "british film"],
-    "american": ["american", "usa", "united states", "hollywood", "film amerika"],
-    "spanish": ["spanish", "spain", "film spanyol", "spanish movie"],
-    "german": ["german", "germany", "film jerman"],
-    "turkish": ["turkish", "turkey", "film turki", "turkish drama"],
-    "iranian": ["iranian", "iran", "film iran"],
-    "russian": ["russian", "russia", "film rusia"],
-    "philippine": ["philippine", "filipino", "philippines", "film filipina"]
-}
-
-THEME_SYNONYMS = {
-    "mind-bending": [
-        "mind-bending", "thought-provoking", "complex", "inception", "makes you think", 
-        "twisted plot", "puzzle", "psychological twist", "confusing at first"
-    ],
-    "emotional": [
-        "emotional", "heartbreaking", "tearjerker", "sad", "touching", "soul-crushing", 
-        "makes you cry", "melancholy", "heartfelt", "tragic"
-    ],
-    "inspirational": [
-        "inspiring", "motivational", "life-changing", "uplifting", "powerful message", 
-        "based on true events", "overcoming odds", "heroic journey", "resilience"
-    ],
-    "moral": [
-        "moral lesson", "philosophical", "deep message", "values", "ethical dilemma", 
-        "teaches something", "social commentary", "life meaning", "reflective"
-    ],
-    "psychological": [
-        "psychological", "mental", "manipulative", "dark thoughts", "dual personality", 
-        "internal conflict", "identity crisis", "emotional breakdown", "mind games"
-    ],
-    "twist": [
-        "plot twist", "unexpected ending", "shocking", "surprising turn", "unpredictable", 
-        "revealing twist", "big reveal", "twisted", "double meaning"
-    ]
-}
+# The MongoDB client, spaCy, the sentence transformer and the caches are created lazily
+# by the resources module (or by the background warm-up started in create_app), so
+# importing this module is fast. Routes live on a blueprint registered by the factory.
+api = Blueprint("api", __name__)
+
+# Profiles a sample of requests when PROFILING_SAMPLE_RATE (or /debug/profiling) enables it
+profiler = SampledProfiler(config.PROFILING_SAMPLE_RATE)
+
+# Concurrent requests for the same normalized query share one retrieval + LLM computation
+query_flights = SingleFlight()
+
+# Compile every synonym table once into a single phrase matcher
+query_matcher = SynonymMatcher({"genre": GENRE_SYNONYMS, "theme": THEME_SYNONYMS, "origin": ORIGIN_SYNONYMS})
 
 def match_origin(keywords):
     """
@@ -112,11 +48,7 @@ def match_origin(keywords):
     Returns:
         str or None: Matched origin or None if no match is found.
     """
-    for keyword in keywords:
-        for origin, synonyms in ORIGIN_SYNONYMS.items():
-            if keyword.lower() in synonyms:
-                return origin
-    return None
+    return query_matcher.first_label(keywords, "origin")
 
 def match_theme(keywords):
     """
@@ -126,11 +58,7 @@ def match_theme(keywords):
     Returns:
         str or None: Matched theme or None if no match is found.
     """
-    for keyword in keywords:
-        for theme, synonyms in THEME_SYNONYMS.items():
-            if keyword.lower() in synonyms:
-                return theme
-    return None
+    return query_matcher.first_label(keywords, "theme")
 
 # Function to parse advanced filters from the user query
 def parse_advanced_filters(query):
@@ -146,58 +74,159 @@ def parse_advanced_filters(query):
         filters["vote_average"] = {"$gte": 8.5}  # Filter for high-rated movies
     if "popular" in query.lower():
         filters["vote_count"] = {"$gte": 500}  # Filter for popular movies
+    # Years are compared as integers on the precomputed release_year field
     if "recent" in query.lower():
-        filters["release_date"] = {"$gte": "2020-01-01"}  # Filter for recent movies
+        filters["release_year"] = {"$gte": 2020}  # Filter for recent movies
     if "old" in query.lower():
-        filters["release_date"] = {"$lte": "2000-01-01"}  # Filter for older movies
+        filters["release_year"] = {"$lt": 2000}  # Filter for older movies
     
     return filters
 
+# Function to build the pre-filters of a vector search
+def build_search_filters(query, genre=None, origin=None):
+    """
+    Combine the advanced filters with the matched genre and origin labels.
+    Args:
+        query (str): Query used for parse_advanced_filters.
+        genre (str): Matched genre label, if any.
+        origin (str): Matched origin label, if any.
+    Returns:
+        dict: Filters over movie_fields.FILTER_FIELDS, applied before vector scoring.
+    """
+    filters = parse_advanced_filters(query)
+    # Labels without a TMDb equivalent ("spy", "british", ...) only enrich the query text
+    if genre and config.FILTER_BY_MATCHED_GENRE and genre in GENRE_LABEL_TMDB_IDS:
+        filters["genre_ids"] = {"$in": [GENRE_LABEL_TMDB_IDS[genre]]}
+    if origin and config.FILTER_BY_MATCHED_ORIGIN and origin in ORIGIN_LANGUAGE_CODES:
+        filters["origin_code"] = {"$in": ORIGIN_LANGUAGE_CODES[origin]}
+    return filters
+
 # Function to clean MongoDB documents by converting ObjectIDs to strings
 def clean_document(doc):
     doc["_id"] = str(doc["_id"])  # Convert MongoDB's ObjectId to a string for JSON serialization
     return doc
 
+# Function to run an Atlas $vectorSearch with pre-filters
+def atlas_vector_search(query_embedding, filters, n, limit):
+    """
+    Search the Atlas vector index, widening the candidate pool until n movies pass the filters.
+    numCandidates grows 4x per attempt up to VECTOR_MAX_CANDIDATES; if that is still not enough,
+    a final exact (ENN) search scores every movie that passes the filters.
+    Args:
+        query_embedding (np.ndarray): Query embedding.
+        filters (dict): Pre-filters over indexed filter fields.
+        n (int): Number of results that must pass the filters, if that many exist.
+        limit (int): Maximum number of results.
+    Returns:
+        list: Movie documents with the projected fields and `score`.
+    """
+    search = {
+        "index": "movie_index",  # Name of the vector index in MongoDB
+        "queryVector": query_embedding.tolist(),  # Query vector for similarity search
+        "path": "movie_embedding",  # Path to the movie embeddings in the collection
+        "limit": limit,  # Limit the number of results returned
+    }
+    if filters:
+        search["filter"] = atlas_filter(filters)  # Evaluated inside the search, not after it
+    project = {
+        "$project": {
+            "tmdb_id": 1,  # Key of /api/movies/<tmdb_id>/similar
+            "title": 1,
+            "overview": 1,
+            "poster_path": 1,
+            "vote_average": 1,
+            "vote_count": 1,
+            "release_date": 1,
+            "score": {"$meta": "vectorSearchScore"},  # Include the similarity score
+        }
+    }
+    
+    num_candidates = max(config.VECTOR_NUM_CANDIDATES, limit)
+    while True:
+        search["numCandidates"] = num_candidates  # Number of candidates to consider during search
+        similar_movies = list(resources.get_movies_collection().aggregate([{"$vectorSearch": search}, project]))
+        if not filters or len(similar_movies) >= n:
+            return similar_movies
+        if num_candidates >= config.VECTOR_MAX_CANDIDATES:
+            break
+        num_candidates = min(num_candidates * 4, config.VECTOR_MAX_CANDIDATES)
+        logging.info(f"Only {len(similar_movies)} movies passed {filters}; widening to {num_candidates} candidates")
+    
+    # Highly selective filters: score every movie that passes them exactly
+    del search["numCandidates"]
+    search["exact"] = True
+    return list(resources.get_movies_collection().aggregate([{"$vectorSearch": search}, project]))
+
 # Function to retrieve similar movies based on vector similarity
-def retrieve_similar_movies(query, n=5):
+def retrieve_similar_movies(query, n=5, genre=None, origin=None):
     """
     Retrieve similar movies based on vector similarity.
+    Filters are applied inside the search, so it only comes back short of n movies
+    when fewer than n movies in the catalog pass them.
     Args:
         query (str): User input query.
-        n (int): Number of similar movies to retrieve.
+        n (int): Minimum number of similar movies to retrieve when enough pass the filters.
+        genre (str): Matched genre label, used as a pre-filter when it maps to TMDb genres.
+        origin (str): Matched origin label, used as a pre-filter when it maps to languages.
     Returns:
         list: List of similar movies with metadata.
     """
-    query_embedding = model.encode(query).tolist()  # Generate an embedding for the query
-    filters = parse_advanced_filters(query)  # Extract advanced filters from the query
+    with span("encode"):
+        query_embedding = resources.get_embedding_cache().encode(query)  # Generate (or reuse) an embedding for the query
+    filters = build_search_filters(query, genre, origin)  # Extract advanced filters from the query
+    with span("search"):
+        similar_movies = search_similar_movies(query_embedding, filters, n)
+    return fuse_lexical_results(query, similar_movies, filters, n)
+
+# Function to merge vector hits with BM25 hits (hybrid retrieval)
+def fuse_lexical_results(query, similar_movies, filters, n=5):
+    """
+    Fuse vector search results with lexical (BM25) results by reciprocal rank fusion,
+    so exact titles and rare keywords rank well even when embeddings miss them.
+    Does nothing unless HYBRID_RETRIEVAL is enabled.
+    Args:
+        query (str): Query text used for the vector search.
+        similar_movies (list): Vector search results, best first.
+        filters (dict): Pre-filters, applied to lexical results as well.
+        n (int): Minimum number of results when enough movies pass the filters.
+    Returns:
+        list: Fused results (at most max(n, VECTOR_SEARCH_LIMIT)), all with the same fields:
+            `score` (fused score scaled to (0, 1], 1 = ranked first by both searches), `rrf_score`,
+            and `vector_score` / `lexical_score` (None when one search did not return the movie).
+    """
+    if not config.HYBRID_RETRIEVAL:
+        return similar_movies
+    limit = max(n, config.VECTOR_SEARCH_LIMIT)
+    with span("lexical"):
+        lexical_movies = resources.get_lexical_index().search(query, limit=limit, filters=filters)
+        fused = reciprocal_rank_fusion([similar_movies, lexical_movies], limit=limit, k=config.HYBRID_RRF_K)
+    # Lexical-only hits have no vector `score`: give every result the same shape
+    vector_scores = {movie["_id"]: movie.get("score") for movie in similar_movies}
+    lexical_scores = {movie["_id"]: movie["lexical_score"] for movie in lexical_movies}
+    best = 2.0 / (config.HYBRID_RRF_K + 1)  # RRF score of a movie ranked first in both lists
+    for movie in fused:
+        movie["vector_score"] = vector_scores.get(movie["_id"])
+        movie["lexical_score"] = lexical_scores.get(movie["_id"])
+        movie["score"] = movie["rrf_score"] / best
+    return fused
+
+# Function to run one vector search on the configured backend
+def search_similar_movies(query_embedding, filters, n=5):
+    """
+    Args:
+        query_embedding (np.ndarray): Query embedding.
+        filters (dict): Pre-filters from build_search_filters.
+        n (int): Minimum number of similar movies to retrieve when enough pass the filters.
+    Returns:
+        list: List of similar movies with metadata.
+    """
+    limit = max(n, config.VECTOR_SEARCH_LIMIT)
     
-    # Perform vector similarity search using MongoDB's $vectorSearch operator
-    similar_movies_search = movies_collection.aggregate(
-        [
-            {
-                "$vectorSearch": {
-                    "index": "movie_index",  # Name of the vector index in MongoDB
-                    "queryVector": query_embedding,  # Query vector for similarity search
-                    "path": "movie_embedding",  # Path to the movie embeddings in the collection
-                    "k": n,  # Number of nearest neighbors to retrieve
-                    "numCandidates": 1000,  # Number of candidates to consider during search
-                    "limit": 20,  # Limit the number of results returned
-                }
-            },
-            {"$match": filters},  # Apply additional filters (e.g., vote count, release date)
-            {
-                "$project": {
-                    "title": 1,
-                    "overview": 1,
-                    "poster_path": 1,
-                    "vote_average": 1,
-                    "vote_count": 1,
-                    "release_date": 1,
-                    "score": {"$meta": "searchScore"},  # Include the similarity score
-                }
-            },
-        ]
-    )
+    # Answer from the in-process index when a local backend is configured
+    if config.VECTOR_SEARCH_BACKEND in ("exact", "ivf"):
+        return resources.get_local_index().search(query_embedding, limit=limit, filters=filters)
+    
+    similar_movies_search = atlas_vector_search(query_embedding, filters, n, limit)
     similar_movies = [clean_document(movie) for movie in similar_movies_search]  # Clean the results
     return similar_movies
 
@@ -205,21 +234,27 @@ def retrieve_similar_movies(query, n=5):
 def retrieve_similar_movies_by_genre(genre, n=150, query=""):
     """
     Retrieve similar movies based on genre matching.
+    The genre is resolved to TMDb genre ids up front, so MongoDB answers from the
+    (genre_ids, popularity) index instead of scanning genre_names with a regex.
     Args:
-        genre (str): Genre to match.
+        genre (str): Genre label (e.g. "sci-fi") or start of a TMDb genre name.
         n (int): Number of similar movies to retrieve.
         query (str): User input query for additional filtering.
     Returns:
         list: List of similar movies with metadata.
     """
+    genre_ids = genre_ids_for(genre)
+    if not genre_ids:
+        return []  # No TMDb genre matches, so no stored movie can
     filters = parse_advanced_filters(query)  # Extract advanced filters from the query
-    filters["genre_names"] = {"$regex": f"^{genre}", "$options": "i"}  # Match genre names case-insensitively
+    filters["genre_ids"] = {"$in": genre_ids}  # Indexed lookup by TMDb genre id
     
     # Find movies that match the genre and apply additional filters
     matching_movies = (
-        movies_collection.find(
+        resources.get_movies_collection().find(
             filters,
             {
+                "tmdb_id": 1,
                 "title": 1,
                 "overview": 1,
                 "poster_path": 1,
@@ -239,20 +274,28 @@ def retrieve_similar_movies_by_genre(genre, n=150, query=""):
 def process_query(query):
     """
     Process the user query to extract relevant keywords using NLP.
+    Results are memoized, so repeated queries skip the spaCy pipeline.
     Args:
         query (str): User input query.
     Returns:
         list: List of extracted keywords.
     """
-    doc = nlp(query)  # Process the query using spaCy
-    keywords = [
-        chunk.text.lower() for chunk in doc.noun_chunks  # Extract noun chunks
-    ] + [
-        token.text.lower()
-        for token in doc
-        if token.pos_ in ["NOUN", "PROPN", "ADJ"] and not token.is_stop  # Extract nouns, proper nouns, and adjectives, excluding stopwords
-    ]
-    return list(set(keywords))  # Return unique keywords
+    return list(_process_query_cached(query))  # Copy so callers cannot modify the cached value
+
+@lru_cache(maxsize=config.KEYWORD_CACHE_SIZE)
+def _process_query_cached(query):
+    return tuple(extract_keywords(resources.get_nlp()(query)))  # Process the query using spaCy
+
+# Function to extract keywords for many queries at once
+def process_queries(queries):
+    """
+    Batch version of process_query using nlp.pipe.
+    Args:
+        queries (list): User input queries.
+    Returns:
+        list: One keyword list per query, in the same order.
+    """
+    return [extract_keywords(doc) for doc in resources.get_nlp().pipe(queries, batch_size=config.SPACY_BATCH_SIZE)]
 
 # Function to match user input to a genre using genre synonyms
 def match_genre(keywords):
@@ -263,79 +306,566 @@ def match_genre(keywords):
     Returns:
         str or None: Matched genre or None if no match is found.
     """
-    for keyword in keywords:
-        for genre, synonyms in GENRE_SYNONYMS.items():
-            if keyword.lower() in synonyms:  # Check if the keyword matches any genre synonym
-                return genre
-    return None
+    return query_matcher.first_label(keywords, "genre")
 
-# Route to handle user queries and provide movie recommendations
-@app.route("/api/query", methods=["POST"])
-def handle_query():
+# Function to enrich the extracted keywords with matched genre/theme/origin labels
+def enrich_query(query, keywords):
     """
-    Handle POST requests to /api/query for movie recommendations.
-    Expects a JSON payload with a "query" field containing the user's input.
+    Match genre, theme and origin synonyms in the query and prepend their labels to the keywords.
+    Args:
+        query (str): User input query.
+        keywords (list): Keywords extracted by process_query.
     Returns:
-        JSON response with similar movies and a recommendation from the LLM.
+        tuple: (enriched query text, matched genre label or None, matched origin label or None).
     """
-    data = request.json  # Parse the incoming JSON payload
-    query = data.get("query", "")  # Extract the user's query
-    input_prompt = process_query(query)  # Process the query to extract keywords
-    
-    # Check if the query has been processed before and exists in the history collection
-    existing_entry = history_collection.find_one({"query": query})
-    if existing_entry:
-        return jsonify(existing_entry["result"])  # Return cached result if available
-    
-    genre_match = match_genre(input_prompt)  # Try to match the query to a genre
-    print("genre_match", genre_match)  # Log the matched genre (if any)
-    
-    theme_match = match_theme(input_prompt)
-    print("theme_match:", theme_match)
-
-    origin_match = match_origin(input_prompt)
-    print("origin_match:", origin_match)
-
-    # If a genre match is found, retrieve similar movies by genre
-    if genre_match or theme_match or origin_match:
-        cleaned_query = " ".join(input_prompt)
-        parts = [genre_match, theme_match, origin_match]
-        enriched_query = " ".join([p for p in parts if p]) + " " + cleaned_query
-        similar_movies = retrieve_similar_movies(enriched_query.strip())
-    else:
-        cleaned_query = " ".join(input_prompt)  # Join keywords into a single string
-        similar_movies = retrieve_similar_movies(cleaned_query)  # Retrieve similar movies using vector similarity
-    
-    # Prepare a prompt for the LLM to generate a recommendation
+    # Scan the query once for genre, theme and origin synonyms (including multi-word ones)
+    with span("match"):
+        matches = query_matcher.match(query, keywords)
+    genre_match = matches["genre"]["label"] if matches["genre"] else None
+    theme_match = matches["theme"]["label"] if matches["theme"] else None
+    origin_match = matches["origin"]["label"] if matches["origin"] else None
+    # Lazy %-formatting: this runs on every query and debug logging is normally off
+    logging.debug("Matched genre=%s theme=%s origin=%s for %r", genre_match, theme_match, origin_match, query)
+
+    cleaned_query = " ".join(keywords)  # Join keywords into a single string
+    parts = [genre_match, theme_match, origin_match]
+    enriched_query = " ".join([p for p in parts if p] + [cleaned_query])
+    return enriched_query.strip(), genre_match, origin_match
+
+# Function to compute the pre-filters a query is searched with, which a similar cached query must share
+def result_cache_filters(query):
+    """
+    Args:
+        query (str): User input query.
+    Returns:
+        dict or None: The query's search pre-filters, or None when the result cache has no
+            similarity fallback (exact lookups do not need them).
+    """
+    if not config.RESULT_CACHE_SEMANTIC:
+        return None
+    enriched_query, genre_match, origin_match = enrich_query(query, process_query(query))  # Keywords are memoized
+    return build_search_filters(enriched_query, genre_match, origin_match)
+
+# Function to run query understanding and vector retrieval for a user query
+def find_similar_movies(query):
+    """
+    Extract keywords from the query, enrich them with matched genre/theme/origin
+    and retrieve similar movies.
+    Args:
+        query (str): User input query.
+    Returns:
+        list: List of similar movies with metadata.
+    """
+    with span("parse"):
+        input_prompt = process_query(query)  # Process the query to extract keywords
+    enriched_query, genre_match, origin_match = enrich_query(query, input_prompt)
+    return retrieve_similar_movies(enriched_query, genre=genre_match, origin=origin_match)
+
+# Reply used instead of an LLM call when no movie passes the filters
+NO_RESULTS_RECOMMENDATION = "I couldn't find any movies matching that request. Try relaxing some of the filters."
+
+# Function to prepare a prompt for the LLM to generate a recommendation
+def build_recommendation_prompt(query, similar_movies):
     similar_movie_info = "\n".join([f"{movie['title']}" for movie in similar_movies])
-    prompt = f"""
+    return f"""
     Here are some similar movies I found: {similar_movie_info}
     based on user's query :{query}
     and explain why """
+
+# Function to explain the retrieved movies without the LLM (deadline missed, breaker open or error)
+def degraded_recommendation(query, similar_movies, limit=5):
+    """
+    Templated recommendation listing the best retrieved movies with their year and rating.
+    Args:
+        query (str): User input query.
+        similar_movies (list): Retrieved movies, best first.
+        limit (int): Movies named in the text.
+    Returns:
+        str: Recommendation text.
+    """
+    picks = []
+    for movie in similar_movies[:limit]:
+        details = []
+        if movie.get("release_date"):
+            details.append(str(movie["release_date"])[:4])
+        if movie.get("vote_average"):
+            details.append(f"rated {movie['vote_average']:.1f}/10")
+        picks.append(f"{movie['title']} ({', '.join(details)})" if details else movie["title"])
+    return (f"These are the closest matches to \"{query}\" in our catalog: {'; '.join(picks)}. "
+            "A personalized explanation is not available right now, please try again shortly.")
+
+# Function to answer with the degraded recommendation after an LLM failure
+def fall_back_to_degraded(query, similar_movies, error):
+    """
+    Log and count an LLM failure, then return the templated recommendation.
+    Raises the error instead when LLM_DEGRADED_FALLBACK is off.
+    """
+    if not config.LLM_DEGRADED_FALLBACK:
+        raise error
+    reason = getattr(error, "reason", "error")  # timeout / circuit_open for llm_guard errors
+    logging.warning(f"LLM unavailable ({reason}: {error}); answering {query!r} with the degraded recommendation")
+    LLM_FALLBACKS.inc(reason=reason)
+    return degraded_recommendation(query, similar_movies)
+
+# Function to read the optional per-request LLM budget from a request payload
+def requested_llm_timeout(data):
+    """
+    Args:
+        data (dict): Request JSON payload.
+    Returns:
+        float: Seconds the client can wait for the LLM ("llm_timeout"), or None for LLM_TIMEOUT_SECONDS.
+    Raises:
+        ValueError: llm_timeout is not a positive number.
+    """
+    value = data.get("llm_timeout")
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError("llm_timeout must be a positive number of seconds")
+    return float(value)
+
+# Function to generate (or reuse) the LLM recommendation for retrieved movies
+def generate_recommendation(query, similar_movies, llm_timeout=None):
+    """
+    Ask the LLM to explain the retrieved movies, reusing the answer for an identical prompt.
+    When the LLM misses its deadline, fails or is cut off by the circuit breaker, the
+    templated degraded recommendation is returned instead (and not cached).
+    Args:
+        query (str): User input query.
+        similar_movies (list): Retrieved movies.
+        llm_timeout (float): Seconds the LLM may take (default and cap: LLM_TIMEOUT_SECONDS).
+    Returns:
+        tuple: (recommendation text, True when it is the degraded recommendation).
+    """
+    # There is nothing to explain without movies
+    if not similar_movies:
+        return NO_RESULTS_RECOMMENDATION, False
+    llm_cache = resources.get_llm_cache()
+    recommendation = llm_cache.get(query, similar_movies)
+    if recommendation is None:
+        try:
+            with span("llm"):
+                recommendation = converse_with_llm(build_recommendation_prompt(query, similar_movies), llm_timeout)
+        except Exception as e:
+            return fall_back_to_degraded(query, similar_movies, e), True
+        llm_cache.put(query, similar_movies, recommendation)
+    return recommendation, False
+
+# Function to compute a full answer for a query that missed the result cache
+def answer_query(query, llm_timeout=None):
+    """
+    Retrieve similar movies, generate a recommendation and cache the result.
+    Args:
+        query (str): User input query.
+        llm_timeout (float): Seconds the LLM may take (see generate_recommendation).
+    Returns:
+        dict: {"similar_movies", "recommendation"}, plus "degraded": True for the templated fallback.
+    """
+    similar_movies = find_similar_movies(query)
     
     # Generate a recommendation using the LLM
-    recommendation = converse_with_llm(prompt)
+    recommendation, degraded = generate_recommendation(query, similar_movies, llm_timeout)
     
     # Prepare the final result containing similar movies and the recommendation
     result = {"similar_movies": similar_movies, "recommendation": recommendation}
+    if degraded:
+        # Not cached: the next request for this query tries the LLM again
+        result["degraded"] = True
+        return result
     
     # Cache the result in the history collection if there are similar movies
     if len(similar_movies) > 0:
-        history_collection.insert_one({"query": query, "result": result})
+        with span("cache_write"):
+            resources.get_result_cache().put(query, result, result_cache_filters(query))
+    return result
+
+# Route to handle user queries and provide movie recommendations
+@api.route("/api/query", methods=["POST"])
+def handle_query():
+    """
+    Handle POST requests to /api/query for movie recommendations.
+    Expects a JSON payload with a "query" field containing the user's input and an optional
+    "llm_timeout" (seconds the client can wait for the LLM, capped at LLM_TIMEOUT_SECONDS).
+    Returns:
+        JSON response with similar movies and a recommendation from the LLM
+        (a templated one with "degraded": true when the LLM could not answer in time).
+    """
+    data = request.json  # Parse the incoming JSON payload
+    query = data.get("query", "")  # Extract the user's query
+    try:
+        llm_timeout = requested_llm_timeout(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Check if the same (or a near-identical) query has been answered before
+    with span("cache_read"):
+        cached_result = resources.get_result_cache().get(query, result_cache_filters(query))
+    if cached_result:
+        return jsonify(cached_result)  # Return cached result if available
     
+    # Identical queries arriving while this one is computed wait for it instead of
+    # missing the cache and calling the LLM themselves. The effective LLM budget is part of
+    # the key: a client with a longer budget must not get a fallback forced by a shorter one.
+    if config.SINGLEFLIGHT_ENABLED:
+        flight_key = (canonical_query(query), llm_budget(llm_timeout))
+        result = query_flights.do(flight_key, lambda: answer_query(query, llm_timeout))
+    else:
+        result = answer_query(query, llm_timeout)
     return jsonify(result)  # Return the result as a JSON response
 
+# Function to answer many queries in one pass
+def recommend_batch(queries, generate=False, n=5):
+    """
+    Batch version of the /api/query pipeline for offline jobs.
+    Keywords are extracted with one nlp.pipe pass, all enriched queries are embedded with
+    one batched encode, and the searches run as one matrix multiply (local exact index)
+    or in parallel (Atlas). LLM recommendations are only generated when asked for.
+    Args:
+        queries (list): User input queries.
+        generate (bool): Also generate an LLM recommendation per query (and cache the full result).
+        n (int): Minimum number of similar movies per query when enough pass the filters.
+    Returns:
+        list: One {"query", "similar_movies"[, "recommendation"]} dict per query, in order.
+    """
+    if not queries:
+        return []
+    with span("batch_parse"):
+        keywords = process_queries(queries)
+    enriched = [enrich_query(query, query_keywords) for query, query_keywords in zip(queries, keywords)]
+    with span("batch_encode"):
+        embeddings = resources.get_embedding_cache().encode_many([text for text, _, _ in enriched])
+    filters = [build_search_filters(text, genre, origin) for text, genre, origin in enriched]
+    
+    with span("batch_search"):
+        if config.VECTOR_SEARCH_BACKEND in ("exact", "ivf"):
+            limit = max(n, config.VECTOR_SEARCH_LIMIT)
+            similar_movies = resources.get_local_index().search_many(embeddings, limit=limit, filters=filters)
+        else:
+            with ThreadPoolExecutor(max_workers=config.BATCH_SEARCH_WORKERS) as pool:
+                similar_movies = list(pool.map(lambda args: search_similar_movies(*args, n), zip(embeddings, filters)))
+    
+    similar_movies = [
+        fuse_lexical_results(text, movies, query_filters, n)
+        for (text, _, _), movies, query_filters in zip(enriched, similar_movies, filters)
+    ]
+    results = [{"query": query, "similar_movies": movies} for query, movies in zip(queries, similar_movies)]
+    if not generate:
+        return results
+    
+    def recommend(result, query_filters):
+        result["recommendation"], degraded = generate_recommendation(result["query"], result["similar_movies"])
+        if degraded:
+            result["degraded"] = True
+        if not result["similar_movies"] or degraded:
+            return
+        # Precomputed answers are served by /api/query from the result cache
+        resources.get_result_cache().put(result["query"], {
+            "similar_movies": result["similar_movies"],
+            "recommendation": result["recommendation"],
+        }, query_filters)
+    
+    with ThreadPoolExecutor(max_workers=config.BATCH_LLM_WORKERS) as pool:
+        list(pool.map(recommend, results, filters))
+    return results
+
+# Route to answer a batch of queries in one request
+@api.route("/api/query/batch", methods=["POST"])
+def handle_query_batch():
+    """
+    Handle POST requests to /api/query/batch.
+    Expects a JSON payload {"queries": [...], "generate": false}.
+    Returns:
+        JSON response {"results": [...]} with one entry per query (see recommend_batch).
+    """
+    data = request.json or {}
+    queries = data.get("queries", [])
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        return jsonify({"error": "queries must be a list of strings"}), 400
+    if len(queries) > config.BATCH_MAX_QUERIES:
+        return jsonify({"error": f"at most {config.BATCH_MAX_QUERIES} queries per batch"}), 400
+    return jsonify({"results": recommend_batch(queries, generate=bool(data.get("generate", False)))})
+
+# Function to encode one streaming event as a line of newline-delimited JSON
+def ndjson_event(event):
+    return json.dumps(event, default=str) + "\n"
+
+# Route to stream recommendations: retrieved movies first, then LLM tokens as they arrive
+@api.route("/api/query/stream", methods=["POST"])
+def handle_query_stream():
+    """
+    Streaming variant of /api/query.
+    Expects the same JSON payload and responds with newline-delimited JSON events:
+        {"type": "movies", "similar_movies": [...]}  - as soon as retrieval finishes
+        {"type": "token", "content": "..."}         - one per LLM chunk
+        {"type": "degraded"}                         - before the templated recommendation, sent
+                                                       as one token when the LLM cannot start in time
+        {"type": "error", "message": "..."}         - if the LLM fails mid-stream
+        {"type": "done"}                             - after the last token
+    The assembled result is written to the history collection once the stream completes.
+    """
+    data = request.json  # Parse the incoming JSON payload
+    query = data.get("query", "")  # Extract the user's query
+    try:
+        llm_timeout = requested_llm_timeout(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def generate():
+        # Replay cached results as a single token so clients handle one format
+        cached_result = resources.get_result_cache().get(query, result_cache_filters(query))
+        if cached_result:
+            yield ndjson_event({"type": "movies", "similar_movies": cached_result["similar_movies"]})
+            yield ndjson_event({"type": "token", "content": cached_result["recommendation"]})
+            yield ndjson_event({"type": "done"})
+            return
+        
+        similar_movies = find_similar_movies(query)
+        yield ndjson_event({"type": "movies", "similar_movies": similar_movies})
+        if not similar_movies:
+            yield ndjson_event({"type": "token", "content": NO_RESULTS_RECOMMENDATION})
+            yield ndjson_event({"type": "done"})
+            return
+        
+        # An identical prompt was answered before: replay it as a single token
+        llm_cache = resources.get_llm_cache()
+        tokens = [llm_cache.get(query, similar_movies)]
+        if tokens[0] is not None:
+            yield ndjson_event({"type": "token", "content": tokens[0]})
+        else:
+            tokens = []
+            try:
+                for token in stream_llm(build_recommendation_prompt(query, similar_movies), llm_timeout):
+                    tokens.append(token)
+                    yield ndjson_event({"type": "token", "content": token})
+            except Exception as e:
+                if not tokens and config.LLM_DEGRADED_FALLBACK:
+                    # Nothing was streamed yet: answer with the templated recommendation (not cached)
+                    yield ndjson_event({"type": "degraded"})
+                    yield ndjson_event({"type": "token", "content": fall_back_to_degraded(query, similar_movies, e)})
+                    yield ndjson_event({"type": "done"})
+                    return
+                logging.exception("LLM stream failed")
+                yield ndjson_event({"type": "error", "message": "Recommendation generation failed."})
+                return
+            llm_cache.put(query, similar_movies, "".join(tokens))
+        
+        # Cache the assembled result in the history collection if there are similar movies
+        result = {"similar_movies": similar_movies, "recommendation": "".join(tokens)}
+        if len(similar_movies) > 0:
+            resources.get_result_cache().put(query, result, result_cache_filters(query))
+        yield ndjson_event({"type": "done"})
+    
+    return Response(generate(), mimetype="application/x-ndjson")
+
+# Route to serve precomputed "more like this" neighbours of a movie
+@api.route("/api/movies/<int:tmdb_id>/similar", methods=["GET"])
+def get_similar_movies(tmdb_id):
+    """
+    Return the movies most similar to a movie from the precomputed kNN graph
+    (a lookup of k neighbours: no embedding, vector search or LLM call).
+    Query parameters:
+        limit (int): Maximum number of movies (default and cap: KNN_GRAPH_K).
+    Returns:
+        JSON response with the neighbours (PROJECTED_FIELDS, `_id` and `score`), best first;
+        400 for a limit that is not a positive integer, 404 for movies not in the graph,
+        503 while no graph is available.
+    """
+    try:
+        limit = int(request.args.get("limit", config.KNN_GRAPH_K))
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, config.KNN_GRAPH_K)
+    graph = resources.get_knn_graph()
+    if graph is None:
+        return jsonify({"error": "similar movies are not available"}), 503
+    with span("similar"):
+        neighbours = graph.similar(tmdb_id, limit)
+        if neighbours is None:
+            return jsonify({"error": f"unknown movie {tmdb_id}"}), 404
+        movies = similar_movie_documents([neighbour for neighbour, _ in neighbours])
+    similar_movies = []
+    for neighbour, similarity in neighbours:
+        movie = movies.get(neighbour)
+        if movie is not None:
+            # Same [0, 1] scale as the vector search scores
+            similar_movies.append(dict(movie, score=(1.0 + similarity) / 2.0))
+    return jsonify({"tmdb_id": tmdb_id, "similar_movies": similar_movies})
+
+# Function to load the documents of kNN graph neighbours
+def similar_movie_documents(tmdb_ids):
+    """
+    Args:
+        tmdb_ids (list): TMDb ids of the movies.
+    Returns:
+        dict: tmdb_id -> movie document with PROJECTED_FIELDS and `_id`, read from the catalog
+            snapshot when one is configured, otherwise with one indexed MongoDB query.
+    """
+    snapshot = resources.get_snapshot()
+    if snapshot is not None:
+        rows = [snapshot.row_for_tmdb_id(tmdb_id) for tmdb_id in tmdb_ids]
+        documents = [snapshot.document(row) for row in rows if row is not None]
+        return {doc["tmdb_id"]: {field: doc[field] for field in ["_id"] + PROJECTED_FIELDS} for doc in documents}
+    cursor = resources.get_movies_collection().find(
+        {"tmdb_id": {"$in": tmdb_ids}}, {field: 1 for field in PROJECTED_FIELDS}
+    )
+    return {doc["tmdb_id"]: clean_document(doc) for doc in cursor}
+
 # Route to fetch the history of previous search queries
-@app.route("/api/history", methods=["GET"])
+@api.route("/api/history", methods=["GET"])
 def get_history():
     """
     Fetches all previous search queries and their results.
     Returns:
         JSON response with a list of previous queries.
     """
-    history = history_collection.find({}, {"_id": 0, "query": 1})  # Retrieve only the query field from history
+    history = resources.get_history_collection().find({}, {"_id": 0, "query": 1})  # Retrieve only the query field from history
     return jsonify([entry["query"] for entry in history])  # Return a list of queries
 
+# Route to report cache effectiveness
+@api.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """
+    Returns:
+        JSON response with hit/miss counters of the result and embedding caches
+        (and the coalescing and LLM circuit breaker counters).
+    """
+    return jsonify({
+        "result_cache": resources.get_result_cache().stats(),
+        "embedding_cache": resources.get_embedding_cache().stats(),
+        "llm_cache": resources.get_llm_cache().stats(),
+        "coalescing": query_flights.stats(),
+        "llm_breaker": generator.breaker.stats(),
+    })
+
+# Hooks timing every request and profiling a sample of them
+@api.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.profiler = profiler.start()
+
+@api.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or "unknown"
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+@api.teardown_request
+def stop_request_profiler(exc):
+    if g.get("profiler") is not None:
+        profiler.stop(g.profiler)
+        g.profiler = None
+
+# Scrape-time export of the hit/miss counters kept by the caches
+def collect_cache_metrics():
+    lookups, entries = [], []
+    result_cache = resources.peek("result_cache")
+    if result_cache is not None:
+        stats = result_cache.stats()
+        for outcome in ("exact_hits", "semantic_hits", "misses"):
+            lookups.append(({"cache": "result", "outcome": outcome}, stats[outcome]))
+    embedding_cache = resources.peek("embedding_cache")
+    if embedding_cache is not None:
+        stats = embedding_cache.stats()
+        for outcome in ("hits", "disk_hits", "misses"):
+            lookups.append(({"cache": "embedding", "outcome": outcome}, stats[outcome]))
+        entries.append(({"cache": "embedding"}, stats["entries"]))
+    llm_cache = resources.peek("llm_cache")
+    if llm_cache is not None:
+        stats = llm_cache.stats()
+        lookups.append(({"cache": "llm", "outcome": "hits"}, stats["hits"]))
+        lookups.append(({"cache": "llm", "outcome": "misses"}, stats["misses"]))
+        entries.append(({"cache": "llm"}, stats["entries"]))
+    keyword_cache = _process_query_cached.cache_info()
+    lookups.append(({"cache": "keyword", "outcome": "hits"}, keyword_cache.hits))
+    lookups.append(({"cache": "keyword", "outcome": "misses"}, keyword_cache.misses))
+    entries.append(({"cache": "keyword"}, keyword_cache.currsize))
+    return [
+        ("recommender_cache_lookups_total", "counter", "Cache lookups by cache and outcome.", lookups),
+        ("recommender_cache_entries", "gauge", "Entries held in memory by each cache.", entries),
+        ("recommender_coalesced_requests_total", "counter",
+         "Requests that waited for an identical in-flight query instead of computing it.",
+         [({}, query_flights.stats()["coalesced"])]),
+    ]
+
+# Scrape-time export of the LLM circuit breaker state
+def collect_llm_breaker_metrics():
+    stats = generator.breaker.stats()
+    return [
+        ("recommender_llm_breaker_state", "gauge", "1 for the current state of the LLM circuit breaker.",
+         [({"state": state}, int(stats["state"] == state)) for state in ("closed", "open", "half_open")]),
+        ("recommender_llm_breaker_trips_total", "counter", "Times the LLM circuit breaker opened.",
+         [({}, stats["trips"])]),
+        ("recommender_llm_breaker_rejected_total", "counter", "LLM calls refused by the open circuit breaker.",
+         [({}, stats["rejected"])]),
+    ]
+
+REGISTRY.add_collector(collect_cache_metrics)
+REGISTRY.add_collector(collect_llm_breaker_metrics)
+
+# Route serving every metric in the Prometheus text format
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+# Route to switch sampled profiling at runtime and read the merged report
+@api.route("/debug/profiling", methods=["GET", "POST"])
+def debug_profiling():
+    """
+    GET returns the merged profile as text (?sort=tottime&limit=40).
+    POST {"sample_rate": 0.01, "reset": true} changes the sample rate and/or clears the profile.
+    Only served when PROFILING_ENDPOINT_ENABLED is set.
+    """
+    if not config.PROFILING_ENDPOINT_ENABLED:
+        return jsonify({"error": "profiling endpoint disabled"}), 404
+    if request.method == "POST":
+        data = request.json or {}
+        profiler.configure(sample_rate=data.get("sample_rate"), reset=bool(data.get("reset", False)))
+        return jsonify({"sample_rate": profiler.sample_rate, "profiled": profiler.profiled})
+    report = profiler.report(limit=request.args.get("limit", 40, type=int), sort=request.args.get("sort", "cumulative"))
+    return Response(report, mimetype="text/plain")
+
+# Liveness probe: the process is up and serving HTTP
+@api.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+# Readiness probe: 200 once warm-up (or request traffic) has loaded every resource; 503 lists failed steps
+@api.route("/readyz", methods=["GET"])
+def readyz():
+    status = resources.readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
+# Application factory
+def create_app(warm_up=None):
+    """
+    Create the Flask application. Server entry points call this (e.g. gunicorn
+    "app:create_app()") so warm-up starts with the server, never on import.
+    Args:
+        warm_up (bool): Start loading models and clients on a background thread
+            (defaults to config.WARM_UP_ON_START).
+    Returns:
+        Flask: Configured application.
+    """
+    app = Flask(__name__)
+    
+    # Enable CORS for all routes under /api/*
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    app.register_blueprint(api)
+    
+    if config.WARM_UP_ON_START if warm_up is None else warm_up:
+        resources.start_background_warm_up()
+    return app
+
+# Module-level app for `flask run` and WSGI servers (app:app). Importing it never starts warm-up
+# threads; models load on first use, or use the "app:create_app()" factory to warm up on start.
+app = create_app(warm_up=False)
+
 # Run the Flask app in debug mode on port 5001
 if __name__ == "__main__":
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    # With the reloader, warm up only in the child process that actually serves requests
+    if config.WARM_UP_ON_START and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        resources.start_background_warm_up()
+    app.run(debug=True, port=5001)
@@ -0,0 +1,144 @@
+# Upstream LLM calls for bursts of identical queries, with and without request coalescing
+# Sends bursts of concurrent POST /api/query requests for the same (or a normalized-equal)
+# query against the local stand-ins, with a slow FakeLLM so the requests overlap, and counts
+# how many prompts actually reach the LLM:
+#   burst      - N identical / case- and punctuation-variant queries at once (expect 1 LLM call
+#                with coalescing, up to N without)
+#   respelled  - another spelling of the query after the result cache lost its entry (the LLM
+#                response cache must answer: expect 0 LLM calls)
+#   reordered  - the same words in another order, a different question (expect 1 LLM call)
+# Exits with status 1 when the coalesced run calls the LLM more often than expected.
+# Usage (from backend/):
+#   python benchmarks/bench_coalescing.py
+#   python benchmarks/bench_coalescing.py --burst 64 --llm-token-delay-ms 5
+import argparse  # For command line options
+import os  # For locating the backend modules
+import sys  # For extending the import path and the exit status
+import threading  # For releasing the burst at once
+import time  # For wall-clock timings
+from concurrent.futures import ThreadPoolExecutor  # For the concurrent burst
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import generator  # noqa: E402
+import resources  # noqa: E402
+from fake_llm import FakeLLM  # noqa: E402
+from local_stack import FakeDatabase, FakeEncoder, FakeNLP, build_stack, install  # noqa: E402
+
+# Spellings that normalize to the same cache key
+BURST_VARIANTS = ["horror movies set in space", "Horror movies set in space!", "horror  movies, set in space"]
+RESPELLED = "HORROR movies set in space?"  # Normalizes to the burst query
+REORDERED = "horror set in space movies"  # Same words, different order: a different question
+
+
+def empty_result_cache(movies_db, encoder, nlp):
+    """Drop the result cache and its search_history, keeping the catalog and the LLM cache."""
+    resources.reset("embedding_cache", "result_cache")
+    db = FakeDatabase()
+    db.collections["movies"] = movies_db["movies"]  # Same catalog, empty search_history
+    install(db, encoder, nlp)
+
+
+def reset_caches(app_module, movies_db, encoder, nlp):
+    """Start from empty result / LLM caches and fresh coalescing counters, keeping the catalog."""
+    resources.reset("llm_cache")
+    empty_result_cache(movies_db, encoder, nlp)
+    app_module._process_query_cached.cache_clear()
+    app_module.query_flights = app_module.SingleFlight()
+
+
+def llm_calls_for(app, llm, query):
+    """Returns: int: LLM calls made while answering one /api/query request."""
+    llm.calls = 0
+    response = app.test_client().post("/api/query", json={"query": query})
+    if response.status_code != 200:
+        raise RuntimeError(f"/api/query returned {response.status_code} for {query!r}")
+    return llm.calls
+
+
+def send_burst(app, queries):
+    """
+    Post every query at the same moment from its own thread.
+    Returns:
+        float: Wall-clock seconds until the last response.
+    """
+    barrier = threading.Barrier(len(queries))
+
+    def send(query):
+        client = app.test_client()
+        barrier.wait()  # Release every request together so they are all in flight at once
+        response = client.post("/api/query", json={"query": query})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/query returned {response.status_code} for {query!r}")
+        return response.get_json()["recommendation"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        answers = list(pool.map(send, queries))
+    if len(set(answers)) != 1:
+        raise RuntimeError(f"Burst returned {len(set(answers))} different recommendations")
+    return time.perf_counter() - start
+
+
+def run(app_module, app, llm, movies_db, encoder, nlp, burst, coalescing):
+    """
+    Returns:
+        dict: LLM calls for the burst and the follow-up queries, burst wall time and coalescing stats.
+    """
+    config.SINGLEFLIGHT_ENABLED = coalescing
+    reset_caches(app_module, movies_db, encoder, nlp)
+    llm.calls = 0
+    queries = [BURST_VARIANTS[i % len(BURST_VARIANTS)] for i in range(burst)]
+    wall = send_burst(app, queries)
+    burst_calls = llm.calls
+
+    empty_result_cache(movies_db, encoder, nlp)
+    return {
+        "burst_llm_calls": burst_calls,
+        "respelled_llm_calls": llm_calls_for(app, llm, RESPELLED),
+        "reordered_llm_calls": llm_calls_for(app, llm, REORDERED),
+        "wall_seconds": round(wall, 3),
+        "coalescing": app_module.query_flights.stats(),
+        "llm_cache": resources.get_llm_cache().stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=2000, help="Synthetic catalog size")
+    parser.add_argument("--burst", type=int, default=32, help="Concurrent requests per burst")
+    parser.add_argument("--llm-token-delay-ms", type=float, default=10.0,
+                        help="FakeLLM delay per token (keeps the burst overlapping the first LLM call)")
+    args = parser.parse_args()
+
+    config.VECTOR_SEARCH_BACKEND = "exact"
+    config.RESULT_CACHE_SEMANTIC = False  # Only exact normalized matches hit the result cache
+    llm = FakeLLM(token_delay=args.llm_token_delay_ms / 1000.0)
+    generator.set_llm_backend(llm)
+    encoder, nlp = FakeEncoder(), FakeNLP()
+    movies_db, _ = build_stack(args.movies, encoder=encoder)
+
+    import app as app_module  # Imported after the stand-ins are configured
+    app = app_module.create_app(warm_up=False)
+
+    results = {
+        "coalesced": run(app_module, app, llm, movies_db, encoder, nlp, args.burst, coalescing=True),
+        "uncoalesced": run(app_module, app, llm, movies_db, encoder, nlp, args.burst, coalescing=False),
+    }
+    for name, result in results.items():
+        print(f"{name:<12} burst of {args.burst}: {result['burst_llm_calls']} LLM call(s) in "
+              f"{result['wall_seconds']}s, respelled: {result['respelled_llm_calls']}, "
+              f"reordered: {result['reordered_llm_calls']} LLM call(s), "
+              f"coalesced requests: {result['coalescing']['coalesced']}, "
+              f"LLM cache hit rate: {result['llm_cache']['hit_rate']:.2f}")
+
+    coalesced = results["coalesced"]
+    if coalesced["burst_llm_calls"] > 1 or coalesced["respelled_llm_calls"] > 0 or coalesced["reordered_llm_calls"] != 1:
+        print("FAIL: identical or respelled queries reached the LLM more than once, or a reordered one reused an answer")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Encoding throughput of the embedding pool from 1 to N worker processes
+# Encodes the same texts in-process and with EmbeddingPool at increasing worker counts, reporting
+# texts/s and the speedup over the in-process baseline. Every run is checked against the
+# in-process embeddings (same rows, same order), and a lazily produced input is used to check
+# that the pool never reads more than `max_in_flight` chunks ahead of what it has returned.
+# By default workers use the hashing FakeEncoder with a simulated per-text CPU cost; --model
+# loads the real sentence transformer in every worker instead.
+# Usage (from backend/):
+#   python benchmarks/bench_embedding_pool.py --texts 4000 --cost-ms 2
+#   python benchmarks/bench_embedding_pool.py --model all-MiniLM-L6-v2 --max-workers 8
+import argparse  # For command line options
+import functools  # For the picklable model factory
+import os  # For locating the backend modules and the CPU count
+import sys  # For extending the import path and the exit status
+import time  # For wall-clock timings
+
+import numpy as np  # For comparing embeddings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_pool import EmbeddingPool, load_sentence_transformer  # noqa: E402
+from local_stack import FakeEncoder, synthetic_movies  # noqa: E402
+
+
+def worker_counts(max_workers):
+    """1, 2, 4, ... up to max_workers (always included)."""
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def check_backpressure(pool, texts):
+    """
+    Returns:
+        int: Largest number of texts read from the input but not yet returned as embeddings.
+    """
+    state = {"read": 0, "ahead": 0}
+
+    def produce():
+        for text in texts:
+            state["read"] += 1
+            yield text
+
+    returned = 0
+    for chunk in pool.encode_iter(produce()):
+        state["ahead"] = max(state["ahead"], state["read"] - returned)
+        returned += len(chunk)
+    return state["ahead"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=4000, help="Texts encoded per run")
+    parser.add_argument("--cost-ms", type=float, default=2.0, help="Simulated CPU cost per text (FakeEncoder)")
+    parser.add_argument("--model", help="Sentence transformer to load in the workers instead of the FakeEncoder")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.model:
+        factory = functools.partial(load_sentence_transformer, args.model)
+    else:
+        factory = functools.partial(FakeEncoder, 384, args.cost_ms / 1000.0)
+    texts = [f"{movie['title']} {movie['overview']}" for movie in synthetic_movies(args.texts)]
+
+    local = factory()
+    start = time.perf_counter()
+    expected = np.asarray(local.encode(texts, batch_size=32), dtype=np.float32)
+    baseline = args.texts / (time.perf_counter() - start)
+    print(f"{os.cpu_count()} CPU(s), {args.texts} texts")
+    print(f"{'workers':>8} {'texts/s':>10} {'speedup':>8}")
+    print(f"{'local':>8} {baseline:>10.1f} {1.0:>8.2f}")
+
+    failures = []
+    for workers in worker_counts(args.max_workers):
+        pool = EmbeddingPool(factory, workers=workers, chunk_size=args.chunk_size)
+        pool.warm_up()  # Exclude process start and model loading from the timing
+        start = time.perf_counter()
+        embeddings = pool.encode(texts)
+        rate = args.texts / (time.perf_counter() - start)
+        print(f"{workers:>8} {rate:>10.1f} {rate / baseline:>8.2f}")
+        if embeddings.shape != expected.shape or not np.allclose(embeddings, expected, atol=1e-5):
+            failures.append(f"{workers} workers: embeddings differ from the in-process encode")
+        ahead = check_backpressure(pool, texts)
+        limit = (pool.max_in_flight + 1) * pool.chunk_size
+        if ahead > limit:
+            failures.append(f"{workers} workers: read {ahead} texts ahead of the output (limit {limit})")
+        pool.close()
+
+    for failure in failures:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("OK: pool output matches the in-process encode, in order, with bounded read-ahead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Build time, incremental refresh and serving latency of the "more like this" kNN graph
+# Builds the graph over a synthetic catalog in the in-process Mongo stand-in and checks:
+#   build    - the blocked top-k equals a brute-force top-k over the full similarity matrix
+#   refresh  - after re-embedding some movies and adding new ones, refresh_knn_graph gives the
+#              same neighbours as a full rebuild while recomputing only the affected rows
+#   serve    - GET /api/movies/<tmdb_id>/similar answers from the graph without encoding,
+#              vector search or LLM calls (counted on the stand-ins), with its latency, and
+#              rejects a non-positive limit and caps a large one at KNN_GRAPH_K
+# Usage (from backend/):
+#   python benchmarks/bench_knn_graph.py --movies 8000 --k 20
+import argparse  # For command line options
+import os  # For locating the backend modules
+import sys  # For extending the import path and the exit status
+import tempfile  # For the graph directories
+import time  # For wall-clock timings
+
+import numpy as np  # For the brute-force reference
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import generator  # noqa: E402
+from fake_llm import FakeLLM  # noqa: E402
+from knn_graph import KnnGraph, build_knn_graph, load_embeddings, refresh_knn_graph  # noqa: E402
+from local_stack import FakeNLP, build_stack, install, synthetic_movies  # noqa: E402
+
+
+def same_neighbours(graph, reference, failures, label, atol=2e-3):
+    """
+    Compare two graphs row by row by TMDb id. Lists may only differ in movies tied with the
+    k-th neighbour (within the float16 score precision).
+    """
+    for row in range(len(graph)):
+        tmdb_id = int(graph.tmdb_ids[row])
+        other = reference.row_for_tmdb_id(tmdb_id)
+        a = np.asarray(graph.scores[row], dtype=np.float32)
+        b = np.asarray(reference.scores[other], dtype=np.float32)
+        if not np.allclose(a, b, atol=atol):
+            failures.append(f"{label}: scores of movie {tmdb_id} differ")
+            return
+        scores_a = {int(graph.tmdb_ids[n]): s for n, s in zip(graph.neighbours[row], a) if n >= 0}
+        scores_b = {int(reference.tmdb_ids[n]): s for n, s in zip(reference.neighbours[other], b) if n >= 0}
+        for neighbour in set(scores_a) ^ set(scores_b):
+            score = scores_a.get(neighbour, scores_b.get(neighbour))
+            if score > min(a[-1], b[-1]) + atol:
+                failures.append(f"{label}: neighbours of movie {tmdb_id} differ")
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=8000, help="Synthetic catalog size")
+    parser.add_argument("--k", type=int, default=20, help="Neighbours per movie")
+    parser.add_argument("--block-size", type=int, default=1024, help="Rows / columns per matrix multiply")
+    parser.add_argument("--changed", type=int, default=20, help="Movies re-embedded before the refresh")
+    parser.add_argument("--added", type=int, default=20, help="Movies added before the refresh")
+    parser.add_argument("--requests", type=int, default=500, help="Similar-movie requests timed")
+    args = parser.parse_args()
+    failures = []
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "knn_graph")
+
+    db, encoder = build_stack(args.movies)
+    collection = db["movies"]
+    start = time.perf_counter()
+    build_knn_graph(collection, path, k=args.k, block_size=args.block_size)
+    build_seconds = time.perf_counter() - start
+    graph = KnnGraph(path)
+    print(f"build: {len(graph)} movies, k={args.k} in {build_seconds:.2f}s "
+          f"(score block {args.block_size ** 2 * 4 / 2**20:.1f} MiB, graph "
+          f"{(graph.neighbours.nbytes + graph.scores.nbytes) / 2**20:.2f} MiB)")
+
+    # Reference: full similarity matrix (only feasible for small catalogs)
+    tmdb_ids, vectors = load_embeddings(collection)
+    similarities = vectors @ vectors.T
+    np.fill_diagonal(similarities, -np.inf)
+    expected = np.sort(similarities, axis=1)[:, ::-1][:, :args.k]
+    if not np.allclose(np.asarray(graph.scores, dtype=np.float32), expected, atol=2e-3):
+        failures.append("build: blocked top-k differs from the brute-force top-k")
+    del similarities
+
+    # Re-embed some movies (new text) and add new ones, then refresh incrementally
+    rng = np.random.default_rng(1)
+    for tmdb_id in rng.choice(tmdb_ids, args.changed, replace=False):
+        doc = collection.find_one({"tmdb_id": int(tmdb_id)})
+        text = f"{doc['title']} remastered {rng.integers(1 << 30)}"
+        collection.update_one({"tmdb_id": int(tmdb_id)}, {"$set": {"movie_embedding": encoder.encode(text).tolist()}})
+    for i, movie in enumerate(synthetic_movies(args.added, seed=7)):
+        movie["tmdb_id"] = 900000 + i
+        movie["movie_embedding"] = encoder.encode(f"{movie['title']}. {movie['overview']}").tolist()
+        collection.insert_one(movie)
+    start = time.perf_counter()
+    counts = refresh_knn_graph(collection, path, k=args.k, block_size=args.block_size)
+    refresh_seconds = time.perf_counter() - start
+    print(f"refresh: {counts['changed']} changed movies, {counts['recomputed']} rows recomputed, "
+          f"{counts['merged']} merged in {refresh_seconds:.2f}s")
+    if counts["changed"] != args.changed + args.added:
+        failures.append(f"refresh: found {counts['changed']} changed movies, expected {args.changed + args.added}")
+    rebuilt_path = os.path.join(directory, "rebuilt")
+    build_knn_graph(collection, rebuilt_path, k=args.k, block_size=args.block_size)
+    same_neighbours(KnnGraph(path), KnnGraph(rebuilt_path), failures, "refresh")
+
+    # Serve neighbours through the API and count the work done on the stand-ins
+    config.KNN_GRAPH_PATH, config.KNN_GRAPH_K = path, args.k
+    llm = FakeLLM()
+    generator.set_llm_backend(llm)
+    install(db, encoder, FakeNLP())
+    import app as app_module  # Imported after the stand-ins are configured
+    client = app_module.create_app(warm_up=False).test_client()
+    encodes, searches = encoder.calls, collection.calls.get("aggregate", 0)
+    ids = rng.choice(tmdb_ids, args.requests)
+    start = time.perf_counter()
+    for tmdb_id in ids:
+        response = client.get(f"/api/movies/{int(tmdb_id)}/similar?limit=10")
+        if response.status_code != 200 or len(response.get_json()["similar_movies"]) != 10:
+            failures.append(f"serve: bad response for movie {tmdb_id}: {response.status_code}")
+            break
+    serve_ms = (time.perf_counter() - start) * 1000 / args.requests
+    if encoder.calls != encodes or collection.calls.get("aggregate", 0) != searches or llm.calls:
+        failures.append("serve: the similar-movies endpoint encoded, searched or called the LLM")
+    if client.get("/api/movies/1/similar").status_code != 404:
+        failures.append("serve: unknown movie did not return 404")
+    for limit in ("0", "-1", "ten"):
+        if client.get(f"/api/movies/{int(ids[0])}/similar?limit={limit}").status_code != 400:
+            failures.append(f"serve: limit={limit} did not return 400")
+    response = client.get(f"/api/movies/{int(ids[0])}/similar?limit={args.k * 10}")
+    if response.status_code != 200 or len(response.get_json()["similar_movies"]) > args.k:
+        failures.append("serve: a limit above KNN_GRAPH_K was not capped")
+    print(f"serve: {serve_ms:.2f} ms per request (10 neighbours, fake Mongo lookup included)")
+
+    for failure in failures:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
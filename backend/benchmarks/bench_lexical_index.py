@@ -0,0 +1,98 @@
+# Lexical retrieval: BM25 over the in-process inverted index versus regex scans
+# The baseline evaluates a compiled case-insensitive regex against every movie, which is
+# what MongoDB does for an unanchored or case-insensitive $regex (a collection scan, here
+# without the network round trip). The index answers the same lookups from its postings.
+# Also reports the cost of fusing vector and lexical rankings with reciprocal rank fusion.
+# Usage (from backend/): python benchmarks/bench_lexical_index.py --movies 20000
+import argparse  # For command line options
+import os  # For locating the backend modules
+import re  # For the regex baseline
+import sys  # For extending the import path
+import time  # For timing
+
+import numpy as np  # For percentiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexical_index import LexicalIndex, reciprocal_rank_fusion  # noqa: E402
+from local_stack import synthetic_movies  # noqa: E402
+
+# Genre lookups (the old retrieve_similar_movies_by_genre regex) and keyword / title lookups
+GENRE_QUERIES = ["horror", "comedy", "romance", "science", "western", "animation"]
+KEYWORD_QUERIES = ["dragons", "time travel", "haunted ghost", "heist gangster", "space alien robot", "cowboy sheriff"]
+
+
+def time_calls(function, queries, repeat):
+    """Run function(query) for every query, `repeat` times; return per-call latencies in ms."""
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            function(query)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.asarray(latencies)
+
+
+def regex_genre_scan(movies, genre, n=150):
+    """genre_names: {$regex: ^genre, $options: i}, sorted by popularity, limited to n."""
+    pattern = re.compile(f"^{re.escape(genre)}", re.IGNORECASE)
+    found = [movie for movie in movies if any(pattern.search(name) for name in movie["genre_names"])]
+    found.sort(key=lambda movie: -movie["popularity"])
+    return found[:n]
+
+
+def regex_keyword_scan(movies, query, n=20):
+    """Case-insensitive regex per query word over title / overview / genre names."""
+    patterns = [re.compile(re.escape(word), re.IGNORECASE) for word in query.split()]
+    found = []
+    for movie in movies:
+        text = f"{movie['title']} {movie['overview']} {' '.join(movie['genre_names'])}"
+        hits = sum(1 for pattern in patterns if pattern.search(text))
+        if hits:
+            found.append((hits, movie))
+    found.sort(key=lambda item: -item[0])
+    return [movie for _, movie in found[:n]]
+
+
+def report(name, latencies, baseline=None):
+    p50, p95 = np.percentile(latencies, [50, 95])
+    speedup = f"  ({np.median(baseline) / p50:.0f}x faster than the regex scan)" if baseline is not None else ""
+    print(f"  {name:<28} p50 {p50:8.3f} ms   p95 {p95:8.3f} ms{speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    movies = synthetic_movies(args.movies)
+    for i, movie in enumerate(movies):
+        movie["_id"] = str(i)
+
+    start = time.perf_counter()
+    index = LexicalIndex(movies)
+    print(f"Indexed {len(index)} movies in {time.perf_counter() - start:.2f}s: {len(index.terms)} terms, "
+          f"{index.memory_bytes() / 2**20:.2f} MiB postings")
+
+    print("\nGenre lookups:")
+    baseline = time_calls(lambda genre: regex_genre_scan(movies, genre), GENRE_QUERIES, args.repeat)
+    report("regex scan on genre_names", baseline)
+    report("BM25 index", time_calls(lambda genre: index.search(genre, limit=150), GENRE_QUERIES, args.repeat), baseline)
+
+    print("\nKeyword / title lookups:")
+    baseline = time_calls(lambda query: regex_keyword_scan(movies, query), KEYWORD_QUERIES, args.repeat)
+    report("regex scan on all fields", baseline)
+    report("BM25 index", time_calls(lambda query: index.search(query, limit=20), KEYWORD_QUERIES, args.repeat), baseline)
+    filters = {"release_year": {"$gte": 2000}, "genre_ids": {"$in": [27, 53]}}
+    report("BM25 index + filters", time_calls(lambda query: index.search(query, limit=20, filters=filters), KEYWORD_QUERIES, args.repeat), baseline)
+
+    print("\nRank fusion of two top-20 lists:")
+    rng = np.random.default_rng(0)
+    vector_hits = [{"_id": str(i), "score": 0.9} for i in rng.choice(len(movies), 20, replace=False)]
+    lexical_hits = index.search("haunted ghost", limit=20)
+    report("reciprocal_rank_fusion", time_calls(lambda _: reciprocal_rank_fusion([vector_hits, lexical_hits]), range(100), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# LLM tail-latency protection against a slow, failing or jittery fake LLM
+# Sends POST /api/query requests through the local stand-ins with a FakeLLM configured per
+# scenario and checks the deadline, circuit breaker, degraded fallback and hedging:
+#   slow      - the LLM takes longer than the deadline: every request gets the degraded answer
+#               within the deadline, and once the breaker opens the LLM is no longer called
+#   recovery  - after the reset time a trial call succeeds and the breaker closes again
+#   failing   - the LLM raises: degraded answers, breaker opens after the configured failures
+#   budget    - "llm_timeout" in the request shortens the deadline for that request only
+#   stream    - /api/query/stream sends a "degraded" event and the templated text
+#   hedging   - a fraction of calls are slow; a hedged second attempt cuts the p95 latency
+# Exits with status 1 when any check fails.
+# Usage (from backend/):
+#   python benchmarks/bench_llm_resilience.py
+#   python benchmarks/bench_llm_resilience.py --requests 200 --slow-rate 0.1
+import argparse  # For command line options
+import itertools  # For unique query numbers
+import json  # For reading streamed events
+import os  # For locating the backend modules
+import sys  # For extending the import path and the exit status
+import time  # For wall-clock timings
+
+import numpy as np  # For latency percentiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import generator  # noqa: E402
+import resources  # noqa: E402
+from fake_llm import FakeLLM  # noqa: E402
+from llm_guard import CircuitBreaker  # noqa: E402
+from local_stack import QUERY_CORPUS, FakeNLP, build_stack, install  # noqa: E402
+
+BREAKER_FAILURES = 3
+BREAKER_RESET_SECONDS = 0.5
+QUERY_NUMBERS = itertools.count()  # Shared by every scenario, so no query repeats
+
+
+class Scenario:
+    """Fresh breaker and a unique query per request (so no cache answers for the LLM)."""
+
+    def __init__(self, client):
+        self.client = client
+        generator.breaker = CircuitBreaker(failure_threshold=BREAKER_FAILURES, slow_call_seconds=0.0,
+                                           reset_seconds=BREAKER_RESET_SECONDS)
+
+    def query(self, **payload):
+        """
+        Returns:
+            tuple: (response JSON, seconds).
+        """
+        number = next(QUERY_NUMBERS)
+        query = f"{QUERY_CORPUS[number % len(QUERY_CORPUS)]} {number}"
+        start = time.perf_counter()
+        response = self.client.post("/api/query", json=dict(payload, query=query))
+        seconds = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/query returned {response.status_code}")
+        return response.get_json(), seconds
+
+
+def run_slow(client, llm, failures, requests):
+    llm.latency, config.LLM_TIMEOUT_SECONDS = 1.0, 0.2
+    scenario = Scenario(client)
+    calls, worst, degraded = llm.calls, 0.0, 0
+    for _ in range(requests):
+        result, seconds = scenario.query()
+        degraded += bool(result.get("degraded"))
+        worst = max(worst, seconds)
+    upstream = llm.calls - calls
+    print(f"slow:     {degraded}/{requests} degraded, slowest response {worst * 1000:.0f} ms "
+          f"(deadline {config.LLM_TIMEOUT_SECONDS * 1000:.0f} ms), {upstream} call(s) reached the LLM, "
+          f"breaker {generator.breaker.stats()['state']}")
+    if degraded != requests:
+        failures.append("slow: a request waited for the slow LLM instead of degrading")
+    if worst > config.LLM_TIMEOUT_SECONDS + 0.25:
+        failures.append(f"slow: a response took {worst:.2f}s, past the deadline")
+    if upstream != BREAKER_FAILURES:
+        failures.append(f"slow: {upstream} LLM calls, expected {BREAKER_FAILURES} before the breaker opened")
+    return scenario
+
+
+def run_recovery(scenario, llm, failures):
+    llm.latency = 0.0
+    result, _ = scenario.query()
+    if not result.get("degraded"):
+        failures.append("recovery: the open breaker let a call through before its reset time")
+    time.sleep(BREAKER_RESET_SECONDS)
+    result, _ = scenario.query()
+    state = generator.breaker.stats()["state"]
+    print(f"recovery: after {BREAKER_RESET_SECONDS}s the trial call {'degraded' if result.get('degraded') else 'succeeded'}, "
+          f"breaker {state}")
+    if result.get("degraded") or state != "closed":
+        failures.append("recovery: the breaker did not close after a successful trial call")
+
+
+def run_failing(client, llm, failures, requests):
+    llm.failure_rate, config.LLM_TIMEOUT_SECONDS = 1.0, 2.0
+    scenario = Scenario(client)
+    calls, degraded = llm.calls, 0
+    for _ in range(requests):
+        result, _ = scenario.query()
+        degraded += bool(result.get("degraded"))
+    upstream = llm.calls - calls
+    print(f"failing:  {degraded}/{requests} degraded, {upstream} call(s) reached the LLM, "
+          f"breaker {generator.breaker.stats()['state']}")
+    if degraded != requests or upstream != BREAKER_FAILURES:
+        failures.append(f"failing: {degraded} degraded and {upstream} LLM calls")
+    llm.failure_rate = 0.0
+
+
+def run_budget(client, llm, failures):
+    llm.latency, config.LLM_TIMEOUT_SECONDS = 0.3, 2.0
+    scenario = Scenario(client)
+    short, short_seconds = scenario.query(llm_timeout=0.1)
+    default, default_seconds = scenario.query()
+    print(f"budget:   llm_timeout=0.1 -> {'degraded' if short.get('degraded') else 'answered'} in "
+          f"{short_seconds * 1000:.0f} ms, default deadline -> "
+          f"{'degraded' if default.get('degraded') else 'answered'} in {default_seconds * 1000:.0f} ms")
+    if not short.get("degraded") or short_seconds > 0.3:
+        failures.append("budget: the per-request llm_timeout was not applied")
+    if default.get("degraded"):
+        failures.append("budget: the default deadline degraded a 0.3s LLM call")
+    if client.post("/api/query", json={"query": "space", "llm_timeout": "soon"}).status_code != 400:
+        failures.append("budget: an invalid llm_timeout was accepted")
+
+
+def run_stream(client, llm, failures):
+    llm.latency, config.LLM_TIMEOUT_SECONDS = 1.0, 0.2
+    Scenario(client)
+    response = client.post("/api/query/stream", json={"query": "slow streamed horror movies"})
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+    types = [event["type"] for event in events]
+    print(f"stream:   events {types}")
+    if types[-3:] != ["degraded", "token", "done"]:
+        failures.append(f"stream: unexpected events {types}")
+
+
+def run_hedging(client, llm, failures, requests, slow_rate, hedge_after):
+    percentiles = {}
+    for hedge in (0.0, hedge_after):
+        llm.latency, llm.slow_rate, llm.slow_latency = 0.01, slow_rate, 0.5
+        config.LLM_TIMEOUT_SECONDS, config.LLM_HEDGE_AFTER_SECONDS = 2.0, hedge
+        scenario = Scenario(client)
+        calls, latencies = llm.calls, []
+        for _ in range(requests):
+            _, seconds = scenario.query()
+            latencies.append(seconds * 1000)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        percentiles[hedge] = p95
+        label = f"hedge after {hedge * 1000:.0f} ms" if hedge else "no hedging"
+        print(f"hedging:  {label:<20} p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  p99 {p99:6.1f} ms  "
+              f"LLM calls {llm.calls - calls}/{requests}")
+    llm.slow_rate, config.LLM_HEDGE_AFTER_SECONDS = 0.0, 0.0
+    if percentiles[hedge_after] > percentiles[0.0] / 2:
+        failures.append("hedging: hedged attempts did not cut the p95 latency")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=2000, help="Synthetic catalog size")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per hedging run")
+    parser.add_argument("--slow-rate", type=float, default=0.1, help="Fraction of slow LLM calls (hedging)")
+    parser.add_argument("--hedge-after-ms", type=float, default=50.0, help="Hedge delay")
+    args = parser.parse_args()
+
+    config.VECTOR_SEARCH_BACKEND = "exact"
+    config.RESULT_CACHE_SEMANTIC = False  # Every unique query misses the result cache
+    llm = FakeLLM(seed=1)
+    generator.set_llm_backend(llm)
+    db, encoder = build_stack(args.movies)
+    install(db, encoder, FakeNLP())
+    import app as app_module  # Imported after the stand-ins are configured
+    client = app_module.create_app(warm_up=False).test_client()
+    # Build the indexes and warm the query path before any timed request, so the first
+    # deadline check does not pay for them
+    resources.get_local_index()
+    if config.HYBRID_RETRIEVAL:
+        resources.get_lexical_index()
+    Scenario(client).query()
+
+    failures = []
+    scenario = run_slow(client, llm, failures, requests=10)
+    run_recovery(scenario, llm, failures)
+    run_failing(client, llm, failures, requests=10)
+    run_budget(client, llm, failures)
+    run_stream(client, llm, failures)
+    run_hedging(client, llm, failures, args.requests, args.slow_rate, args.hedge_after_ms / 1000.0)
+
+    for failure in failures:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
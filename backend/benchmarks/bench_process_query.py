@@ -0,0 +1,85 @@
+# Latency comparison: full vs. lean spaCy pipeline for process_query, per query and with nlp.pipe
+# The keyword regression check over SAMPLE_QUERIES is tests/test_keyword_extraction.py.
+# Usage (from backend/): python benchmarks/bench_process_query.py --repeat 20
+import argparse  # For command line options
+import os  # For locating the backend modules
+import sys  # For extending the import path
+import time  # For timing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_extraction import load_nlp  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "scary ghost movies",
+    "funny korean romance",
+    "a mind-bending sci-fi film about time travel",
+    "recent popular horror",
+    "emotional japanese anime with a plot twist",
+    "movies like Inception",
+    "feel-good family movie for kids",
+    "something to watch tonight",
+    "I want a heist movie with a clever twist ending",
+    "top rated French dramas from the 90s",
+    "old western with a lonely gunslinger",
+    "Christopher Nolan space movies",
+    "zombie outbreak survival in South Korea",
+    "uplifting sports film based on true events",
+    "dark psychological thriller with an unreliable narrator",
+    "Bollywood musical with lots of dancing",
+    "animated Disney movies for the whole family",
+    "spy movies like James Bond",
+    "samurai films set in feudal Japan",
+    "a sad movie that makes you cry",
+]
+
+
+def legacy_keywords(doc):
+    """Keyword extraction exactly as process_query did it with the full pipeline."""
+    keywords = [chunk.text.lower() for chunk in doc.noun_chunks] + [
+        token.text.lower()
+        for token in doc
+        if token.pos_ in ["NOUN", "PROPN", "ADJ"] and not token.is_stop
+    ]
+    return list(set(keywords))
+
+
+def per_query_latency(nlp, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in SAMPLE_QUERIES:
+            nlp(query)
+    return (time.perf_counter() - start) / (repeat * len(SAMPLE_QUERIES))
+
+
+def pipe_latency(nlp, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        list(nlp.pipe(SAMPLE_QUERIES, batch_size=64))
+    return (time.perf_counter() - start) / (repeat * len(SAMPLE_QUERIES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    full = load_nlp(lean=False)
+    full_load = time.perf_counter() - start
+    start = time.perf_counter()
+    lean = load_nlp()
+    lean_load = time.perf_counter() - start
+    print(f"full pipeline: {full.pipe_names} (load {full_load:.2f}s)")
+    print(f"lean pipeline: {lean.pipe_names} (load {lean_load:.2f}s)")
+
+    full_single = per_query_latency(full, args.repeat)
+    lean_single = per_query_latency(lean, args.repeat)
+    lean_pipe = pipe_latency(lean, args.repeat)
+    print(f"full nlp(query):      {full_single * 1e3:7.3f} ms/query")
+    print(f"lean nlp(query):      {lean_single * 1e3:7.3f} ms/query ({full_single / lean_single:.2f}x)")
+    print(f"lean nlp.pipe(batch): {lean_pipe * 1e3:7.3f} ms/query ({full_single / lean_pipe:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Memory and recall@k of quantized local indexes versus the float32 baseline
+# Uses a synthetic clustered catalog by default, or a real one from an .npy matrix of
+# movie embeddings (--vectors embeddings.npy). Queries are perturbed catalog vectors.
+# Usage (from backend/): python benchmarks/bench_quantization.py --movies 20000 --k 10
+import argparse  # For command line options
+import os  # For locating the backend modules
+import sys  # For extending the import path
+import time  # For timing
+
+import numpy as np  # For the synthetic catalog
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import BruteForceIndex, QuantizedIndex  # noqa: E402
+
+
+def synthetic_catalog(n_movies, dim, seed):
+    """Clustered unit vectors, roughly like sentence embeddings of movie overviews."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n_movies // 200), dim))
+    vectors = centers[rng.integers(0, len(centers), n_movies)] + 0.7 * rng.normal(size=(n_movies, dim))
+    return vectors.astype(np.float32)
+
+
+def recall_at_k(truth, found):
+    return np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", help=".npy file with one float32 embedding per row")
+    parser.add_argument("--movies", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = np.load(args.vectors).astype(np.float32) if args.vectors else synthetic_catalog(args.movies, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)] + 0.5 * rng.normal(size=(args.queries, vectors.shape[1]))
+
+    baseline = BruteForceIndex(vectors)
+    truth = [baseline.search(q, args.k)[0] for q in queries]
+    print(f"catalog: {len(vectors)} x {vectors.shape[1]}, {args.queries} queries, k={args.k}")
+    print(f"{'index':28} {'resident MiB':>12} {'saved':>7} {'recall@k':>9} {'ms/query':>9}")
+    print(f"{'float32 (baseline)':28} {baseline.memory_bytes() / 2**20:12.2f} {'-':>7} {1.0:9.4f} {'-':>9}")
+
+    for precision in ("float16", "int8"):
+        for rescore_factor in (1, 4):
+            index = QuantizedIndex(vectors.copy(), precision=precision, rescore_factor=rescore_factor)
+            start = time.perf_counter()
+            found = [index.search(q, args.k)[0] for q in queries]
+            latency = (time.perf_counter() - start) / len(queries)
+            label = f"{precision}, rescore x{rescore_factor}"
+            saved = 1 - index.memory_bytes() / baseline.memory_bytes()
+            print(f"{label:28} {index.memory_bytes() / 2**20:12.2f} {saved:7.1%} "
+                  f"{recall_at_k(truth, found):9.4f} {latency * 1e3:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
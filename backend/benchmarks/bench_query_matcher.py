@@ -0,0 +1,114 @@
+# Micro-benchmark: compiled SynonymMatcher vs. the original per-table keyword loops, for the
+# matcher alone and for app.enrich_query (match + enriched query text, the path /api/query uses)
+# Also checks that both pick the same (genre, theme, origin) labels, except where the matcher
+# finds a multi-word synonym inside a longer keyword that the old exact-keyword loops missed
+# (listed in EXPECTED_DIFFERENCES); exits with status 1 on any other difference.
+# tests/test_query_matcher.py runs the same check under pytest.
+# Usage (from backend/): python benchmarks/bench_query_matcher.py --repeat 2000
+import argparse  # For command line options
+import os  # For locating the backend modules
+import sys  # For extending the import path and the exit status
+import time  # For timing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_matcher import SynonymMatcher  # noqa: E402
+from synonyms import GENRE_SYNONYMS, ORIGIN_SYNONYMS, THEME_SYNONYMS  # noqa: E402
+
+# (query, keywords as process_query would extract them)
+SAMPLE_QUERIES = [
+    ("scary ghost movies", ["scary ghost movies", "scary", "ghost", "movies"]),
+    ("funny korean romance", ["funny korean romance", "funny", "korean", "romance"]),
+    ("a mind-bending sci-fi film about time travel", ["a mind-bending sci-fi film", "time travel", "mind-bending", "sci-fi", "film", "time", "travel"]),
+    ("recent popular horror", ["recent popular horror", "recent", "popular", "horror"]),
+    ("emotional japanese anime with a plot twist", ["emotional japanese anime", "a plot twist", "emotional", "japanese", "anime", "plot", "twist"]),
+    ("movies like inception", ["movies", "inception"]),
+    ("time travel movies from south korea", ["time travel movies", "south korea", "time", "travel", "movies", "south", "korea"]),
+    ("feel-good family movie for kids", ["feel-good family movie", "kids", "feel-good", "family", "movie"]),
+    ("something to watch tonight", ["something", "tonight"]),
+]
+
+# Intended differences: labels the compiled matcher returns where the legacy loops return others
+EXPECTED_DIFFERENCES = {
+    # "time travel" is a sci-fi synonym inside the keyword "time travel movies"
+    "time travel movies from south korea": ("sci-fi", None, "korean"),
+}
+
+
+def legacy_match(keywords, table):
+    """The original implementation: every keyword x every label x list membership."""
+    for keyword in keywords:
+        for label, synonyms in table.items():
+            if keyword.lower() in synonyms:
+                return label
+    return None
+
+
+def legacy_all(keywords):
+    return (
+        legacy_match(keywords, GENRE_SYNONYMS),
+        legacy_match(keywords, THEME_SYNONYMS),
+        legacy_match(keywords, ORIGIN_SYNONYMS),
+    )
+
+
+def legacy_enrich(keywords):
+    """The original enrichment: three keyword loops, then the labels prepended to the keywords."""
+    genre, theme, origin = legacy_all(keywords)
+    return " ".join([p for p in (genre, theme, origin) if p] + [" ".join(keywords)]).strip(), genre, origin
+
+
+def compiled_all(matcher, query, keywords):
+    matches = matcher.match(query, keywords)
+    return tuple(matches[c]["label"] if matches[c] else None for c in ("genre", "theme", "origin"))
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query, keywords in SAMPLE_QUERIES:
+            fn(query, keywords)
+    return (time.perf_counter() - start) / (repeat * len(SAMPLE_QUERIES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matcher = SynonymMatcher({"genre": GENRE_SYNONYMS, "theme": THEME_SYNONYMS, "origin": ORIGIN_SYNONYMS})
+    print(f"compile: {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+    print(f"{'query':45} {'legacy (genre, theme, origin)':40} compiled")
+    failures = []
+    for query, keywords in SAMPLE_QUERIES:
+        legacy_labels, compiled_labels = legacy_all(keywords), compiled_all(matcher, query, keywords)
+        print(f"{query:45} {str(legacy_labels):40} {compiled_labels}")
+        if compiled_labels != EXPECTED_DIFFERENCES.get(query, legacy_labels):
+            failures.append(f"{query!r}: compiled {compiled_labels}, legacy {legacy_labels}")
+
+    legacy = timed(lambda query, keywords: legacy_all(keywords), args.repeat)
+    compiled = timed(lambda query, keywords: compiled_all(matcher, query, keywords), args.repeat)
+    print(f"legacy loops:     {legacy * 1e6:8.2f} us/query")
+    print(f"compiled matcher: {compiled * 1e6:8.2f} us/query ({legacy / compiled:.1f}x)")
+
+    import app as app_module  # enrich_query as served, including its "match" timing span
+    for query, keywords in SAMPLE_QUERIES:
+        enriched, expected = app_module.enrich_query(query, keywords), legacy_enrich(keywords)
+        if query not in EXPECTED_DIFFERENCES and enriched != expected:
+            failures.append(f"{query!r}: enrich_query {enriched}, legacy {expected}")
+    legacy = timed(lambda query, keywords: legacy_enrich(keywords), args.repeat)
+    compiled = timed(app_module.enrich_query, args.repeat)
+    print(f"legacy enrich:    {legacy * 1e6:8.2f} us/query")
+    print(f"enrich_query:     {compiled * 1e6:8.2f} us/query ({legacy / compiled:.1f}x)")
+
+    for failure in failures:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# End-to-end latency of POST /api/query against local stand-ins
+# Runs the Flask app with an in-process Mongo (benchmarks/local_stack.py), the deterministic
+# FakeLLM and a fixed query corpus, and reports p50/p95/p99 and throughput per stage
+# (parse, match, encode, search, llm, cache_read, cache_write, request) for three scenarios:
+#   cold       - fresh caches, every corpus query once, sequentially
+#   warm       - the same queries again (result / embedding / keyword caches populated)
+#   concurrent - fresh caches, the corpus repeated --rounds times from --threads threads
+# Results are written as JSON; --baseline compares the request latency with an earlier run.
+# Usage (from backend/):
+#   python benchmarks/bench_query_path.py --fake-encoder --fake-nlp --output bench.json
+#   python benchmarks/bench_query_path.py --fake-encoder --fake-nlp --baseline bench.json
+import argparse  # For command line options
+import json  # For the results file
+import os  # For locating the backend modules
+import platform  # For recording the environment
+import random  # For shuffling the concurrent workload
+import sys  # For extending the import path
+import time  # For wall-clock timings
+from concurrent.futures import ThreadPoolExecutor  # For the concurrent scenario
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import generator  # noqa: E402
+import resources  # noqa: E402
+import timing  # noqa: E402
+from fake_llm import FakeLLM  # noqa: E402
+from local_stack import QUERY_CORPUS, FakeDatabase, FakeEncoder, FakeNLP, build_stack, install  # noqa: E402
+
+# Resources rebuilt between scenarios so that "cold" really starts without cached state
+CACHED_RESOURCES = ("embedding_cache", "result_cache", "local_index")
+
+
+def reset_caches(app_module, movies_db, encoder, nlp):
+    """Forget every cached embedding, keyword list and result, keeping the catalog."""
+    resources.reset(*CACHED_RESOURCES)
+    db = FakeDatabase()
+    db.collections["movies"] = movies_db["movies"]  # Same catalog, empty search_history
+    install(db, encoder, nlp)
+    app_module._process_query_cached.cache_clear()
+
+
+def run_scenario(app, queries, threads=1):
+    """
+    Send every query to /api/query and record per-stage spans.
+    Returns:
+        dict: {"requests", "threads", "wall_seconds", "throughput_rps", "stages"}.
+    """
+    recorder = timing.SpanRecorder()
+    timing.set_recorder(recorder)
+
+    def send(query):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post("/api/query", json={"query": query})
+        recorder.record("request", time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/query returned {response.status_code} for {query!r}")
+
+    start = time.perf_counter()
+    if threads == 1:
+        for query in queries:
+            send(query)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(send, queries))
+    wall = time.perf_counter() - start
+    timing.set_recorder(None)
+    return {
+        "requests": len(queries),
+        "threads": threads,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(queries) / wall, 2),
+        "stages": recorder.summary(wall),
+    }
+
+
+def print_report(results, baseline=None):
+    for name, scenario in results["scenarios"].items():
+        print(f"\n{name}: {scenario['requests']} requests, {scenario['threads']} thread(s), "
+              f"{scenario['throughput_rps']} req/s")
+        print(f"  {'stage':<12} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>9}")
+        for stage, stats in sorted(scenario["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"  {stage:<12} {stats['count']:>6} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+                  f"{stats['p99_ms']:>9.3f} {stats.get('throughput_per_s', 0):>9.1f}")
+        previous = (baseline or {}).get("scenarios", {}).get(name, {}).get("stages", {}).get("request")
+        if previous:
+            current = scenario["stages"]["request"]
+            print(f"  vs baseline: p50 x{current['p50_ms'] / previous['p50_ms']:.2f}, "
+                  f"p95 x{current['p95_ms'] / previous['p95_ms']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=2000, help="Synthetic catalog size")
+    parser.add_argument("--backend", choices=["atlas", "exact", "ivf"], default="exact",
+                        help="Vector search backend (atlas runs $vectorSearch on the fake collection)")
+    parser.add_argument("--fake-encoder", action="store_true", help="Use the hashing encoder instead of the model")
+    parser.add_argument("--encoder-cost-ms", type=float, default=0.0, help="Simulated cost per encoded text")
+    parser.add_argument("--fake-nlp", action="store_true", help="Use the model-free spaCy stand-in")
+    parser.add_argument("--llm-token-delay-ms", type=float, default=0.0, help="FakeLLM delay per token")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5, help="Corpus repetitions in the concurrent scenario")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier results file to compare request latency with")
+    args = parser.parse_args()
+
+    config.VECTOR_SEARCH_BACKEND = args.backend
+    generator.set_llm_backend(FakeLLM(token_delay=args.llm_token_delay_ms / 1000.0))
+    encoder = FakeEncoder(cost_per_text=args.encoder_cost_ms / 1000.0) if args.fake_encoder else resources.get_model()
+    nlp = FakeNLP() if args.fake_nlp else None
+    movies_db, _ = build_stack(args.movies, encoder=encoder)
+
+    import app as app_module  # Imported after the stand-ins are configured
+    app = app_module.create_app(warm_up=False)
+
+    results = {
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "settings": vars(args),
+        "scenarios": {},
+    }
+    reset_caches(app_module, movies_db, encoder, nlp)
+    results["scenarios"]["cold"] = run_scenario(app, QUERY_CORPUS)
+    results["scenarios"]["warm"] = run_scenario(app, QUERY_CORPUS)
+
+    reset_caches(app_module, movies_db, encoder, nlp)
+    workload = QUERY_CORPUS * args.rounds
+    random.Random(0).shuffle(workload)
+    results["scenarios"]["concurrent"] = run_scenario(app, workload, threads=args.threads)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
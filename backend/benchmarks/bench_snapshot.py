@@ -0,0 +1,87 @@
+# Cold start from a catalog snapshot versus a full collection scan
+# Builds a synthetic catalog in the in-process Mongo stand-in, exports it with snapshot.py and
+# compares the time to a searchable index (vector + lexical) built from the collection and from
+# the memory-mapped snapshot. Also checks that both indexes return the same movies, that the
+# snapshot documents round-trip and that the id map finds every movie.
+# Usage (from backend/):
+#   python benchmarks/bench_snapshot.py --movies 50000
+import argparse  # For command line options
+import os  # For locating the backend modules
+import sys  # For extending the import path and the exit status
+import tempfile  # For the snapshot directory
+import time  # For wall-clock timings
+
+import numpy as np  # For random queries
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexical_index import LexicalIndex, build_lexical_index_from_collection  # noqa: E402
+from local_stack import QUERY_CORPUS, build_stack  # noqa: E402
+from snapshot import export_snapshot, open_snapshot  # noqa: E402
+from vector_index import build_index_from_collection  # noqa: E402
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=20000, help="Synthetic catalog size")
+    parser.add_argument("--queries", type=int, default=50, help="Random queries compared between the indexes")
+    args = parser.parse_args()
+
+    db, encoder = build_stack(args.movies)
+    collection = db["movies"]
+    path = os.path.join(tempfile.mkdtemp(), "catalog_snapshot")
+    manifest, export_seconds = timed(lambda: export_snapshot(collection, path))
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"export: {manifest['count']} movies in {export_seconds:.2f}s, {size / 2**20:.1f} MiB on disk")
+
+    from_collection, scan_seconds = timed(lambda: (build_index_from_collection(collection),
+                                                   build_lexical_index_from_collection(collection)))
+    snapshot, open_seconds = timed(lambda: open_snapshot(path))
+    vector_index, index_seconds = timed(snapshot.build_index)
+    lexical_index, lexical_seconds = timed(lambda: LexicalIndex(snapshot.documents, columns=snapshot.columns))
+    print(f"collection scan -> vector + lexical index: {scan_seconds:.3f}s")
+    print(f"snapshot open: {open_seconds * 1000:.1f} ms, vector index: {index_seconds * 1000:.1f} ms, "
+          f"lexical index: {lexical_seconds:.3f}s")
+
+    failures = []
+    rng = np.random.default_rng(0)
+    filters = [None, {"release_year": {"$gte": 2000}}, {"genre_ids": {"$in": [27]}}]
+    for i in range(args.queries):
+        query = rng.standard_normal(encoder.dim).astype(np.float32)
+        expected = [hit["_id"] for hit in from_collection[0].search(query, 10, filters[i % len(filters)])]
+        found = [hit["_id"] for hit in vector_index.search(query, 10, filters[i % len(filters)])]
+        if expected != found:
+            failures.append(f"vector query {i}: {expected[:3]} != {found[:3]}")
+    for text in QUERY_CORPUS:
+        expected = [hit["_id"] for hit in from_collection[1].search(text, 10)]
+        found = [hit["_id"] for hit in lexical_index.search(text, 10)]
+        if expected != found:
+            failures.append(f"lexical query {text!r}: {expected[:3]} != {found[:3]}")
+
+    for row in rng.choice(len(snapshot), size=min(200, len(snapshot)), replace=False):
+        doc = snapshot.document(int(row))
+        stored = collection.find_one({"tmdb_id": doc["tmdb_id"]})
+        for field in ("title", "overview", "release_date", "vote_average", "vote_count", "genre_ids", "release_year",
+                      "genre_mask", "origin_code"):
+            if stored.get(field) != doc[field]:
+                failures.append(f"row {row} field {field}: {stored.get(field)!r} != {doc[field]!r}")
+        if snapshot.row_for_tmdb_id(doc["tmdb_id"]) != row:
+            failures.append(f"id map lookup of tmdb_id {doc['tmdb_id']} did not return row {row}")
+    if snapshot.row_for_tmdb_id(-1) is not None:
+        failures.append("id map found an unknown tmdb_id")
+
+    for failure in failures[:20]:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("OK: snapshot indexes return the same movies as indexes built from the collection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Check that importing the Flask app stays within the startup budget
+# The app must import without loading models or connecting to MongoDB, so a rolling
+# restart can accept (and health-check) traffic right away while warm-up runs.
+# Usage (from backend/): python benchmarks/check_import_time.py --runs 5
+import argparse  # For command line options
+import os  # For locating the backend directory
+import statistics  # For the median import time
+import subprocess  # For importing in a fresh interpreter each run
+import sys  # For the interpreter path and exit status
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import config  # noqa: E402
+
+# Runs in a fresh interpreter; importing app never starts warm-up, so only the import itself is timed
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def time_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=config.IMPORT_TIME_BUDGET_SECONDS)
+    args = parser.parse_args()
+
+    timings = [time_import() for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import app: median {median * 1e3:.0f} ms, max {max(timings) * 1e3:.0f} ms over {args.runs} runs")
+    print(f"budget: {args.budget * 1e3:.0f} ms -> {'OK' if median <= args.budget else 'OVER BUDGET'}")
+    sys.exit(0 if median <= args.budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+# In-process stand-ins for the external services used by the query path
+# FakeDatabase implements the subset of pymongo used by the app and ingestion (find / find_one /
+# aggregate with $vectorSearch / update_one / bulk_write / delete_many / ...), FakeEncoder is a deterministic
+# hashing encoder with the SentenceTransformer interface, and FakeNLP produces spaCy-like
+# docs without a model. install() puts them behind resources.* so the Flask app runs offline.
+import hashlib  # For deterministic token vectors
+import itertools  # For document ids
+import re  # For tokenizing text and $regex filters
+import threading  # The fake collections are shared by request threads
+import time  # For simulated model cost
+from collections import namedtuple  # For spaCy-like tokens
+
+import numpy as np  # For embeddings and vector search
+
+import resources  # Lazily built resources, replaced by the stand-ins
+from movie_fields import TMDB_GENRE_IDS, TMDB_GENRE_NAMES, structured_fields  # Fields of the synthetic movies
+from quantization import embedding_to_array  # Stored embedding -> float32 vector
+from synonyms import GENRE_SYNONYMS  # Vocabulary for synthetic overviews
+
+
+def _get_path(doc, path):
+    """Read a dotted field path ("origin.original_language") from a document."""
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _compare(value, operator, bound):
+    """Evaluate one query operator against a field value (arrays match if any element does)."""
+    if operator == "$exists":
+        return (value is not None) == bool(bound)
+    if operator == "$in":
+        values = value if isinstance(value, list) else [value]
+        return any(v in bound for v in values)
+    if operator == "$regex":
+        return value is not None and any(re.search(bound, str(v)) for v in (value if isinstance(value, list) else [value]))
+    if operator == "$options":
+        return True  # Handled together with $regex
+    if value is None:
+        return False
+    if isinstance(value, list):
+        return any(_compare(v, operator, bound) for v in value)
+    if operator == "$eq":
+        return value == bound
+    if operator == "$ne":
+        return value != bound
+    if operator == "$gte":
+        return value >= bound
+    if operator == "$lte":
+        return value <= bound
+    if operator == "$gt":
+        return value > bound
+    if operator == "$lt":
+        return value < bound
+    raise NotImplementedError(f"Fake collection does not support {operator}")
+
+
+def matches(doc, query):
+    """Evaluate a MongoDB query document against a document."""
+    for field, condition in (query or {}).items():
+        if field == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = _get_path(doc, field)
+        if isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+            if "$regex" in condition and "i" in condition.get("$options", ""):
+                condition = dict(condition, **{"$regex": f"(?i){condition['$regex']}"})
+            if not all(_compare(value, operator, bound) for operator, bound in condition.items()):
+                return False
+        elif isinstance(value, list) and not isinstance(condition, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def project(doc, projection):
+    """Apply an inclusion projection (plus "_id" unless excluded)."""
+    if not projection:
+        return dict(doc)
+    result = {}
+    if projection.get("_id", 1):
+        result["_id"] = doc["_id"]
+    for path, include in projection.items():
+        if path == "_id" or not include or isinstance(include, dict):
+            continue
+        value = _get_path(doc, path)
+        if value is None:
+            continue
+        target, parts = result, path.split(".")
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return result
+
+
+class FakeCursor:
+    """List-backed cursor supporting sort / limit / iteration."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        present = [doc for doc in self.docs if doc.get(field) is not None]
+        missing = [doc for doc in self.docs if doc.get(field) is None]
+        present.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        self.docs = missing + present if direction > 0 else present + missing  # Missing sorts lowest, like MongoDB
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+UpdateResult = namedtuple("UpdateResult", ["matched_count", "modified_count", "upserted_id"])
+DeleteResult = namedtuple("DeleteResult", ["deleted_count"])
+BulkWriteResult = namedtuple("BulkWriteResult", ["matched_count", "modified_count", "upserted_count"])
+
+
+class FakeCollection:
+    """In-memory collection with the pymongo calls used by the app and ingestion."""
+
+    def __init__(self, docs=None):
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self.docs = []
+        self._matrix = None  # Normalized embedding matrix for $vectorSearch, rebuilt after writes
+        self.calls = {}  # Operation -> number of calls
+        for doc in docs or []:
+            self.insert_one(doc)
+
+    def _count_call(self, operation):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def create_index(self, *args, **kwargs):
+        return "fake_index"
+
+    def insert_one(self, doc):
+        with self._lock:
+            self._count_call("insert_one")
+            doc = dict(doc)
+            doc.setdefault("_id", next(self._ids))
+            self.docs.append(doc)
+            self._matrix = None
+            return doc["_id"]
+
+    def find(self, query=None, projection=None):
+        with self._lock:
+            self._count_call("find")
+            return FakeCursor([project(doc, projection) for doc in self.docs if matches(doc, query)])
+
+    def find_one(self, query=None, projection=None):
+        with self._lock:
+            self._count_call("find_one")
+            for doc in self.docs:
+                if matches(doc, query):
+                    return project(doc, projection)
+            return None
+
+    def count_documents(self, query):
+        with self._lock:
+            return sum(1 for doc in self.docs if matches(doc, query))
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def update_one(self, query, update, upsert=False):
+        with self._lock:
+            self._count_call("update_one")
+            for doc in self.docs:
+                if matches(doc, query):
+                    doc.update(update.get("$set", {}))
+                    self._matrix = None
+                    return UpdateResult(1, 1, None)
+            if not upsert:
+                return UpdateResult(0, 0, None)
+            doc = {key: value for key, value in query.items() if not key.startswith("$")}
+            doc.update(update.get("$set", {}))
+            return UpdateResult(0, 0, self.insert_one(doc))
+
+    def bulk_write(self, operations, ordered=True):
+        """Apply pymongo UpdateOne operations (the only kind ingestion sends)."""
+        with self._lock:
+            self._count_call("bulk_write")
+            matched = upserted = 0
+            for operation in operations:
+                result = self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+                matched += result.matched_count
+                upserted += result.upserted_id is not None
+            return BulkWriteResult(matched, matched, upserted)
+
+    def delete_one(self, query):
+        with self._lock:
+            self._count_call("delete_one")
+            for i, doc in enumerate(self.docs):
+                if matches(doc, query):
+                    del self.docs[i]
+                    self._matrix = None
+                    return DeleteResult(1)
+            return DeleteResult(0)
+
+    def delete_many(self, query):
+        with self._lock:
+            self._count_call("delete_many")
+            before = len(self.docs)
+            self.docs = [doc for doc in self.docs if not matches(doc, query)]
+            self._matrix = None
+            return DeleteResult(before - len(self.docs))
+
+    def _vector_matrix(self):
+        """Normalized embeddings of every document that has one, with their documents."""
+        if self._matrix is None:
+            docs = [doc for doc in self.docs if doc.get("movie_embedding") is not None]
+            vectors = np.array([embedding_to_array(doc["movie_embedding"]) for doc in docs], dtype=np.float32)
+            if len(docs):
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            self._matrix = (docs, vectors)
+        return self._matrix
+
+    def _vector_search(self, stage):
+        """Exact $vectorSearch: filter, score every movie, keep the top `limit` (with their score)."""
+        docs, vectors = self._vector_matrix()
+        if not docs:
+            return []
+        query = np.asarray(stage["queryVector"], dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = vectors @ query
+        if stage.get("filter"):
+            allowed = np.fromiter((matches(doc, stage["filter"]) for doc in docs), dtype=bool, count=len(docs))
+            scores[~allowed] = -np.inf
+        order = np.argsort(-scores, kind="stable")[:stage["limit"]]
+        return [dict(docs[i], _score=float((1 + scores[i]) / 2)) for i in order if np.isfinite(scores[i])]
+
+    def aggregate(self, pipeline):
+        with self._lock:
+            self._count_call("aggregate")
+            results = list(self.docs)
+            for stage in pipeline:
+                (operator, spec), = stage.items()
+                if operator == "$vectorSearch":
+                    results = self._vector_search(spec)
+                elif operator == "$match":
+                    results = [doc for doc in results if matches(doc, spec)]
+                elif operator == "$limit":
+                    results = results[:spec]
+                elif operator == "$project":
+                    projected = []
+                    for doc in results:
+                        out = project(doc, spec)
+                        for field, value in spec.items():
+                            if isinstance(value, dict) and "$meta" in value:
+                                out[field] = doc.get("_score")
+                        projected.append(out)
+                    results = projected
+                else:
+                    raise NotImplementedError(f"Fake collection does not support {operator}")
+            return iter(results)
+
+
+class _FakeAdmin:
+    def command(self, name):
+        return {"ok": 1.0}
+
+
+class _FakeClient:
+    admin = _FakeAdmin()
+
+
+class FakeDatabase:
+    """Dict of FakeCollections created on first access, like a pymongo Database."""
+
+    def __init__(self):
+        self.client = _FakeClient()
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection()
+        return self.collections[name]
+
+
+_WORD = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+
+class FakeEncoder:
+    """
+    Deterministic hashing encoder with the SentenceTransformer encode interface:
+    each word maps to a fixed pseudo-random vector and a text is the normalized sum,
+    so texts sharing words get similar embeddings.
+    Args:
+        dim (int): Embedding dimension.
+        cost_per_text (float): Seconds of busy work per encoded text, to mimic model cost.
+    """
+
+    def __init__(self, dim=384, cost_per_text=0.0):
+        self.dim = dim
+        self.cost_per_text = cost_per_text
+        self._words = {}
+        self.calls = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _word_vector(self, word):
+        vector = self._words.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._words[word] = vector
+        return vector
+
+    def _encode_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            vector += self._word_vector(word)
+        if self.cost_per_text:
+            _busy_wait(self.cost_per_text)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        self.calls += 1
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.array([self._encode_one(text) for text in sentences], dtype=np.float32).reshape(-1, self.dim)
+
+
+def _busy_wait(seconds):
+    """Spin (rather than sleep) so simulated model cost also occupies a CPU core."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+# spaCy-like token and doc for FakeNLP
+FakeToken = namedtuple("FakeToken", ["text", "pos_", "is_stop"])
+
+_STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "about", "me", "i", "i'd",
+    "like", "want", "some", "any", "is", "are", "that", "this", "it", "show", "find", "give", "recommend",
+    "please", "something", "what", "who", "from", "by", "be", "can", "you", "my", "we",
+}
+
+
+class FakeDoc(list):
+    """List of FakeTokens; every non-stop word is tagged as a noun and there are no noun chunks."""
+    noun_chunks = ()
+
+
+class FakeNLP:
+    """Model-free stand-in for the spaCy pipeline (callable and .pipe)."""
+
+    def __call__(self, text):
+        return FakeDoc(FakeToken(word, "NOUN", word in _STOP_WORDS) for word in _WORD.findall(text.lower()))
+
+    def pipe(self, texts, batch_size=64):
+        for text in texts:
+            yield self(text)
+
+
+# Fixed query corpus: genre / origin / filter words, multi-word synonyms and repeats with other spellings
+QUERY_CORPUS = [
+    "recent popular horror movies",
+    "funny romantic comedy for date night",
+    "korean thriller with a twist",
+    "mind-bending sci-fi about time travel",
+    "old western with a gunslinger",
+    "top rated japanese animation",
+    "feel-good family movie for kids",
+    "crime heist movie with a clever plan",
+    "epic fantasy quest with dragons",
+    "documentary about real events",
+    "war movie about soldiers",
+    "emotional drama about family",
+    "spy movie with a secret agent",
+    "zombie outbreak survival",
+    "indian musical with songs and dancing",
+    "french romance in paris",
+    "detective mystery whodunit",
+    "superhero movie with villains and powers",
+    "historical period drama",
+    "chinese martial arts action",
+    "Recent popular HORROR movies!",
+    "funny  romantic comedy for date night",
+]
+
+
+def synthetic_movies(count, seed=0):
+    """
+    Deterministic movie documents shaped like ingestion output (without embeddings).
+    Args:
+        count (int): Number of movies.
+        seed (int): Random seed.
+    Returns:
+        list: Movie documents.
+    """
+    rng = np.random.default_rng(seed)
+    genre_words = list(GENRE_SYNONYMS.values())
+    languages = ["en"] * 6 + ["ko", "ja", "fr", "hi", "zh", "es", "de"]
+    movies = []
+    for i in range(count):
+        words = [str(word) for group in rng.choice(len(genre_words), 2, replace=False) for word in rng.choice(genre_words[group], 3)]
+        movie = {
+            "tmdb_id": 100000 + i,
+            "title": f"{words[0].title()} {words[3].title()} {i}",
+            "overview": f"A story of {' and '.join(words)}.",
+            "release_date": f"{int(rng.integers(1950, 2026))}-{int(rng.integers(1, 13)):02d}-01",
+            "popularity": float(rng.gamma(2.0, 20.0)),
+            "poster_path": f"/poster{i}.jpg",
+            "vote_average": round(float(rng.uniform(3.0, 9.5)), 1),
+            "vote_count": int(rng.integers(0, 5000)),
+            "genre_ids": [int(g) for g in rng.choice(TMDB_GENRE_IDS, int(rng.integers(1, 4)), replace=False)],
+            "origin": {"original_language": str(rng.choice(languages)), "country_names": []},
+        }
+        movie["genre_names"] = [TMDB_GENRE_NAMES[genre_id] for genre_id in movie["genre_ids"]]
+        movie.update(structured_fields(movie))
+        movies.append(movie)
+    return movies
+
+
+def build_stack(movies=2000, dim=384, encoder=None, seed=0):
+    """
+    Build a FakeDatabase whose "movies" collection holds embedded synthetic movies.
+    Args:
+        movies (int): Catalog size.
+        dim (int): Embedding dimension of the default FakeEncoder.
+        encoder: Object with encode(list) (defaults to a FakeEncoder).
+        seed (int): Random seed for the catalog.
+    Returns:
+        tuple: (FakeDatabase, encoder).
+    """
+    encoder = encoder or FakeEncoder(dim)
+    catalog = synthetic_movies(movies, seed)
+    embeddings = encoder.encode([f"{m['title']}. {m['overview']}" for m in catalog])
+    db = FakeDatabase()
+    collection = db["movies"]
+    for movie, embedding in zip(catalog, embeddings):
+        collection.insert_one(dict(movie, movie_embedding=np.asarray(embedding, dtype=np.float32).tolist()))
+    return db, encoder
+
+
+def install(db, encoder=None, nlp=None):
+    """
+    Put the stand-ins behind the resources getters (real models are used where None is passed).
+    Args:
+        db (FakeDatabase): Database stand-in.
+        encoder: Encoder stand-in for resources.get_model(), or None for the real model.
+        nlp: spaCy stand-in for resources.get_nlp(), or None for the real pipeline.
+    """
+    resources.set_resource("db", db)
+    if encoder is not None:
+        resources.set_resource("model", encoder)
+    if nlp is not None:
+        resources.set_resource("nlp", nlp)
@@ -0,0 +1,170 @@
+# Runtime configuration for the backend
+# Every setting can be overridden with an environment variable of the same name,
+# so deployments can switch behaviour without editing code.
+import os  # For reading environment variables
+
+
+def _env_int(name, default):
+    """Read an integer setting from the environment, falling back to a default."""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name, default):
+    """Read a float setting from the environment, falling back to a default."""
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name, default):
+    """Read a boolean setting ("1", "true", "yes", "on") from the environment."""
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Name of the sentence transformer model used for movie and query embeddings
+EMBEDDING_MODEL_NAME = os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+
+# Which engine answers vector similarity queries:
+#   "atlas" - MongoDB Atlas $vectorSearch (default, requires an Atlas vector index)
+#   "exact" - in-process brute-force search over a contiguous float32 matrix
+#   "ivf"   - in-process approximate search with an inverted-file (IVF) index
+VECTOR_SEARCH_BACKEND = os.environ.get("VECTOR_SEARCH_BACKEND", "atlas").lower()
+
+# Number of candidates considered and results returned by a vector search
+VECTOR_NUM_CANDIDATES = _env_int("VECTOR_NUM_CANDIDATES", 1000)
+VECTOR_SEARCH_LIMIT = _env_int("VECTOR_SEARCH_LIMIT", 20)
+
+# Filtered Atlas searches multiply numCandidates by 4 until enough movies pass the filters,
+# up to this cap (Atlas allows at most 10000), then fall back to one exact (ENN) search
+VECTOR_MAX_CANDIDATES = _env_int("VECTOR_MAX_CANDIDATES", 10000)
+
+# Turn matched genre / origin labels into hard pre-filters (genre_ids / origin_code) when they map
+# to TMDb values. Off by default: labels come from loose synonyms ("love", "space", "law"), which
+# should rank movies through the enriched query text rather than exclude the rest of the catalog
+FILTER_BY_MATCHED_GENRE = _env_bool("FILTER_BY_MATCHED_GENRE", False)
+FILTER_BY_MATCHED_ORIGIN = _env_bool("FILTER_BY_MATCHED_ORIGIN", False)
+
+# IVF tuning: number of inverted lists (0 = sqrt of the catalog size) and lists probed per query
+IVF_NUM_LISTS = _env_int("IVF_NUM_LISTS", 0)
+IVF_NUM_PROBES = _env_int("IVF_NUM_PROBES", 8)
+
+# Resident vector format of the exact local index: "float32", "float16" or "int8".
+# Quantized indexes rescore LOCAL_INDEX_RESCORE_FACTOR x n candidates against float32
+# vectors kept in a memory-mapped file (LOCAL_INDEX_RESCORE_PATH, temporary if empty)
+LOCAL_INDEX_PRECISION = os.environ.get("LOCAL_INDEX_PRECISION", "float32").lower()
+LOCAL_INDEX_RESCORE_FACTOR = _env_int("LOCAL_INDEX_RESCORE_FACTOR", 4)
+LOCAL_INDEX_RESCORE_PATH = os.environ.get("LOCAL_INDEX_RESCORE_PATH", "")
+
+# Catalog snapshot written by `python snapshot.py export <dir>`: when set, the local vector index
+# and the lexical index are built from the memory-mapped snapshot instead of a MongoDB scan
+CATALOG_SNAPSHOT_PATH = os.environ.get("CATALOG_SNAPSHOT_PATH", "")
+
+# Seconds between checks whether ingestion changed the movies collection (movie count and the
+# ingest_state "catalog" timestamp); the in-process vector and BM25 indexes built from it are then
+# rebuilt in the background. 0 = never: newly ingested movies are only searched after a restart
+CATALOG_REFRESH_SECONDS = _env_float("CATALOG_REFRESH_SECONDS", 60.0)
+
+# Query embedding cache: in-memory LRU size, plus an optional shared on-disk tier
+# (leave EMBEDDING_CACHE_DIR empty to keep the cache in memory only)
+EMBEDDING_CACHE_SIZE = _env_int("EMBEDDING_CACHE_SIZE", 4096)
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "")
+EMBEDDING_CACHE_DISK_SLOTS = _env_int("EMBEDDING_CACHE_DISK_SLOTS", 65536)
+
+# Precomputed movie-to-movie kNN graph behind /api/movies/<tmdb_id>/similar (knn_graph.py):
+# graph directory (empty disables the endpoint and the refresh after ingestion), neighbours
+# stored per movie and rows / columns per matrix multiply while building it
+KNN_GRAPH_PATH = os.environ.get("KNN_GRAPH_PATH", "")
+KNN_GRAPH_K = _env_int("KNN_GRAPH_K", 20)
+KNN_GRAPH_BLOCK_SIZE = _env_int("KNN_GRAPH_BLOCK_SIZE", 2048)
+
+# Multi-process embedding pool (embedding_pool.py) used by ingestion and batch encoding:
+# worker processes (0 or 1 = encode in the calling process), texts per worker chunk, chunks queued
+# at most (0 = 2 per worker) and the smallest batch worth sending to the pool in the app
+EMBEDDING_WORKERS = _env_int("EMBEDDING_WORKERS", 0)
+EMBEDDING_POOL_CHUNK_SIZE = _env_int("EMBEDDING_POOL_CHUNK_SIZE", 64)
+EMBEDDING_POOL_MAX_IN_FLIGHT = _env_int("EMBEDDING_POOL_MAX_IN_FLIGHT", 0)
+EMBEDDING_POOL_MIN_PARALLEL = _env_int("EMBEDDING_POOL_MIN_PARALLEL", 32)
+
+# Ingestion pipeline: movies buffered before encoding, texts per encode batch, upserts per bulk_write
+INGEST_FLUSH_SIZE = _env_int("INGEST_FLUSH_SIZE", 1000)
+INGEST_ENCODE_BATCH_SIZE = _env_int("INGEST_ENCODE_BATCH_SIZE", 64)
+INGEST_WRITE_CHUNK_SIZE = _env_int("INGEST_WRITE_CHUNK_SIZE", 500)
+
+# How ingestion stores movie_embedding in MongoDB: "array" (list of doubles, ~12 bytes per
+# dimension in BSON) or "binary" (BSON binary float32 vector, 4 bytes per dimension; also
+# accepted by Atlas vector indexes)
+EMBEDDING_STORAGE = os.environ.get("EMBEDDING_STORAGE", "array").lower()
+
+# TMDb fetcher: API root (point at tmdb_stub.py for offline runs), concurrency, rate limit (0 = unlimited),
+# retries and the longest wait between them (also caps Retry-After), and the on-disk response cache
+# (TTL 0 never expires). The cache is off unless TMDB_CACHE_DIR is set: it replays popular-list pages
+# too, so a cached re-run would never see new popularity / vote counts; use it for repeated offline runs
+TMDB_BASE_URL = os.environ.get("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+TMDB_MAX_WORKERS = _env_int("TMDB_MAX_WORKERS", 8)
+TMDB_RATE_PER_SECOND = _env_int("TMDB_RATE_PER_SECOND", 40)
+TMDB_MAX_RETRIES = _env_int("TMDB_MAX_RETRIES", 4)
+TMDB_MAX_BACKOFF_SECONDS = _env_float("TMDB_MAX_BACKOFF_SECONDS", 30.0)
+TMDB_CACHE_DIR = os.environ.get("TMDB_CACHE_DIR", "")
+TMDB_CACHE_TTL = _env_int("TMDB_CACHE_TTL", 86400)
+
+# LLM used for recommendations: "groq" (default) or "fake" for offline runs and tests
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "groq").lower()
+
+# Result cache over search_history: entry lifetime, size cap and the optional
+# embedding-similarity fallback (reuse a result when a query is this close to a cached one and is
+# searched with exactly the same pre-filters), off by default: "recent horror" and "old horror"
+# embed almost identically. Each process reloads its similarity index after REFRESH seconds
+RESULT_CACHE_TTL_SECONDS = _env_int("RESULT_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+RESULT_CACHE_MAX_ENTRIES = _env_int("RESULT_CACHE_MAX_ENTRIES", 10000)
+RESULT_CACHE_SEMANTIC = _env_bool("RESULT_CACHE_SEMANTIC", False)
+RESULT_CACHE_SIMILARITY_THRESHOLD = _env_float("RESULT_CACHE_SIMILARITY_THRESHOLD", 0.95)
+RESULT_CACHE_INDEX_REFRESH_SECONDS = _env_float("RESULT_CACHE_INDEX_REFRESH_SECONDS", 60.0)
+
+# Query processing: memoized process_query results and the nlp.pipe batch size for batch callers
+KEYWORD_CACHE_SIZE = _env_int("KEYWORD_CACHE_SIZE", 4096)
+SPACY_BATCH_SIZE = _env_int("SPACY_BATCH_SIZE", 64)
+
+# Startup: load models and clients on a background thread when a server entry point creates the
+# app (create_app() or `python app.py`; importing app never warms up), attempts
+# per warm-up step before it is reported as failed on /readyz (0 = retry forever), and the
+# import-time budget checked by benchmarks/check_import_time.py
+WARM_UP_ON_START = _env_bool("WARM_UP_ON_START", True)
+WARM_UP_MAX_ATTEMPTS = _env_int("WARM_UP_MAX_ATTEMPTS", 5)
+IMPORT_TIME_BUDGET_SECONDS = _env_float("IMPORT_TIME_BUDGET_SECONDS", 1.0)
+
+# Batch queries (/api/query/batch): maximum batch size, parallel Atlas searches and parallel LLM calls
+BATCH_MAX_QUERIES = _env_int("BATCH_MAX_QUERIES", 256)
+BATCH_SEARCH_WORKERS = _env_int("BATCH_SEARCH_WORKERS", 8)
+BATCH_LLM_WORKERS = _env_int("BATCH_LLM_WORKERS", 4)
+
+# Sampled profiling: fraction of requests run under cProfile, and whether /debug/profiling
+# may read the report and change the rate at runtime (keep it off on public deployments)
+PROFILING_SAMPLE_RATE = _env_float("PROFILING_SAMPLE_RATE", 0.0)
+PROFILING_ENDPOINT_ENABLED = _env_bool("PROFILING_ENDPOINT_ENABLED", False)
+
+# Hybrid retrieval: fuse vector hits with BM25 hits from the in-process lexical index
+# (titles, overviews, genre names) using reciprocal rank fusion with this rank offset
+HYBRID_RETRIEVAL = _env_bool("HYBRID_RETRIEVAL", True)
+HYBRID_RRF_K = _env_int("HYBRID_RRF_K", 60)
+
+# Coalesce concurrent /api/query requests for the same normalized query into one computation,
+# and cache LLM answers per (normalized query, retrieved title set) in memory (TTL 0 = no expiry)
+SINGLEFLIGHT_ENABLED = _env_bool("SINGLEFLIGHT_ENABLED", True)
+LLM_CACHE_SIZE = _env_int("LLM_CACHE_SIZE", 2048)
+LLM_CACHE_TTL_SECONDS = _env_int("LLM_CACHE_TTL_SECONDS", 24 * 3600)
+
+# LLM tail latency: deadline per call (requests may ask for less with "llm_timeout"; 0 = none),
+# hedged second attempt after this many seconds (0 = off), threads running attempts, and the
+# circuit breaker (opens after N consecutive failed or slower-than-SLOW calls, 0 = off; retries
+# one call after RESET seconds). When the LLM cannot answer, queries get the retrieved movies with
+# a templated explanation instead of an error unless LLM_DEGRADED_FALLBACK is off
+LLM_TIMEOUT_SECONDS = _env_float("LLM_TIMEOUT_SECONDS", 15.0)
+LLM_HEDGE_AFTER_SECONDS = _env_float("LLM_HEDGE_AFTER_SECONDS", 0.0)
+LLM_ATTEMPT_WORKERS = _env_int("LLM_ATTEMPT_WORKERS", 32)
+LLM_BREAKER_FAILURES = _env_int("LLM_BREAKER_FAILURES", 5)
+LLM_BREAKER_SLOW_SECONDS = _env_float("LLM_BREAKER_SLOW_SECONDS", 10.0)
+LLM_BREAKER_RESET_SECONDS = _env_float("LLM_BREAKER_RESET_SECONDS", 30.0)
+LLM_DEGRADED_FALLBACK = _env_bool("LLM_DEGRADED_FALLBACK", True)
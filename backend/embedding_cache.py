@@ -0,0 +1,202 @@
+# Two-level cache for query embeddings
+# Level 1 is a bounded in-memory LRU per process; level 2 is an optional memory-mapped
+# table on disk that survives restarts and is shared by every worker process on the host.
+import hashlib  # For stable (process-independent) cache keys
+import os  # For creating the on-disk cache directory
+import threading  # To make the in-memory LRU safe for threaded Flask workers
+from collections import OrderedDict  # Keeps entries in least-recently-used order
+
+import numpy as np  # For the embedding vectors and the memory-mapped table
+
+
+def normalize_query(text):
+    """
+    Normalize query text so trivially different spellings share a cache entry.
+    Args:
+        text (str): Raw query text.
+    Returns:
+        str: Lower-cased text with surrounding and repeated whitespace removed.
+    """
+    return " ".join(text.lower().split())
+
+
+def _key_hash(namespace, text):
+    """Hash a namespaced key to a non-zero 64-bit integer (zero marks an empty disk slot)."""
+    digest = hashlib.blake2b(f"{namespace}\0{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class DiskEmbeddingTier:
+    """
+    Direct-mapped embedding table stored in two memory-mapped .npy files.
+    `keys.npy` holds one 64-bit key hash per slot and `vectors.npy` the matching vectors.
+    A new entry simply overwrites whatever occupied its slot, so the file never grows.
+    """
+
+    def __init__(self, directory, dim, capacity=65536):
+        os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        keys_path = os.path.join(directory, "keys.npy")
+        vectors_path = os.path.join(directory, "vectors.npy")
+        self.keys = self._open(keys_path, np.uint64, (capacity,))
+        self.vectors = self._open(vectors_path, np.float32, (capacity, dim))
+        if self.vectors.shape != (capacity, dim):
+            raise ValueError(f"Embedding cache at {directory} has shape {self.vectors.shape}, expected {(capacity, dim)}")
+
+    @staticmethod
+    def _open(path, dtype, shape):
+        """Open an existing .npy file for shared read/write access, or create it zero-filled."""
+        if os.path.exists(path):
+            return np.lib.format.open_memmap(path, mode="r+")
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    def get(self, key_hash):
+        """
+        Look up a vector by key hash.
+        Returns:
+            np.ndarray or None: A private copy of the vector, or None on a miss.
+        """
+        slot = key_hash % self.capacity
+        if self.keys[slot] != key_hash:
+            return None
+        vector = np.array(self.vectors[slot])
+        # Re-check the key: another process may have overwritten the slot while we copied it
+        if self.keys[slot] != key_hash:
+            return None
+        return vector
+
+    def put(self, key_hash, vector):
+        """Store a vector, clearing the key first so readers never see a half-written slot."""
+        slot = key_hash % self.capacity
+        self.keys[slot] = 0
+        self.vectors[slot] = vector
+        self.keys[slot] = key_hash
+
+    def flush(self):
+        """Write dirty pages back to disk."""
+        self.keys.flush()
+        self.vectors.flush()
+
+
+class EmbeddingCache:
+    """
+    Memoize an encode function on normalized query text.
+    Lookups go memory LRU -> disk tier (if configured) -> encode, and every level
+    that missed is filled on the way back.
+    """
+
+    def __init__(self, encode, max_entries=4096, disk_dir=None, dim=None, disk_capacity=65536, namespace=""):
+        self._encode = encode
+        self.max_entries = max_entries
+        self.namespace = namespace  # e.g. the model name, so different models never share entries
+        self._entries = OrderedDict()
+        # The disk tier needs the embedding dimension up front to size its table
+        self._disk = DiskEmbeddingTier(disk_dir, dim, disk_capacity) if disk_dir else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, vector):
+        """Insert into the in-memory LRU, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def encode(self, text):
+        """
+        Return the embedding for a query, computing it only on a full cache miss.
+        Args:
+            text (str): Query text.
+        Returns:
+            np.ndarray: Read-only float32 embedding (shared between callers, do not modify).
+        """
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        key_hash = _key_hash(self.namespace, key)
+        if self._disk is not None:
+            vector = self._disk.get(key_hash)
+            if vector is not None:
+                vector.setflags(write=False)
+                self._remember(key, vector)
+                with self._lock:
+                    self.disk_hits += 1
+                return vector
+
+        vector = np.asarray(self._encode(key), dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self.misses += 1
+        if self._disk is not None:
+            self._disk.put(key_hash, vector)
+        self._remember(key, vector)
+        return vector
+
+    def encode_many(self, texts):
+        """
+        Batch version of encode: every text that misses both cache levels is encoded
+        in one call to the encode function (which must accept a list of texts).
+        Args:
+            texts (list): Query texts.
+        Returns:
+            list: Read-only float32 embeddings, in the same order as texts.
+        """
+        keys = [normalize_query(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            memory_hits = sum(1 for key in keys if key in found)
+            self.hits += memory_hits
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))  # Unique, in order
+        if self._disk is not None:
+            for key in list(missing):
+                vector = self._disk.get(_key_hash(self.namespace, key))
+                if vector is not None:
+                    vector.setflags(write=False)
+                    self._remember(key, vector)
+                    found[key] = vector
+                    missing.remove(key)
+            with self._lock:
+                self.disk_hits += sum(1 for key in keys if key in found) - memory_hits
+
+        if missing:
+            vectors = np.asarray(self._encode(missing), dtype=np.float32).reshape(len(missing), -1)
+            for key, vector in zip(missing, vectors):
+                vector = vector.copy()  # Own buffer per entry, so one eviction frees its memory
+                vector.setflags(write=False)
+                if self._disk is not None:
+                    self._disk.put(_key_hash(self.namespace, key), vector)
+                self._remember(key, vector)
+                found[key] = vector
+            with self._lock:
+                self.misses += len(missing)
+        return [found[key] for key in keys]
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+        Returns:
+            dict: Entry count, hit/miss counters and the overall hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,144 @@
+# Multi-process embedding service for ingestion and bulk encoding
+# A single SentenceTransformer in the calling thread keeps one core busy. EmbeddingPool shards
+# the texts into chunks and encodes them in worker processes that each load their own copy of
+# the model, keeping at most `max_in_flight` chunks queued (backpressure for large inputs) and
+# returning the embeddings in input order. It has the SentenceTransformer encode interface,
+# so it can replace `model` wherever a batch of texts is encoded.
+import functools  # For picklable model factories
+import logging  # For reporting the pool size
+import multiprocessing  # For the worker start method
+import os  # For the CPU count
+from collections import deque  # Chunks in flight, oldest first
+from concurrent.futures import ProcessPoolExecutor  # Worker processes
+
+import numpy as np  # For assembling the embedding matrix
+
+# Model held by each worker process, loaded once by _init_worker
+_worker_model = None
+
+
+def load_sentence_transformer(model_name):
+    """Model factory used by the pool workers (importable, so it can be sent to spawned processes)."""
+    from sentence_transformers import SentenceTransformer  # For generating embeddings from text
+    return SentenceTransformer(model_name)
+
+
+def _init_worker(model_factory, threads):
+    """Load the model once per worker process, limiting its intra-op threads to its share of the cores."""
+    global _worker_model
+    try:
+        import torch  # Only present with the real model
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = model_factory()
+
+
+def _encode_chunk(texts, batch_size, kwargs):
+    """Encode one chunk in a worker process."""
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size, **kwargs), dtype=np.float32)
+
+
+def _dimension():
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+class EmbeddingPool:
+    """
+    Encode texts in parallel worker processes, each with its own model.
+    Args:
+        model_factory (callable): Picklable zero-argument callable that loads the model in a worker,
+            e.g. functools.partial(load_sentence_transformer, config.EMBEDDING_MODEL_NAME).
+        workers (int): Number of worker processes (default: one per core).
+        chunk_size (int): Texts sent to a worker at a time.
+        max_in_flight (int): Chunks submitted but not yet collected (default: 2 per worker).
+        local_model: Optional model in this process; inputs smaller than `min_parallel` texts
+            (e.g. single queries) are encoded with it instead of paying the round trip to a worker.
+        min_parallel (int): Smallest input sent to the workers when a local model is available.
+        start_method (str): multiprocessing start method ("spawn" is safe with torch and open clients).
+    """
+
+    def __init__(self, model_factory, workers=None, chunk_size=64, max_in_flight=None, local_model=None,
+                 min_parallel=32, start_method="spawn"):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.local_model = local_model
+        self.min_parallel = min_parallel
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(model_factory, threads),
+        )
+        self._dim = None
+        logging.info(f"Embedding pool: {self.workers} worker processes, {threads} thread(s) each, "
+                     f"chunks of {self.chunk_size}, at most {self.max_in_flight} in flight.")
+
+    @classmethod
+    def for_model(cls, model_name, **kwargs):
+        """Pool of SentenceTransformer workers for a model name."""
+        return cls(functools.partial(load_sentence_transformer, model_name), **kwargs)
+
+    def get_sentence_embedding_dimension(self):
+        """Embedding dimension, like SentenceTransformer (asks a worker if there is no local model)."""
+        if self._dim is None:
+            if self.local_model is not None:
+                self._dim = self.local_model.get_sentence_embedding_dimension()
+            else:
+                self._dim = self._executor.submit(_dimension).result()
+        return self._dim
+
+    def warm_up(self):
+        """Start every worker process and load its model with one tiny chunk per worker."""
+        futures = [self._executor.submit(_encode_chunk, ["warm up query"], 1, {}) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def encode_iter(self, texts, batch_size=32, **kwargs):
+        """
+        Encode an iterable of texts chunk by chunk, yielding each chunk's embeddings in input order.
+        At most `max_in_flight` chunks are pending at a time, so a long (or lazily produced)
+        input is consumed only as fast as the workers keep up.
+        Args:
+            texts (iterable): Texts to encode.
+            batch_size (int): Model batch size inside each worker.
+        Yields:
+            np.ndarray: float32 embeddings of shape (chunk length, dim).
+        """
+        pending = deque()
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) == self.chunk_size:
+                if len(pending) >= self.max_in_flight:
+                    yield pending.popleft().result()  # Wait for the oldest chunk before queueing more
+                pending.append(self._executor.submit(_encode_chunk, chunk, batch_size, kwargs))
+                chunk = []
+        if chunk:
+            pending.append(self._executor.submit(_encode_chunk, chunk, batch_size, kwargs))
+        while pending:
+            yield pending.popleft().result()
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode a text or a list of texts, like SentenceTransformer.encode.
+        Args:
+            sentences (str or list): Text(s) to encode.
+            batch_size (int): Model batch size inside each worker.
+        Returns:
+            np.ndarray: float32 embedding of shape (dim,) for a string, (len(sentences), dim) for a list.
+        """
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size, **kwargs)[0]
+        if self.local_model is not None and len(sentences) < self.min_parallel:
+            return np.asarray(self.local_model.encode(sentences, batch_size=batch_size, **kwargs), dtype=np.float32)
+        chunks = list(self.encode_iter(sentences, batch_size, **kwargs))
+        if not chunks:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.concatenate(chunks)
+
+    def close(self):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=True)
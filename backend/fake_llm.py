@@ -0,0 +1,72 @@
+# Deterministic local stand-in for the Groq LLM
+# Select it with LLM_BACKEND=fake (or generator.set_llm_backend(FakeLLM())) to run the
+# service, tests and benchmarks without network access or an API key. It can also be made slow
+# or failing (all the time or for a fraction of calls) to exercise the LLM deadline, hedging
+# and circuit breaker in generator.py.
+import random  # For simulating intermittent slowness and failures
+import threading  # For counting calls from concurrent requests
+import time  # For simulating generation latency
+
+
+class FakeLLM:
+    """
+    Fake LLM that answers every prompt with a fixed template.
+    Args:
+        token_delay (float): Seconds to sleep before each streamed token (and per token
+            for non-streaming calls), to simulate generation speed.
+        reply (str): Response template; `{prompt}` is replaced with the first prompt line.
+        latency (float): Seconds to wait before answering (before the first streamed token).
+        slow_rate (float): Fraction of calls that wait `slow_latency` seconds more (tail latency).
+        slow_latency (float): Extra wait of the slow calls.
+        failure_rate (float): Fraction of calls that raise RuntimeError after the latency.
+        seed (int): Seed for choosing the slow and failing calls.
+    The attributes can be changed between calls, e.g. to make a failing fake recover.
+    """
+
+    def __init__(self, token_delay=0.0, reply="Here are my picks based on: {prompt}", latency=0.0,
+                 slow_rate=0.0, slow_latency=0.0, failure_rate=0.0, seed=0):
+        self.token_delay = token_delay
+        self.reply = reply
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.failure_rate = failure_rate
+        self.calls = 0  # Number of prompts answered, for asserting on upstream traffic
+        self.failures = 0  # Number of calls that raised
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _start_call(self):
+        """Count the call, then simulate its latency and (maybe) fail it."""
+        with self._lock:
+            self.calls += 1
+            slow = self._random.random() < self.slow_rate
+            fail = self._random.random() < self.failure_rate
+        delay = self.latency + (self.slow_latency if slow else 0.0)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.failures += 1
+            raise RuntimeError("FakeLLM: simulated upstream failure")
+
+    def _tokens(self, prompt):
+        first_line = next((line.strip() for line in prompt.splitlines() if line.strip()), "")
+        words = self.reply.format(prompt=first_line).split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def converse(self, prompt):
+        """Return the whole response at once, like converse_with_llm."""
+        self._start_call()
+        tokens = self._tokens(prompt)
+        if self.token_delay:
+            time.sleep(self.token_delay * len(tokens))
+        return "".join(tokens)
+
+    def stream(self, prompt):
+        """Yield the response token by token, like stream_llm."""
+        self._start_call()
+        for token in self._tokens(prompt):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield token
@@ -1,52 +1,234 @@
-# Import the Groq client library to interact with the Groq API
-from groq import Groq
-from apiKey import GROQ_API_KEY
+import itertools  # For putting the first streamed chunk back in front of the rest
+import time  # For LLM latency metrics
 
-# Initialize the Groq client
-client = Groq(api_key=GROQ_API_KEY)
+import config  # Runtime settings (LLM backend selection, deadlines and circuit breaker)
+from llm_guard import CircuitBreaker, CircuitOpenError, LLMTimeout, call_with_deadline  # Tail-latency protection
+from metrics import LLM_CALLS, LLM_HEDGES, LLM_SECONDS, LLM_TOKENS  # LLM token/latency metrics
 
-# Function to converse with a large language model (LLM) for movie recommendations
-def converse_with_llm(prompt):
-    """
-    This function sends a prompt to a large language model (LLM) via the Groq API
-    and retrieves a response. The LLM is configured to act as a movie recommendation assistant.
+# Groq client, created on first use so the fake backend never needs an API key
+client = None
 
-    Args:
-        prompt (str): The user's input or question, e.g., "Recommend me a comedy movie."
+# Optional replacement backend (an object with `converse(prompt)` and `stream(prompt)`)
+llm_backend = None
 
-    Returns:
-        str: The response generated by the LLM, which could be a movie recommendation or related information.
+# Circuit breaker shared by every LLM call (replace it to apply new settings)
+breaker = CircuitBreaker(
+    failure_threshold=config.LLM_BREAKER_FAILURES,
+    slow_call_seconds=config.LLM_BREAKER_SLOW_SECONDS,
+    reset_seconds=config.LLM_BREAKER_RESET_SECONDS,
+)
+
+def set_llm_backend(backend):
+    """
+    Route every LLM call to a replacement backend, e.g. fake_llm.FakeLLM in tests.
+    Args:
+        backend: Object with `converse(prompt)` and `stream(prompt)` methods, or None for Groq.
     """
-    
-    # Create a chat completion request using the Groq client
-    chat_completion = client.chat.completions.create(
+    global llm_backend
+    llm_backend = backend
+
+def get_llm_backend():
+    """Return the replacement backend, creating the fake one when LLM_BACKEND=fake."""
+    global llm_backend
+    if llm_backend is None and config.LLM_BACKEND == "fake":
+        from fake_llm import FakeLLM  # Only needed when running without Groq
+        llm_backend = FakeLLM()
+    return llm_backend
+
+def get_client():
+    """Return the Groq client, creating it on first use."""
+    global client
+    if client is None:
+        # Import the Groq client library here so importing this module stays cheap
+        from groq import Groq
+        from apiKey import GROQ_API_KEY
+        # Bound every HTTP request, so attempts abandoned at the deadline do not hold a thread forever
+        client = Groq(api_key=GROQ_API_KEY, timeout=config.LLM_TIMEOUT_SECONDS or None)
+    return client
+
+# Function to create a chat completion request for a movie recommendation prompt
+def _create_chat_completion(prompt, stream, timeout=None):
+    # Per-request HTTP timeout; None would disable it, so only pass a real budget
+    options = {"timeout": timeout} if timeout else {}
+    return get_client().chat.completions.create(
         messages=[
             # System message to set the context for the LLM
             {"role": "system", "content": "You are a movie recommendation assistant."},
-            
+
             # User message containing the input prompt
             {"role": "user", "content": prompt},
         ],
-        
+
         #FINETUNING
         # Specify the model to use for generating responses
         model="llama-3.3-70b-versatile",
-        
+
         # Control the randomness of the output (higher values make it more creative)
         temperature=0.7,
-        
+
         # Limit the maximum number of tokens in the response
         max_tokens=1024,
-        
+
         # Use nucleus sampling to control diversity of the output
         top_p=1,
-        
+
         # Optionally specify stop sequences to end the response early (None means no stop sequence)
         stop=None,
-        
-        # Disable streaming of the response (stream=False means the entire response is returned at once)
-        stream=False,
+
+        # stream=False returns the entire response at once; stream=True yields chunks as they are generated
+        stream=stream,
+        **options,
     )
-    
-    # Extract and return the content of the first response choice
-    return chat_completion.choices[0].message.content
\ No newline at end of file
+
+# Function to record token counts and latency of a finished LLM call
+def _record_llm_call(mode, start, prompt, completion_tokens, usage=None):
+    """
+    Args:
+        mode (str): "complete" or "stream".
+        start (float): time.perf_counter() when the call started.
+        prompt (str): Prompt sent, for estimating prompt tokens without usage data.
+        completion_tokens (int): Estimated completion tokens (words or streamed chunks).
+        usage: Usage object reported by Groq (prompt_tokens / completion_tokens), if any.
+    """
+    LLM_SECONDS.observe(time.perf_counter() - start, mode=mode, phase="total")
+    LLM_CALLS.inc(mode=mode, outcome="ok")
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens, kind="completion")
+    else:
+        LLM_TOKENS.inc(len(prompt.split()), kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, kind="completion")
+
+# Function to turn a requested LLM budget into the deadline actually enforced
+def llm_budget(timeout=None):
+    """
+    Args:
+        timeout (float): Seconds the caller can wait, or None for the configured deadline.
+    Returns:
+        float: Seconds until the deadline (capped at LLM_TIMEOUT_SECONDS), or None for no deadline.
+    """
+    if timeout is None or timeout <= 0:
+        return config.LLM_TIMEOUT_SECONDS or None
+    return min(timeout, config.LLM_TIMEOUT_SECONDS) if config.LLM_TIMEOUT_SECONDS else timeout
+
+# Function to make one (unguarded) non-streaming LLM call
+def _converse_once(prompt, timeout=None):
+    start = time.perf_counter()
+    try:
+        backend = get_llm_backend()
+        if backend is not None:
+            content, usage = backend.converse(prompt), None
+        else:
+            chat_completion = _create_chat_completion(prompt, stream=False, timeout=timeout)
+            # Extract the content of the first response choice
+            content, usage = chat_completion.choices[0].message.content, getattr(chat_completion, "usage", None)
+    except Exception:
+        LLM_CALLS.inc(mode="complete", outcome="error")
+        raise
+    _record_llm_call("complete", start, prompt, len((content or "").split()), usage)
+    return content
+
+# Function to converse with a large language model (LLM) for movie recommendations
+def converse_with_llm(prompt, timeout=None):
+    """
+    This function sends a prompt to a large language model (LLM) via the Groq API
+    and retrieves a response. The LLM is configured to act as a movie recommendation assistant.
+    The call is abandoned at the deadline, hedged with a second attempt when LLM_HEDGE_AFTER_SECONDS
+    is set, and not attempted at all while the circuit breaker is open.
+
+    Args:
+        prompt (str): The user's input or question, e.g., "Recommend me a comedy movie."
+        timeout (float): Seconds the caller can wait (default and cap: LLM_TIMEOUT_SECONDS).
+
+    Returns:
+        str: The response generated by the LLM, which could be a movie recommendation or related information.
+
+    Raises:
+        CircuitOpenError: The breaker is open after repeated failed or slow calls.
+        LLMTimeout: No attempt answered before the deadline.
+    """
+    timeout = llm_budget(timeout)
+    if not breaker.allow():
+        LLM_CALLS.inc(mode="complete", outcome="rejected")
+        raise CircuitOpenError("LLM circuit breaker is open")
+    start = time.perf_counter()
+    try:
+        content = call_with_deadline(
+            lambda: _converse_once(prompt, timeout), timeout,
+            hedge_after=config.LLM_HEDGE_AFTER_SECONDS, on_hedge=LLM_HEDGES.inc,
+        )
+    except LLMTimeout:
+        LLM_CALLS.inc(mode="complete", outcome="timeout")
+        breaker.record_failure()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success(time.perf_counter() - start)
+    return content
+
+# Marks the end of a stream that produced no chunk at all
+_END_OF_STREAM = object()
+
+# Function to stream the LLM response token by token
+def stream_llm(prompt, timeout=None):
+    """
+    Streaming version of converse_with_llm.
+    The deadline applies to the first chunk (once tokens reach the client the stream is not cut
+    short); streams are not hedged.
+
+    Args:
+        prompt (str): The prompt to send to the LLM.
+        timeout (float): Seconds to wait for the first chunk (default and cap: LLM_TIMEOUT_SECONDS).
+
+    Yields:
+        str: Pieces of the response text as soon as the LLM produces them.
+
+    Raises:
+        CircuitOpenError: The breaker is open after repeated failed or slow calls.
+        LLMTimeout: The first chunk did not arrive before the deadline.
+    """
+    timeout = llm_budget(timeout)
+    if not breaker.allow():
+        LLM_CALLS.inc(mode="stream", outcome="rejected")
+        raise CircuitOpenError("LLM circuit breaker is open")
+    start = time.perf_counter()
+    chunks, usage = 0, None
+    try:
+        backend = get_llm_backend()
+
+        def open_stream():
+            # Send the request and wait for the first chunk on an attempt thread
+            if backend is not None:
+                pieces = iter(backend.stream(prompt))
+            else:
+                pieces = iter(_create_chat_completion(prompt, stream=True, timeout=timeout))
+            return pieces, next(pieces, _END_OF_STREAM)
+
+        pieces, first = call_with_deadline(open_stream, timeout)
+        if first is not _END_OF_STREAM:
+            pieces = itertools.chain([first], pieces)
+        for chunk in pieces:
+            if backend is None:
+                # Groq reports usage on the last chunk (x_groq.usage)
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                chunk = chunk.choices[0].delta.content if chunk.choices else None
+            if not chunk:
+                continue
+            if chunks == 0:
+                time_to_first_token = time.perf_counter() - start
+                LLM_SECONDS.observe(time_to_first_token, mode="stream", phase="time_to_first_token")
+                breaker.record_success(time_to_first_token)
+            chunks += 1
+            yield chunk
+    except LLMTimeout:
+        LLM_CALLS.inc(mode="stream", outcome="timeout")
+        breaker.record_failure()
+        raise
+    except Exception:
+        LLM_CALLS.inc(mode="stream", outcome="error")
+        breaker.record_failure()
+        raise
+    if chunks == 0:
+        breaker.record_success(time.perf_counter() - start)
+    _record_llm_call("stream", start, prompt, chunks, usage)
@@ -0,0 +1,46 @@
+# Keyword extraction for user queries with a lean spaCy pipeline
+# Only noun chunks, coarse POS tags and stop words are used, so the named-entity
+# recognizer and the lemmatizer are never loaded.
+
+# Pipeline components that keyword extraction does not need:
+#   "ner"        - named entities are never read
+#   "lemmatizer" - keywords use the surface text, not lemmas
+# tok2vec + tagger + parser produce POS tags and noun chunks; attribute_ruler maps tags to token.pos_
+SPACY_EXCLUDED_COMPONENTS = ["ner", "lemmatizer"]
+
+# Coarse POS tags kept as single-word keywords
+KEYWORD_POS_TAGS = {"NOUN", "PROPN", "ADJ"}
+
+
+def load_nlp(model_name="en_core_web_sm", lean=True):
+    """
+    Load the spaCy model used for query processing.
+    Args:
+        model_name (str): Installed spaCy model package.
+        lean (bool): Leave out the components keyword extraction does not use.
+    Returns:
+        spacy.Language: Loaded pipeline.
+    """
+    import spacy  # Imported here so importing this module stays cheap until the model is needed
+    return spacy.load(model_name, exclude=SPACY_EXCLUDED_COMPONENTS if lean else [])
+
+
+def extract_keywords(doc):
+    """
+    Extract keywords from a processed query.
+    Args:
+        doc (spacy.tokens.Doc): Query processed by the spaCy pipeline.
+    Returns:
+        list: Unique keywords (noun chunks, then nouns/proper nouns/adjectives that are
+            not stop words), in order of first appearance.
+    """
+    keywords = [
+        chunk.text.lower() for chunk in doc.noun_chunks  # Extract noun chunks
+    ] + [
+        token.text.lower()
+        for token in doc
+        if token.pos_ in KEYWORD_POS_TAGS and not token.is_stop  # Extract nouns, proper nouns, and adjectives, excluding stopwords
+    ]
+    # dict.fromkeys de-duplicates like set() but keeps a stable order, so the joined
+    # keyword string (and its cached embedding) is identical across processes
+    return list(dict.fromkeys(keywords))
@@ -0,0 +1,317 @@
+# Precomputed movie-to-movie nearest-neighbour graph for "more like this"
+# An offline job scores every movie against every other one with blocked matrix multiplication
+# (a block of query rows against a block of columns at a time, keeping a running top-k), so
+# memory stays bounded by the block sizes instead of growing with the catalog squared.
+# The graph is a directory of .npy files:
+#   manifest.json        - format version, k and movie count
+#   neighbours.npy       - (count, k) int32 neighbour rows, best first (-1 pads short lists)
+#   scores.npy           - (count, k) float16 cosine similarities
+#   tmdb_ids.npy         - int64 TMDb id of every row
+#   fingerprints.npy     - uint64 hash of every row's embedding, to detect re-embedded movies
+#   id_map.keys.npy      - id map: sorted tmdb_ids and the row of each, for binary-search lookups
+#   id_map.rows.npy
+# Serving a movie's neighbours is then a binary search plus reading k entries.
+# Usage (from backend/):
+#   python knn_graph.py build knn_graph      # full rebuild from the movies collection
+#   python knn_graph.py refresh knn_graph    # recompute only what new / re-embedded movies affect
+import argparse  # For the command line interface
+import hashlib  # For the embedding fingerprints
+import json  # For the manifest
+import logging  # For reporting build progress
+import os  # For file paths
+import time  # For timings
+
+import numpy as np  # For the blocked similarity computation and the graph files
+
+from quantization import embedding_to_array  # Reads both stored embedding formats
+from snapshot import replace_directory  # Directory swap shared with catalog snapshots
+from vector_index import normalize_rows  # Cosine similarity as a dot product
+
+# Bumped whenever the file layout changes; graphs of another version are rebuilt
+KNN_GRAPH_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def _merge_top_k(rows_a, scores_a, rows_b, scores_b, k):
+    """Keep the k best of two candidate sets per query row (both of shape (n_queries, *))."""
+    rows = np.concatenate([rows_a, rows_b], axis=1)
+    scores = np.concatenate([scores_a, scores_b], axis=1)
+    if scores.shape[1] > k:
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rows = np.take_along_axis(rows, best, axis=1)
+        scores = np.take_along_axis(scores, best, axis=1)
+    return rows, scores
+
+
+def top_k_neighbours(queries, vectors, k, query_rows=None, columns=None, block_size=2048,
+                     initial=None):
+    """
+    Top-k most similar rows of `vectors` for every query, computed block by block.
+    Args:
+        queries (np.ndarray): Unit-length query vectors of shape (n_queries, dim).
+        vectors (np.ndarray): Unit-length candidate vectors of shape (n, dim).
+        k (int): Neighbours per query.
+        query_rows (np.ndarray): Row of each query in `vectors`, excluded from its own neighbours.
+        columns (np.ndarray): Candidate rows to score (all rows by default).
+        block_size (int): Queries and candidates per matrix multiply; the score block is
+            block_size x block_size floats.
+        initial (tuple): Optional (rows, scores) candidates to merge with, e.g. a previous list.
+    Returns:
+        tuple: (int32 rows, float32 scores), each (n_queries, k), best first; -1 / -inf pad
+            queries with fewer than k candidates.
+    """
+    n_queries = len(queries)
+    columns = np.arange(len(vectors)) if columns is None else np.asarray(columns)
+    out_rows = np.full((n_queries, k), -1, dtype=np.int32)
+    out_scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+    for start in range(0, n_queries, block_size):
+        block = np.asarray(queries[start:start + block_size], dtype=np.float32)
+        if initial is not None:
+            best_rows = initial[0][start:start + block_size].astype(np.int64)
+            best_scores = initial[1][start:start + block_size].astype(np.float32)
+        else:
+            best_rows = np.empty((len(block), 0), dtype=np.int64)
+            best_scores = np.empty((len(block), 0), dtype=np.float32)
+        for col_start in range(0, len(columns), block_size):
+            cols = columns[col_start:col_start + block_size]
+            scores = block @ np.asarray(vectors[cols], dtype=np.float32).T  # (block, cols)
+            if query_rows is not None:
+                scores[query_rows[start:start + block_size, None] == cols[None, :]] = -np.inf  # Not itself
+            candidates = np.broadcast_to(cols, scores.shape)
+            best_rows, best_scores = _merge_top_k(best_rows, best_scores, candidates, scores, k)
+        # Order each row best first and drop the -inf placeholders
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_rows = np.take_along_axis(best_rows, order, axis=1)[:, :k]
+        best_scores = np.take_along_axis(best_scores, order, axis=1)[:, :k]
+        best_rows = np.where(np.isfinite(best_scores), best_rows, -1)
+        out_rows[start:start + len(block), :best_rows.shape[1]] = best_rows
+        out_scores[start:start + len(block), :best_scores.shape[1]] = best_scores
+    return out_rows, out_scores
+
+
+def fingerprint(vector):
+    """64-bit hash of an embedding, so a refresh can tell which movies were re-embedded."""
+    return int.from_bytes(hashlib.blake2b(np.ascontiguousarray(vector).tobytes(), digest_size=8).digest(), "little")
+
+
+def load_embeddings(collection):
+    """
+    Load the TMDb ids and unit-length embeddings of every embedded movie.
+    Returns:
+        tuple: (int64 tmdb_ids, float32 vectors of shape (n, dim)).
+    """
+    query = {"movie_embedding": {"$exists": True}, "tmdb_id": {"$exists": True}}
+    expected = collection.count_documents(query)
+    tmdb_ids, vectors = np.empty(expected, dtype=np.int64), None
+    count = 0
+    for doc in collection.find(query, {"tmdb_id": 1, "movie_embedding": 1}):
+        vector = embedding_to_array(doc["movie_embedding"])
+        if vectors is None:
+            vectors = np.empty((expected, vector.shape[0]), dtype=np.float32)
+        if count == expected:
+            logging.warning("Movies were added while loading embeddings; the newest are skipped.")
+            break
+        vectors[count] = vector
+        tmdb_ids[count] = doc["tmdb_id"]
+        count += 1
+    if vectors is None:
+        raise ValueError("No movie embeddings found to build a kNN graph")
+    return tmdb_ids[:count], normalize_rows(vectors[:count])
+
+
+def save_knn_graph(path, tmdb_ids, neighbours, scores, fingerprints):
+    """Write a graph directory next to `path` and swap it into place."""
+    staging = f"{path}.tmp"
+    os.makedirs(staging, exist_ok=True)
+    order = np.argsort(tmdb_ids, kind="stable")
+    arrays = {
+        "neighbours.npy": neighbours.astype(np.int32),
+        "scores.npy": np.where(np.isfinite(scores), scores, 0.0).astype(np.float16),
+        "tmdb_ids.npy": tmdb_ids.astype(np.int64),
+        "fingerprints.npy": fingerprints.astype(np.uint64),
+        "id_map.keys.npy": tmdb_ids[order],
+        "id_map.rows.npy": order,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, name), array)
+    manifest = {"version": KNN_GRAPH_VERSION, "k": neighbours.shape[1], "count": len(tmdb_ids),
+                "created_at": time.time()}
+    with open(os.path.join(staging, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    replace_directory(staging, path)
+    return manifest
+
+
+class KnnGraph:
+    """
+    Read-only neighbour graph, memory-mapped.
+    Args:
+        path (str): Graph directory written by build_knn_graph / refresh_knn_graph.
+    Raises:
+        ValueError: If the graph was written with another format version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        manifest_path = os.path.join(path, MANIFEST)
+        self.mtime = os.path.getmtime(manifest_path)
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != KNN_GRAPH_VERSION:
+            raise ValueError(f"Unsupported kNN graph version {self.manifest.get('version')} in {path}; rebuild it")
+        self.k = self.manifest["k"]
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r").view(np.ndarray)  # noqa: E731
+        self.neighbours = load("neighbours.npy")
+        self.scores = load("scores.npy")
+        self.tmdb_ids = load("tmdb_ids.npy")
+        self.fingerprints = load("fingerprints.npy")
+        self._keys = load("id_map.keys.npy")
+        self._rows = load("id_map.rows.npy")
+
+    def __len__(self):
+        return len(self.tmdb_ids)
+
+    def row_for_tmdb_id(self, tmdb_id):
+        """Row of a movie (binary search over the id map), or None if it is not in the graph."""
+        position = int(np.searchsorted(self._keys, tmdb_id))
+        if position < len(self._keys) and self._keys[position] == tmdb_id:
+            return int(self._rows[position])
+        return None
+
+    def rows_for_tmdb_ids(self, tmdb_ids):
+        """Vectorized row_for_tmdb_id: int64 rows, -1 for movies not in the graph."""
+        positions = np.minimum(np.searchsorted(self._keys, tmdb_ids), max(len(self._keys) - 1, 0))
+        found = (self._keys[positions] == tmdb_ids) if len(self._keys) else np.zeros(len(tmdb_ids), dtype=bool)
+        return np.where(found, self._rows[positions], -1).astype(np.int64)
+
+    def similar(self, tmdb_id, limit=None):
+        """
+        Args:
+            tmdb_id (int): TMDb id of the movie.
+            limit (int): Maximum number of neighbours (all k by default).
+        Returns:
+            list or None: (tmdb_id, cosine similarity) pairs, best first; None for unknown movies.
+        """
+        row = self.row_for_tmdb_id(tmdb_id)
+        if row is None:
+            return None
+        neighbours, scores = self.neighbours[row, :limit], self.scores[row, :limit]
+        return [(int(self.tmdb_ids[n]), float(s)) for n, s in zip(neighbours, scores) if n >= 0]
+
+
+def _pair_scores(vectors, neighbours, block_size=2048):
+    """Similarity of every row with each of its listed neighbours (-1 entries score -inf), in row blocks."""
+    scores = np.full(neighbours.shape, -np.inf, dtype=np.float32)
+    for start in range(0, len(neighbours), block_size):
+        block = neighbours[start:start + block_size]
+        pairs = np.einsum("id,ikd->ik", vectors[start:start + block_size], vectors[np.maximum(block, 0)])
+        scores[start:start + block_size] = np.where(block >= 0, pairs, -np.inf)
+    return scores
+
+
+def build_knn_graph(collection, path, k=20, block_size=2048):
+    """
+    Compute the top-k neighbours of every embedded movie and write the graph.
+    Args:
+        collection: MongoDB movies collection.
+        path (str): Graph directory (replaced if it exists).
+        k (int): Neighbours stored per movie.
+        block_size (int): Rows and columns per matrix multiply.
+    Returns:
+        dict: Manifest of the written graph.
+    """
+    start = time.perf_counter()
+    tmdb_ids, vectors = load_embeddings(collection)
+    rows = np.arange(len(vectors))
+    neighbours, scores = top_k_neighbours(vectors, vectors, k, query_rows=rows, block_size=block_size)
+    manifest = save_knn_graph(path, tmdb_ids, neighbours, scores, np.array([fingerprint(v) for v in vectors],
+                                                                             dtype=np.uint64))
+    logging.info(f"Built kNN graph over {len(vectors)} movies (k={k}) in {time.perf_counter() - start:.1f}s.")
+    return manifest
+
+
+def refresh_knn_graph(collection, path, k=20, block_size=2048, rebuild_fraction=0.25):
+    """
+    Bring the graph up to date after ingestion added or re-embedded movies.
+    Changed movies are found by comparing embedding fingerprints with the stored graph.
+    Their rows, and the rows whose neighbour list contained a changed or deleted movie,
+    are recomputed against the whole catalog; every other row only merges the changed
+    movies' scores into its list, which gives the same result as a full rebuild.
+    Args:
+        collection: MongoDB movies collection.
+        path (str): Graph directory (built from scratch if missing, outdated or of another k).
+        k (int): Neighbours stored per movie.
+        block_size (int): Rows and columns per matrix multiply.
+        rebuild_fraction (float): Rebuild everything when more than this fraction of rows must be recomputed.
+    Returns:
+        dict: {"movies", "changed", "recomputed", "merged"} row counts.
+    """
+    start = time.perf_counter()
+    try:
+        old = KnnGraph(path)
+    except (OSError, ValueError):
+        old = None
+    if old is None or old.k != k:
+        manifest = build_knn_graph(collection, path, k, block_size)
+        return {"movies": manifest["count"], "changed": manifest["count"], "recomputed": manifest["count"], "merged": 0}
+
+    tmdb_ids, vectors = load_embeddings(collection)
+    fingerprints = np.array([fingerprint(v) for v in vectors], dtype=np.uint64)
+    n = len(tmdb_ids)
+    # Old row -> new row (-1 for movies no longer in the collection) and the reverse
+    old_rows = old.rows_for_tmdb_ids(tmdb_ids)
+    old_to_new = np.full(len(old), -1, dtype=np.int64)
+    old_to_new[old_rows[old_rows >= 0]] = np.flatnonzero(old_rows >= 0)
+
+    changed = (old_rows < 0) | (fingerprints != np.where(old_rows >= 0, old.fingerprints[np.maximum(old_rows, 0)], 0))
+    changed_rows = np.flatnonzero(changed)
+    # Previous neighbour lists in new row numbers. A list must be recomputed if it held a
+    # deleted or padding entry (the catalog has grown since), or a changed movie whose new score
+    # may have fallen below the old k-th score (other movies could now beat it). The old k-th
+    # score is bounded above by the exact scores of the unchanged neighbours and the stored
+    # (float16) scores of the changed ones.
+    previous = np.where(old.neighbours[np.maximum(old_rows, 0)] >= 0,
+                        old_to_new[old.neighbours[np.maximum(old_rows, 0)]], -1)
+    stale = changed | (previous < 0).any(axis=1)
+    previous_scores = _pair_scores(vectors, previous, block_size)
+    previous_changed = changed[np.maximum(previous, 0)]
+    stored = np.asarray(old.scores[np.maximum(old_rows, 0)], dtype=np.float32) + 1e-3  # float16 rounding
+    kth_bound = np.where(previous_changed, stored, previous_scores).min(axis=1)
+    stale |= (previous_changed & (previous_scores < kth_bound[:, None])).any(axis=1)
+    recompute = np.flatnonzero(stale)
+    merge = np.flatnonzero(~stale)
+    if len(recompute) > rebuild_fraction * n:
+        build_knn_graph(collection, path, k, block_size)
+        return {"movies": n, "changed": int(changed.sum()), "recomputed": n, "merged": 0}
+
+    neighbours = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    if len(recompute):
+        neighbours[recompute], scores[recompute] = top_k_neighbours(
+            vectors[recompute], vectors, k, query_rows=recompute, block_size=block_size)
+    if len(merge):
+        # Exact float32 scores of the unchanged neighbours, then merge in every changed movie
+        kept = previous[merge]
+        kept_scores = np.where(previous_changed[merge], -np.inf, previous_scores[merge])
+        neighbours[merge], scores[merge] = top_k_neighbours(
+            vectors[merge], vectors, k, query_rows=merge, columns=changed_rows, block_size=block_size,
+            initial=(kept, kept_scores))
+    save_knn_graph(path, tmdb_ids, neighbours, scores, fingerprints)
+    logging.info(f"Refreshed kNN graph: {len(changed_rows)} changed movies, {len(recompute)} rows recomputed, "
+                 f"{len(merge)} merged in {time.perf_counter() - start:.1f}s.")
+    return {"movies": n, "changed": len(changed_rows), "recomputed": len(recompute), "merged": len(merge)}
+
+
+if __name__ == "__main__":
+    import config  # Graph size settings
+    import resources  # Shared MongoDB client
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build or refresh the movie-to-movie kNN graph.")
+    parser.add_argument("command", choices=["build", "refresh"])
+    parser.add_argument("path", nargs="?", default=config.KNN_GRAPH_PATH, help="Graph directory")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("a graph directory (or KNN_GRAPH_PATH) is required")
+    job = build_knn_graph if args.command == "build" else refresh_knn_graph
+    job(resources.get_movies_collection(), args.path, k=config.KNN_GRAPH_K, block_size=config.KNN_GRAPH_BLOCK_SIZE)
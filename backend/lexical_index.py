@@ -0,0 +1,190 @@
+# In-process lexical index over movie titles, overviews and genre names
+# BM25 scoring over an inverted index whose postings are stored as compact typed arrays
+# (uint32 row ids + float32 field-weighted term frequencies, one contiguous buffer per kind),
+# plus reciprocal rank fusion to merge lexical hits with vector search hits.
+import logging  # For reporting index build details
+import re  # For tokenizing text
+from array import array  # Compact postings storage
+
+import numpy as np  # For vectorized BM25 scoring
+
+from vector_index import PROJECTED_FIELDS, FilterColumns  # Result shape and pre-filter columns
+
+# Same token shape as the synonym matcher: "sci-fi" and "rom-com" stay single tokens
+_TOKEN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+# Very common English words that carry no retrieval signal
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has he her his in is it its of on or she that the their "
+    "they this to was were will with who when where which while into about after before".split()
+)
+
+# A term in the title counts this many times more than one in the overview
+FIELD_WEIGHTS = {"title": 3.0, "genre_names": 2.0, "overview": 1.0}
+
+
+def tokenize(text):
+    """
+    Args:
+        text (str): Text to tokenize.
+    Returns:
+        list: Lower-case tokens without stop words.
+    """
+    return [token for token in _TOKEN.findall((text or "").lower()) if token not in STOP_WORDS]
+
+
+class LexicalIndex:
+    """
+    BM25 over title, overview and genre names.
+    Postings of term t are row_ids[offsets[t]:offsets[t + 1]] with matching weighted
+    frequencies in term_freqs; both are typed arrays viewed as numpy arrays for scoring.
+    Args:
+        documents (list): Movie documents with the fields in FIELD_WEIGHTS and PROJECTED_FIELDS.
+        k1 (float): BM25 term-frequency saturation.
+        b (float): BM25 length normalization.
+        columns (FilterColumns): Prebuilt filter columns (built from the documents by default).
+    """
+
+    def __init__(self, documents, k1=1.2, b=0.75, columns=None):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.terms = {}  # Term -> term id
+        postings = []  # Term id -> {row: weighted frequency}, only while building
+        lengths = array("f")
+        for row, doc in enumerate(documents):
+            weighted = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                value = doc.get(field)
+                text = " ".join(value) if isinstance(value, list) else value
+                for token in tokenize(text):
+                    weighted[token] = weighted.get(token, 0.0) + weight
+            lengths.append(sum(weighted.values()))
+            for token, frequency in weighted.items():
+                term_id = self.terms.setdefault(token, len(self.terms))
+                if term_id == len(postings):
+                    postings.append({})
+                postings[term_id][row] = frequency
+
+        # Flatten the postings into three contiguous buffers (CSR layout)
+        self._row_ids = array("I")
+        self._term_freqs = array("f")
+        self._offsets = array("I", [0])
+        for term_postings in postings:
+            self._row_ids.extend(term_postings.keys())  # Rows were added in increasing order
+            self._term_freqs.extend(term_postings.values())
+            self._offsets.append(len(self._row_ids))
+        self.row_ids = np.frombuffer(self._row_ids, dtype=np.uint32) if len(self._row_ids) else np.empty(0, np.uint32)
+        self.term_freqs = np.frombuffer(self._term_freqs, dtype=np.float32) if len(self._term_freqs) else np.empty(0, np.float32)
+        self.offsets = np.frombuffer(self._offsets, dtype=np.uint32)
+        self.doc_lengths = np.frombuffer(lengths, dtype=np.float32) if len(lengths) else np.empty(0, np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(lengths) else 0.0
+        self.columns = columns if columns is not None else FilterColumns(documents)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def memory_bytes(self):
+        """Size of the postings, offsets and document lengths."""
+        return self.row_ids.nbytes + self.term_freqs.nbytes + self.offsets.nbytes + self.doc_lengths.nbytes
+
+    def postings(self, term):
+        """
+        Args:
+            term (str): Index term.
+        Returns:
+            tuple: (row ids, weighted frequencies) of the term (empty arrays if unknown).
+        """
+        term_id = self.terms.get(term)
+        if term_id is None:
+            return self.row_ids[:0], self.term_freqs[:0]
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.row_ids[start:end], self.term_freqs[start:end]
+
+    def scores(self, query):
+        """
+        BM25 score of every row for a query.
+        Returns:
+            np.ndarray: float32 scores (0 for rows without any query term).
+        """
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        n_docs = len(self.documents)
+        for term in set(tokenize(query)):
+            rows, frequencies = self.postings(term)
+            if not len(rows):
+                continue
+            idf = np.log(1.0 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[rows] / self.avg_length)
+            scores[rows] += idf * frequencies * (self.k1 + 1.0) / (frequencies + norm)  # Rows are unique per term
+        return scores
+
+    def search(self, query, limit=20, filters=None):
+        """
+        Retrieve the movies with the highest BM25 score that pass the filters.
+        Args:
+            query (str): Query text.
+            limit (int): Maximum number of results.
+            filters (dict): Optional filters from build_search_filters.
+        Returns:
+            list: Movie documents with PROJECTED_FIELDS, `_id` and `lexical_score`.
+        """
+        scores = self.scores(query)
+        if filters:
+            scores[~self.columns.mask(filters, self.documents)] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        results = []
+        for row in candidates:
+            doc = self.documents[row]
+            hit = {"_id": doc["_id"]}
+            hit.update({field: doc[field] for field in PROJECTED_FIELDS if field in doc})
+            hit["lexical_score"] = float(scores[row])
+            results.append(hit)
+        return results
+
+
+def reciprocal_rank_fusion(result_lists, limit=20, k=60):
+    """
+    Merge ranked result lists with reciprocal rank fusion: score(d) = sum over lists of 1 / (k + rank).
+    Args:
+        result_lists (list): Lists of documents with an `_id`, each ordered best first.
+        limit (int): Maximum number of fused results.
+        k (int): Rank offset; larger values flatten the contribution of the top ranks.
+    Returns:
+        list: Documents ordered by fused score; a document keeps the fields of the first
+            list it appears in (so vector hits keep their `score`) and gets `rrf_score`.
+    """
+    fused, scores = {}, {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc["_id"]
+            if key not in fused:
+                fused[key] = dict(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    ranked = sorted(fused, key=lambda key: -scores[key])[:limit]
+    for key in ranked:
+        fused[key]["rrf_score"] = scores[key]
+    return [fused[key] for key in ranked]
+
+
+def build_lexical_index_from_collection(collection):
+    """
+    Load the searchable fields of every movie from MongoDB and index them.
+    Args:
+        collection: MongoDB movies collection.
+    Returns:
+        LexicalIndex: Index ready to answer queries.
+    """
+    projection = {field: 1 for field in PROJECTED_FIELDS}
+    projection.update({field: 1 for field in FIELD_WEIGHTS})
+    projection.update({"genre_ids": 1, "origin.original_language": 1})  # Sources of the filter columns
+    documents = []
+    for doc in collection.find({}, projection):
+        doc["_id"] = str(doc["_id"])  # Match clean_document so results are JSON-serializable
+        documents.append(doc)
+    index = LexicalIndex(documents)
+    logging.info(f"Built lexical index over {len(index)} movies: {len(index.terms)} terms, "
+                 f"{index.memory_bytes() / 2**20:.1f} MiB postings.")
+    return index
@@ -0,0 +1,79 @@
+# Cache of LLM recommendations keyed on what the prompt actually contains
+# The key is the normalized query plus the set of retrieved titles, so spellings that
+# normalize to the same query ("Horror movies!" / "horror  movies") and retrieve the same
+# movies reuse one LLM answer even when the full result cache misses. Word order is kept:
+# "comedy not horror" and "horror not comedy" ask the LLM different questions.
+import hashlib  # For compact, stable keys
+import threading  # To make the LRU safe for threaded Flask workers
+import time  # For entry expiry
+from collections import OrderedDict  # Keeps entries in least-recently-used order
+
+from result_cache import canonical_query  # Same normalization as the result cache
+
+
+def llm_cache_key(query, similar_movies):
+    """
+    Args:
+        query (str): Raw user query.
+        similar_movies (list): Retrieved movies (only their titles matter).
+    Returns:
+        str: Hex digest of the normalized query and the sorted title set.
+    """
+    titles = sorted({movie.get("title", "") for movie in similar_movies})
+    payload = canonical_query(query) + "\0" + "\0".join(titles)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Bounded in-memory LRU of LLM responses with optional expiry.
+    Args:
+        max_entries (int): Size cap; the least recently used response is dropped beyond it.
+        ttl_seconds (float): Entry lifetime (0 keeps entries until they are evicted).
+    """
+
+    def __init__(self, max_entries=2048, ttl_seconds=0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # Key -> (stored at, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query, similar_movies):
+        """Return the cached response for this query and title set, or None."""
+        key = llm_cache_key(query, similar_movies)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query, similar_movies, response):
+        """Store a response, evicting the least recently used entries beyond the cap."""
+        key = llm_cache_key(query, similar_movies)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Entry count, hit/miss counters and the hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,173 @@
+# Tail-latency protection for LLM calls
+# call_with_deadline runs an LLM attempt on a worker thread and gives up once the caller's
+# deadline passes (the attempt is abandoned, not interrupted: the HTTP client's own timeout
+# ends it). With hedging, a second attempt starts when the first is still running after
+# `hedge_after` seconds (or fails early) and the first successful answer wins.
+# CircuitBreaker stops sending calls to an upstream that keeps failing or answering too slowly,
+# so requests fall back immediately instead of each waiting for the full deadline.
+import threading  # For the breaker state lock
+import time  # For deadlines and the breaker reset timer
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # LLM attempts on worker threads
+
+import config  # Runtime settings (attempt thread pool size)
+
+
+class LLMUnavailable(RuntimeError):
+    """The LLM could not answer within the request's budget."""
+    reason = "error"
+
+
+class LLMTimeout(LLMUnavailable):
+    """No attempt answered before the deadline."""
+    reason = "timeout"
+
+
+class CircuitOpenError(LLMUnavailable):
+    """The circuit breaker is open: the call was not attempted."""
+    reason = "circuit_open"
+
+
+# Threads running LLM attempts; abandoned attempts keep their thread until the client times out,
+# so the pool size also caps how many calls a hanging upstream can pile up
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.LLM_ATTEMPT_WORKERS, thread_name_prefix="llm")
+        return _executor
+
+
+def call_with_deadline(function, timeout=None, hedge_after=None, on_hedge=None):
+    """
+    Run function() and return its result, giving up after `timeout` seconds.
+    Args:
+        function (callable): One LLM attempt; must be safe to run twice concurrently when hedging.
+        timeout (float): Seconds until the deadline (None or 0: wait as long as it takes).
+        hedge_after (float): Start a second attempt when the first has not answered after this
+            many seconds, or as soon as it fails (None or 0: a single attempt).
+        on_hedge (callable): Called without arguments when the second attempt starts.
+    Returns:
+        The result of the first attempt that succeeds.
+    Raises:
+        LLMTimeout: No attempt succeeded before the deadline.
+        Exception: The last attempt's exception when every attempt failed before the deadline.
+    """
+    if not timeout and not hedge_after:
+        return function()  # Nothing to enforce: skip the thread hop
+    executor = _get_executor()
+    start = time.monotonic()
+    deadline = start + timeout if timeout else None
+    hedge_at = start + hedge_after if hedge_after else None
+    pending = {executor.submit(function)}
+    error = None
+    while pending:
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            break
+        # Wake up at the deadline or when the hedge is due, whichever comes first
+        wake_ups = [t for t in (deadline, hedge_at) if t is not None]
+        remaining = max(0.0, min(wake_ups) - now) if wake_ups else None
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()  # Only drops attempts still queued; a running one finishes in the background
+                return future.result()
+            error = future.exception()
+        if hedge_at is not None and (not pending or time.monotonic() >= hedge_at):
+            hedge_at = None  # At most one extra attempt
+            if on_hedge is not None:
+                on_hedge()
+            pending.add(executor.submit(function))
+    if pending:
+        for future in pending:
+            future.cancel()
+        raise LLMTimeout(f"LLM did not answer within {timeout:.2f}s")
+    raise error
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Closed: calls go through. After `failure_threshold` consecutive failed or slow calls it opens
+    and rejects calls for `reset_seconds`; then it is half-open and lets one trial call through,
+    closing again when the trial succeeds and reopening when it fails.
+    Args:
+        failure_threshold (int): Consecutive bad calls that open the breaker (0 disables it).
+        slow_call_seconds (float): Successful calls slower than this count as failures (0: never).
+        reset_seconds (float): Time the breaker stays open before allowing a trial call.
+        clock (callable): Monotonic clock in seconds, replaceable in tests.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, slow_call_seconds=0.0, reset_seconds=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0  # Consecutive bad calls
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.trial_started = 0.0
+        self.rejected = 0  # Calls refused while open
+        self.trips = 0  # Times the breaker opened
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns:
+            bool: True when a call may be sent now (counts as the trial call when half-open).
+        """
+        if not self.failure_threshold:
+            return True
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+            # A trial that never reported back (e.g. an abandoned stream) is replaced after reset_seconds
+            if self.state == self.HALF_OPEN and (
+                    not self.trial_in_flight or self.clock() - self.trial_started >= self.reset_seconds):
+                self.trial_in_flight = True
+                self.trial_started = self.clock()
+                return True
+            if self.state == self.CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, seconds=0.0):
+        """Record a finished call that took `seconds` (a slow success counts as a failure)."""
+        if self.slow_call_seconds and seconds > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self.failures = 0
+            self.trial_in_flight = False
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        """Record a failed or timed-out call."""
+        if not self.failure_threshold:
+            return
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.trips += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: state, consecutive failures, trips and rejected calls.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                state = self.HALF_OPEN  # Due for a trial call
+            return {"state": state, "failures": self.failures, "trips": self.trips, "rejected": self.rejected}
@@ -0,0 +1,179 @@
+# Prometheus metrics for the recommendation service
+# A small in-process registry of counters and histograms rendered in the Prometheus text
+# exposition format by GET /metrics. Counters kept elsewhere (cache hit/miss statistics)
+# are exported through collector callbacks that run at scrape time.
+import math  # For the +Inf bucket
+import threading  # Metrics are updated from concurrent request threads
+
+# Default latency buckets in seconds (5 ms .. 30 s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Current value for one label combination (0 if never incremented)."""
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # Label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, [("le", _format_value(bound))]), cumulative))
+            lines.append((f"{self.name}_sum", _format_labels(self.labelnames, key), series[-2]))
+            lines.append((f"{self.name}_count", _format_labels(self.labelnames, key), series[-1]))
+        return lines
+
+
+class Registry:
+    """Set of metrics and scrape-time collectors rendered together."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """
+        Register a callback run at scrape time.
+        Args:
+            collect (callable): Returns a list of (name, kind, documentation, [(labels dict, value)]).
+        """
+        self.collectors.append(collect)
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+        for collect in self.collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    rendered = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{rendered} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served by GET /metrics
+REGISTRY = Registry()
+
+# Query path stages timed by timing.span ("cache_read", "parse", "match", "encode", "search", "llm", "cache_write", ...)
+STAGE_SECONDS = REGISTRY.histogram(
+    "recommender_stage_duration_seconds", "Time spent in each stage of the query path.", ["stage"]
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "recommender_stage_errors_total", "Exceptions raised inside each stage of the query path.", ["stage"]
+)
+
+# HTTP requests, by route and status code
+REQUEST_SECONDS = REGISTRY.histogram(
+    "recommender_http_request_duration_seconds", "Time to produce an HTTP response.", ["endpoint"]
+)
+REQUESTS = REGISTRY.counter(
+    "recommender_http_requests_total", "HTTP requests served.", ["endpoint", "status"]
+)
+
+# LLM calls: latency split into time to first token and total generation time, plus token counts
+LLM_SECONDS = REGISTRY.histogram(
+    "recommender_llm_duration_seconds",
+    "LLM latency; phase is time_to_first_token (streaming only) or total.",
+    ["mode", "phase"],
+)
+LLM_CALLS = REGISTRY.counter(
+    "recommender_llm_calls_total",
+    "LLM calls by mode (complete/stream) and outcome (ok/error per attempt; timeout/rejected per guarded call).",
+    ["mode", "outcome"],
+)
+LLM_HEDGES = REGISTRY.counter(
+    "recommender_llm_hedged_calls_total", "Second LLM attempts started because the first was slow or failed."
+)
+LLM_FALLBACKS = REGISTRY.counter(
+    "recommender_llm_fallbacks_total",
+    "Recommendations answered with the templated explanation, by reason (timeout/circuit_open/error).",
+    ["reason"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "recommender_llm_tokens_total",
+    "LLM tokens by kind (prompt/completion); estimated from whitespace words when the backend reports no usage.",
+    ["kind"],
+)
@@ -0,0 +1,140 @@
+# Structured movie fields used to pre-filter vector searches
+# Ingestion stores an integer release year, a normalized original-language code and a
+# bitmask of TMDb genre ids on every movie, so filters can be evaluated inside the vector
+# search (Atlas "filter" / local index masks) instead of by a $match after it.
+
+# TMDb movie genre ids in bit order: genre_mask bit i is set when TMDB_GENRE_IDS[i] is in genre_ids
+TMDB_GENRE_IDS = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37]
+_GENRE_BITS = {genre_id: 1 << bit for bit, genre_id in enumerate(TMDB_GENRE_IDS)}
+
+# TMDb genre names (as returned by /genre/movie/list and stored in genre_names)
+TMDB_GENRE_NAMES = {
+    28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary",
+    18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music",
+    9648: "Mystery", 10749: "Romance", 878: "Science Fiction", 10770: "TV Movie", 53: "Thriller",
+    10752: "War", 37: "Western",
+}
+
+# GENRE_SYNONYMS labels -> the one TMDb genre each corresponds to (labels without one, like "spy",
+# stay soft). Synonyms such as "adventure" or "thriller" only steer the embedding, never the filter
+GENRE_LABEL_TMDB_IDS = {
+    "romance": 10749,
+    "action": 28,
+    "comedy": 35,
+    "horror": 27,
+    "sci-fi": 878,
+    "fantasy": 14,
+    "drama": 18,
+    "mystery": 9648,
+    "crime": 80,
+    "animation": 16,
+    "documentary": 99,
+    "war": 10752,
+    "history": 36,
+    "family": 10751,
+    "musical": 10402,
+    "western": 37,
+}
+
+# ORIGIN_SYNONYMS labels -> TMDb original_language codes (ISO 639-1, plus TMDb's "cn" for Cantonese)
+# "british" and "american" share "en", so they are left to the embedding instead of a filter
+ORIGIN_LANGUAGE_CODES = {
+    "korean": ["ko"],
+    "japanese": ["ja"],
+    "indonesian": ["id"],
+    "french": ["fr"],
+    "indian": ["hi", "ta", "te", "ml", "kn", "bn", "mr"],
+    "thai": ["th"],
+    "chinese": ["zh", "cn"],
+    "spanish": ["es"],
+    "german": ["de"],
+    "turkish": ["tr"],
+    "iranian": ["fa"],
+    "russian": ["ru"],
+    "philippine": ["tl"],
+}
+
+# Fields declared as "filter" paths in the Atlas vector index, next to the vector itself:
+#   {"fields": [{"type": "vector", "path": "movie_embedding", "numDimensions": 384, "similarity": "cosine"},
+#               {"type": "filter", "path": "release_year"}, {"type": "filter", "path": "vote_average"},
+#               {"type": "filter", "path": "vote_count"}, {"type": "filter", "path": "genre_ids"},
+#               {"type": "filter", "path": "origin_code"}]}
+FILTER_FIELDS = ["release_year", "vote_average", "vote_count", "genre_ids", "origin_code"]
+
+
+def release_year(release_date):
+    """
+    Args:
+        release_date (str): TMDb release date ("YYYY-MM-DD", possibly empty).
+    Returns:
+        int or None: Release year, or None when the date is missing or malformed.
+    """
+    if not release_date or len(release_date) < 4 or not release_date[:4].isdigit():
+        return None
+    return int(release_date[:4])
+
+
+def genre_mask(genre_ids):
+    """
+    Args:
+        genre_ids (list): TMDb genre ids.
+    Returns:
+        int: Bitmask over TMDB_GENRE_IDS (unknown ids are ignored).
+    """
+    mask = 0
+    for genre_id in genre_ids or []:
+        mask |= _GENRE_BITS.get(genre_id, 0)
+    return mask
+
+
+def origin_code(language):
+    """Normalize a TMDb original_language value ("KO", " ko") to a lower-case code, or None."""
+    language = (language or "").strip().lower()
+    return language or None
+
+
+def structured_fields(movie_doc):
+    """
+    Derive the pre-filter fields of a stored movie document.
+    Args:
+        movie_doc (dict): Movie document with release_date, genre_ids and, when known,
+            origin.original_language (or a top-level original_language).
+    Returns:
+        dict: {"release_year", "genre_mask", "origin_code"}.
+    """
+    language = movie_doc.get("original_language") or (movie_doc.get("origin") or {}).get("original_language")
+    return {
+        "release_year": release_year(movie_doc.get("release_date")),
+        "genre_mask": genre_mask(movie_doc.get("genre_ids")),
+        "origin_code": origin_code(language),
+    }
+
+
+def genre_ids_for(genre):
+    """
+    Resolve a genre label ("sci-fi") or the start of a TMDb genre name ("science") to TMDb genre ids.
+    Args:
+        genre (str): Genre label or name prefix, case-insensitive.
+    Returns:
+        list: Matching TMDb genre ids (empty if none).
+    """
+    genre = (genre or "").strip().lower()
+    if not genre:
+        return []
+    if genre in GENRE_LABEL_TMDB_IDS:
+        return [GENRE_LABEL_TMDB_IDS[genre]]
+    return [genre_id for genre_id, name in TMDB_GENRE_NAMES.items() if name.lower().startswith(genre)]
+
+
+def atlas_filter(filters):
+    """
+    Convert a filter document into the form accepted by $vectorSearch "filter".
+    Args:
+        filters (dict): Field -> condition over FILTER_FIELDS.
+    Returns:
+        dict or None: A single condition, an $and of conditions, or None without filters.
+    """
+    clauses = [{field: condition} for field, condition in filters.items()]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
@@ -1,144 +1,442 @@
 # Import necessary libraries
-import requests  # For making HTTP requests to external APIs
+from tmdb_client import TMDBClient  # Concurrent, rate-limited TMDb client with a response cache
 
 #connect to mongodb (vector db)
 #get data movies from TMDB API
 #embedding data movies
 #store embedding data to mongodb (vector db)
 
-from pymongo import MongoClient  # To interact with MongoDB database
-from sentence_transformers import SentenceTransformer  # For generating embeddings from text
-from apiKey import TMDB_API_KEY, MONGO_CONNECTION_STRING  # Import API keys and connection strings from a separate file
+from pymongo import MongoClient, UpdateOne  # To interact with MongoDB database and batch writes
+from bson.binary import Binary, BinaryVectorDtype  # For compact binary vector storage
 import logging  # For logging information during execution
+import time  # For measuring per-stage throughput
+import hashlib  # For content hashes of the embedded text
+from datetime import datetime, timezone  # For checkpoint timestamps
+from collections import defaultdict  # For accumulating per-stage counters
+from contextlib import contextmanager  # For the stage timing helper
+import config  # Runtime settings (model name, batch sizes, ...)
+from movie_fields import release_year, genre_mask, origin_code, structured_fields  # Pre-filter fields
+from embedding_pool import EmbeddingPool, load_sentence_transformer  # Multi-process encoding
 
 # Set up logging configuration to display logs at the INFO level
 logging.basicConfig(level=logging.INFO)
 
-# Connect to MongoDB using the provided connection string
-client = MongoClient(MONGO_CONNECTION_STRING)
-db = client["movie_app"]  # Access the "movie_app" database
-movies_collection = db["movies"]  # Access the "movies" collection within the database
+# Checkpoint document for the popular-movies ingestion run
+CHECKPOINT_ID = "tmdb_popular"
 
-# Assign the TMDB API key from the imported variables
-TMDB_API_KEY = TMDB_API_KEY
+# Document whose timestamp tells running apps that the catalog changed (see resources._catalog_signature)
+CATALOG_STATE_ID = "catalog"
 
-# Load a pre-trained sentence transformer model for generating embeddings
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# The MongoDB client, the embedding model (or pool) and the TMDb client are built by the functions
+# below and passed in, never at import time: embedding pool workers are spawned processes that
+# re-import this module as __mp_main__ and must not open their own clients or nested pools.
+
+# Function to connect to the "movie_app" MongoDB database
+def connect_database():
+    from apiKey import MONGO_CONNECTION_STRING  # Import the connection string from a separate file
+    client = MongoClient(MONGO_CONNECTION_STRING)  # Connect using the provided connection string
+    return client["movie_app"]
+
+# Function to load the embedding model: a sentence transformer in this process, or one copy per
+# worker process when EMBEDDING_WORKERS > 1 (same encode interface, output in input order)
+def load_embedding_model():
+    if config.EMBEDDING_WORKERS > 1:
+        return EmbeddingPool.for_model(
+            config.EMBEDDING_MODEL_NAME,
+            workers=config.EMBEDDING_WORKERS,
+            chunk_size=config.EMBEDDING_POOL_CHUNK_SIZE,
+            max_in_flight=config.EMBEDDING_POOL_MAX_IN_FLIGHT or None,
+        )
+    return load_sentence_transformer(config.EMBEDDING_MODEL_NAME)
+
+# Function to create the TMDb client: pooled connections, bounded concurrency, rate limiting,
+# retries and response caching
+def create_tmdb_client():
+    from apiKey import TMDB_API_KEY  # Import the API key from a separate file
+    return TMDBClient(
+        TMDB_API_KEY,
+        base_url=config.TMDB_BASE_URL,
+        max_workers=config.TMDB_MAX_WORKERS,
+        rate_per_second=config.TMDB_RATE_PER_SECOND,
+        max_retries=config.TMDB_MAX_RETRIES,
+        max_backoff=config.TMDB_MAX_BACKOFF_SECONDS,
+        cache_dir=config.TMDB_CACHE_DIR or None,
+        cache_ttl=config.TMDB_CACHE_TTL,
+    )
 
 # Function to fetch movie genres from The Movie Database (TMDb) API
-def fetch_tmdb_genres():
-    url = "https://api.themoviedb.org/3/genre/movie/list"  # Endpoint for fetching genres
-    params = {"api_key": TMDB_API_KEY, "language": "en-US"}  # Parameters including API key and language preference
-    response = requests.get(url, params=params)  # Send GET request to the TMDb API
+def fetch_tmdb_genres(tmdb):
+    body = tmdb.get("/genre/movie/list", {"language": "en-US"})  # Endpoint for fetching genres
     
-    # If the request is successful (status code 200), process the response
-    if response.status_code == 200:
+    # If the request is successful, process the response
+    if body is not None:
         logging.info("Fetched genres from TMDB.")  # Log success message
-        genres = response.json().get("genres", [])  # Extract genres from the response
+        genres = body.get("genres", [])  # Extract genres from the response
         # Return a dictionary mapping genre IDs to their names
         return {genre["id"]: genre["name"] for genre in genres}
     else:
         # Log an error if the request fails
-        logging.error(f"Failed to fetch genres from TMDB: {response.status_code}")
+        logging.error("Failed to fetch genres from TMDB.")
         return {}  # Return an empty dictionary in case of failure
 
+# Function to extract the non-adult movies from a popular-list response
+def _filter_popular_page(body, page):
+    if body is None:
+        # Log an error if the request fails; None (unlike an empty page) is not the end of the list
+        logging.error(f"Failed to fetch movies from TMDB (page {page}).")
+        return None
+    logging.info(f"Fetched movies from TMDB (page {page}).")  # Log success message
+    movies = body.get("results", [])  # Extract movie results from the response
+    # Filter out adult movies by checking the 'adult' field
+    return [movie for movie in movies if not movie.get("adult", False)]
+
 # Function to fetch popular movies from TMDb API
-def fetch_tmdb_movies(page=1):
-    url = "https://api.themoviedb.org/3/movie/popular"  # Endpoint for fetching popular movies
-    params = {"api_key": TMDB_API_KEY, "language": "en-US", "page": page}  # Parameters including API key, language, and page number
-    response = requests.get(url, params=params)  # Send GET request to the TMDb API
-    
-    # If the request is successful (status code 200), process the response
-    if response.status_code == 200:
-        logging.info(f"Fetched movies from TMDB (page {page}).")  # Log success message
-        movies = response.json().get("results", [])  # Extract movie results from the response
-        # Filter out adult movies by checking the 'adult' field
-        filtered_movies = [movie for movie in movies if not movie.get("adult", False)]
-        return filtered_movies  # Return the filtered list of movies
-    else:
-        # Log an error if the request fails
-        logging.error(f"Failed to fetch movies from TMDB: {response.status_code}")
-        return []  # Return an empty list in case of failure
+def fetch_tmdb_movies(tmdb, page=1):
+    body = tmdb.get("/movie/popular", {"language": "en-US", "page": page})  # Endpoint for fetching popular movies
+    return _filter_popular_page(body, page)
+
+# Function to fetch several pages of popular movies concurrently
+def fetch_tmdb_movie_pages(tmdb, pages):
+    """
+    Args:
+        tmdb (TMDBClient): TMDb client.
+        pages (list): Page numbers to fetch.
+    Returns:
+        list: One list of movies per page, in the same order as `pages` (None for a page that
+            could not be fetched after retries).
+    """
+    bodies = tmdb.get_many([("/movie/popular", {"language": "en-US", "page": page}) for page in pages])
+    return [_filter_popular_page(body, page) for body, page in zip(bodies, pages)]
 
 # Function to fetch detail movies from TMDb API
-def fetch_movie_details(movie_id):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}"
-    params = {"api_key": TMDB_API_KEY, "language": "en-US"}
-    response = requests.get(url, params=params)
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
+def fetch_movie_details(tmdb, movie_id):
+    body = tmdb.get(f"/movie/{movie_id}", {"language": "en-US"})
+    if body is None:
         logging.warning(f"Failed to fetch details for movie ID {movie_id}")
         return {}
+    return body
 
-# Function to seed the MongoDB database with fetched movies and their details
-def seed_movies(movies, genres):
-    for movie in movies:
-        movie_id = movie["id"]
-        details = fetch_movie_details(movie_id)
+# Function to fetch the details of many movies concurrently
+def fetch_movie_details_many(tmdb, movie_ids):
+    bodies = tmdb.get_many([(f"/movie/{movie_id}", {"language": "en-US"}) for movie_id in movie_ids])
+    for movie_id, body in zip(movie_ids, bodies):
+        if body is None:
+            logging.warning(f"Failed to fetch details for movie ID {movie_id}")
+    return [body or {} for body in bodies]
+
+# Collects item counts and wall time for each ingestion stage
+class StageStats:
+    def __init__(self):
+        self.items = defaultdict(int)  # Stage name -> number of items processed
+        self.seconds = defaultdict(float)  # Stage name -> total time spent
+
+    @contextmanager
+    def measure(self, stage, items):
+        """
+        Time a block of work and attribute it to a stage.
+        Args:
+            stage (str): Stage name, e.g. "encode".
+            items (int): Number of items the block processes.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - start
+            self.items[stage] += items
+
+    def report(self):
+        """Log the throughput of every stage in the order the stages first ran."""
+        for stage, seconds in self.seconds.items():
+            rate = self.items[stage] / seconds if seconds > 0 else float("inf")
+            logging.info(f"Stage {stage}: {self.items[stage]} items in {seconds:.2f}s ({rate:.1f} items/s)")
+
+# Function to build the text that gets embedded for a movie
+def build_movie_text(movie):
+    # Create a text representation of the movie by combining title and overview
+    return f"{movie['title']} {movie.get('overview', '')}"
+
+# Function to fingerprint the embedded text, so unchanged movies can skip re-encoding
+def compute_content_hash(movie_text):
+    return hashlib.sha256(movie_text.encode("utf-8")).hexdigest()
+
+# Function to turn a TMDb movie and its details into a MongoDB document (without embedding)
+def normalize_movie(movie, details, genres):
+    """
+    Build the stored document for one movie.
+    Args:
+        movie (dict): Movie from the TMDb popular list.
+        details (dict or None): Response of the TMDb movie details endpoint,
+            or None to leave the stored origin fields untouched (origin_code is still set
+            when the list entry has an original_language).
+        genres (dict): Mapping of genre IDs to genre names.
+    Returns:
+        dict: Movie document.
+    """
+    # Extract genre IDs from the movie data
+    genre_ids = movie.get("genre_ids", [])
+    # Map genre IDs to genre names using the genres dictionary
+    genre_names = [genres[genre_id] for genre_id in genre_ids if genre_id in genres]
+
+    # Create a document to be inserted into the MongoDB collection
+    movie_doc = {
+        "tmdb_id": movie["id"],  # Unique ID from TMDb
+        "title": movie["title"],  # Movie title
+        "overview": movie.get("overview", ""),  # Movie overview/description
+        "release_date": movie.get("release_date", ""),  # Release date of the movie
+        "popularity": movie.get("popularity", 0),  # Popularity score
+        "poster_path": movie.get("poster_path", ""),  # Path to the movie poster image
+        "vote_average": movie.get("vote_average", 0),  # Average user rating
+        "vote_count": movie.get("vote_count", 0),  # Number of votes
+        "genre_ids": genre_ids,  # List of genre IDs
+        "genre_names": genre_names,  # List of genre names
+        # Pre-filter fields for the vector search (see movie_fields.FILTER_FIELDS)
+        "release_year": release_year(movie.get("release_date")),  # Integer year, None if unknown
+        "genre_mask": genre_mask(genre_ids),  # Bitmask over movie_fields.TMDB_GENRE_IDS
+    }
+    # Without details (unchanged movies) the stored origin_code is only replaced when the list
+    # entry itself carries the language, so a list payload without it cannot erase the field
+    language = movie.get("original_language") or (details or {}).get("original_language")
+    if language or details is not None:
+        movie_doc["origin_code"] = origin_code(language)
+    if details is not None:
         production_countries = details.get("production_countries", [])
-        country_names = [c["name"] for c in production_countries]
-        original_language = details.get("original_language", "")
-        # Extract genre IDs from the movie data
-        genre_ids = movie.get("genre_ids", [])
-        # Map genre IDs to genre names using the genres dictionary
-        genre_names = [genres[genre_id] for genre_id in genre_ids if genre_id in genres]
-        # Join genre names into a comma-separated string for easier readability
-        genre_text = ", ".join(genre_names)
-        logging.info(f"genre_text {genre_text}.")  # Log the genre text
-        
-        # Create a text representation of the movie by combining title and overview
-        movie_text = f"{movie['title']} {movie.get('overview', '')}"
-        # Generate an embedding for the movie text using the sentence transformer model
-        movie_embedding = model.encode(movie_text)
-        
-        # Create a document to be inserted into the MongoDB collection
-        movie_doc = {
-            "tmdb_id": movie["id"],  # Unique ID from TMDb
-            "title": movie["title"],  # Movie title
-            "overview": movie.get("overview", ""),  # Movie overview/description
-            "release_date": movie.get("release_date", ""),  # Release date of the movie
-            "popularity": movie.get("popularity", 0),  # Popularity score
-            "poster_path": movie.get("poster_path", ""),  # Path to the movie poster image
-            "vote_average": movie.get("vote_average", 0),  # Average user rating
-            "vote_count": movie.get("vote_count", 0),  # Number of votes
-            "genre_ids": genre_ids,  # List of genre IDs
-            "genre_names": genre_names,  # List of genre names
-            "movie_embedding": movie_embedding.tolist(),  # Embedding of the movie text as a list
-             "origin": {
-                "original_language": original_language,        # contoh: 'ko' untuk Korea
-                "country_names": country_names                 # contoh: ['South Korea']
-            }
+        movie_doc["origin"] = {
+            "original_language": details.get("original_language", ""),  # contoh: 'ko' untuk Korea
+            "country_names": [c["name"] for c in production_countries]  # contoh: ['South Korea']
         }
-        
-        # Insert or update the movie document in the MongoDB collection
-        # Use `update_one` with `upsert=True` to insert new documents or update existing ones
-        movies_collection.update_one(
-            {"tmdb_id": movie["id"]},  # Query by TMDb ID to avoid duplicates
-            {"$set": movie_doc},  # Update the document with the new data
-            upsert=True  # Create a new document if it doesn't exist
-        )
+    return movie_doc
+
+# Function to add the pre-filter fields to movies stored before they existed
+def backfill_structured_fields(movies_collection, batch_size=1000):
+    """
+    Compute release_year, genre_mask and origin_code for stored movies that lack them.
+    Args:
+        movies_collection: MongoDB movies collection.
+        batch_size (int): Number of updates sent per bulk_write.
+    Returns:
+        int: Number of movies updated.
+    """
+    cursor = movies_collection.find(
+        {"$or": [{field: {"$exists": False}} for field in ("release_year", "genre_mask", "origin_code")]},
+        {"release_date": 1, "genre_ids": 1, "origin.original_language": 1},
+    )
+    updated, operations = 0, []
+    for doc in cursor:
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": structured_fields(doc)}))
+        if len(operations) >= batch_size:
+            updated += movies_collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += movies_collection.bulk_write(operations, ordered=False).modified_count
+    logging.info(f"Backfilled structured fields on {updated} movies.")
+    return updated
+
+# Function to convert an embedding to the configured MongoDB storage format
+def encode_embedding(movie_embedding):
+    if config.EMBEDDING_STORAGE == "binary":
+        # BSON binary float32 vector: exact values at a third of the size of an array of doubles
+        return Binary.from_vector(movie_embedding.tolist(), BinaryVectorDtype.FLOAT32)
+    return movie_embedding.tolist()  # Embedding of the movie text as a list
+
+# Function to seed the MongoDB database with fetched movies and their details
+def seed_movies(movies, genres, movies_collection, model, tmdb, stats=None):
+    """
+    Run the ingestion stages for a list of movies:
+    diff against stored hashes -> fetch details -> normalize -> batched encode -> chunked bulk upsert.
+    Movies whose embedded text and embedding model are unchanged keep their stored
+    embedding and only get their metadata (popularity, votes, ...) refreshed.
+    Args:
+        movies (list): Movies from the TMDb popular list (any number, e.g. several pages).
+        genres (dict): Mapping of genre IDs to genre names.
+        movies_collection: MongoDB movies collection.
+        model: Embedding model or EmbeddingPool (anything with SentenceTransformer.encode).
+        tmdb (TMDBClient): TMDb client for the movie details.
+        stats (StageStats): Optional collector for per-stage throughput.
+    Returns:
+        int: Number of movies that were (re-)embedded.
+    """
+    stats = stats or StageStats()
+    if not movies:
+        return 0
+
+    # Stage 1: compare content hashes with what is already stored
+    with stats.measure("diff", len(movies)):
+        movie_texts = [build_movie_text(movie) for movie in movies]
+        content_hashes = [compute_content_hash(text) for text in movie_texts]
+        stored = {
+            doc["tmdb_id"]: doc
+            for doc in movies_collection.find(
+                {"tmdb_id": {"$in": [movie["id"] for movie in movies]}},
+                {"tmdb_id": 1, "content_hash": 1, "embedding_model": 1, "origin": 1},
+            )
+        }
+        changed, missing_origin = [], []
+        for i, (movie, content_hash) in enumerate(zip(movies, content_hashes)):
+            existing = stored.get(movie["id"])
+            if (existing is None
+                    or existing.get("content_hash") != content_hash
+                    or existing.get("embedding_model") != config.EMBEDDING_MODEL_NAME):
+                changed.append(i)
+            elif "origin" not in existing:
+                missing_origin.append(i)  # Same embedding, only the details are missing
+    logging.info(f"{len(changed)} new or changed movies, {len(movies) - len(changed)} unchanged "
+                 f"({len(missing_origin)} of them without origin fields).")
+
+    # Stage 2: fetch the details needed for the origin fields (new or changed movies, and
+    # unchanged ones stored without origin fields)
+    needs_details = sorted(changed + missing_origin)
+    with stats.measure("fetch_details", len(needs_details)):
+        fetched = fetch_movie_details_many(tmdb, [movies[i]["id"] for i in needs_details])
+    details = [None] * len(movies)
+    for i, detail in zip(needs_details, fetched):
+        details[i] = detail
+
+    # Stage 3: normalize TMDb payloads into documents
+    with stats.measure("normalize", len(movies)):
+        movie_docs = [normalize_movie(movie, detail, genres) for movie, detail in zip(movies, details)]
+
+    # Stage 4: generate embeddings for new or changed movies in batches
+    with stats.measure("encode", len(changed)):
+        embeddings = model.encode([movie_texts[i] for i in changed], batch_size=config.INGEST_ENCODE_BATCH_SIZE) if changed else []
+    for i, movie_embedding in zip(changed, embeddings):
+        movie_docs[i]["movie_embedding"] = encode_embedding(movie_embedding)
+        movie_docs[i]["content_hash"] = content_hashes[i]  # Fingerprint of the embedded text
+        movie_docs[i]["embedding_model"] = config.EMBEDDING_MODEL_NAME  # Model that produced the embedding
+
+    # Stage 5: insert or update the documents with one bulk_write per chunk
+    # (UpdateOne with upsert=True inserts new documents or updates existing ones by TMDb ID;
+    # unchanged movies only $set their metadata, so the stored embedding is not rewritten)
+    with stats.measure("write", len(movie_docs)):
+        operations = [
+            UpdateOne({"tmdb_id": doc["tmdb_id"]}, {"$set": doc}, upsert=True)
+            for doc in movie_docs
+        ]
+        chunk_size = config.INGEST_WRITE_CHUNK_SIZE
+        for start in range(0, len(operations), chunk_size):
+            movies_collection.bulk_write(operations[start:start + chunk_size], ordered=False)
+    return len(changed)
+
+# Functions to persist the last fully ingested page, so a crashed run can resume
+def load_checkpoint(ingest_state_collection):
+    state = ingest_state_collection.find_one({"_id": CHECKPOINT_ID})
+    return state["completed_page"] if state else 0
+
+def save_checkpoint(ingest_state_collection, page):
+    ingest_state_collection.update_one(
+        {"_id": CHECKPOINT_ID},
+        {"$set": {"completed_page": page, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+def clear_checkpoint(ingest_state_collection):
+    ingest_state_collection.delete_one({"_id": CHECKPOINT_ID})
+
+# Function to record that the movies changed, so running apps rebuild their in-process indexes
+def mark_catalog_changed(ingest_state_collection):
+    ingest_state_collection.update_one(
+        {"_id": CATALOG_STATE_ID},
+        {"$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
 
 # Function to seed the database with multiple pages of movies from TMDb
-def seed_database_from_tmdb(pages=1):
+def seed_database_from_tmdb(db, model, tmdb, pages=1, resume=True):
+    """
+    Ingest popular movies page by page.
+    Args:
+        db: "movie_app" MongoDB database (movies and ingest_state collections).
+        model: Embedding model or EmbeddingPool (see load_embedding_model).
+        tmdb (TMDBClient): TMDb client (see create_tmdb_client).
+        pages (int): Number of TMDb popular-list pages to ingest.
+        resume (bool): Continue after the last checkpointed page of an interrupted run.
+    Returns:
+        int: Number of movies (re-)embedded by this run.
+    """
+    movies_collection = db["movies"]  # Access the "movies" collection within the database
+    ingest_state_collection = db["ingest_state"]  # Stores resumable ingestion checkpoints
+    stats = StageStats()
+    # Index the lookup key used by the diff stage and every upsert
+    movies_collection.create_index("tmdb_id")
+    # Index the genre lookup of retrieve_similar_movies_by_genre (most popular first)
+    movies_collection.create_index([("genre_ids", 1), ("popularity", -1)])
     # Fetch the list of genres once and reuse it for all movies
-    genres = fetch_tmdb_genres()
+    genres = fetch_tmdb_genres(tmdb)
+    
+    first = load_checkpoint(ingest_state_collection) + 1 if resume else 1
+    if first > 1:
+        logging.info(f"Resuming ingestion after checkpointed page {first - 1}.")
     
-    # Loop through the specified number of pages to fetch movies
-    for page in range(1, pages + 1):
-        logging.info(f"Inserted Page number: {page}")  # Log the current page being processed
-        movies = fetch_tmdb_movies(page)  # Fetch movies for the current page
+    # Buffer several pages so the encode and write stages work on large batches
+    embedded = 0  # Movies (re-)embedded by this run, which the kNN graph must pick up
+    buffered = []
+    last_buffered_page = first - 1
+    window = max(1, config.TMDB_MAX_WORKERS)  # Pages fetched concurrently per round
+    for first_page in range(first, pages + 1, window):
+        page_numbers = list(range(first_page, min(first_page + window, pages + 1)))
+        logging.info(f"Fetching pages {page_numbers[0]}-{page_numbers[-1]}")  # Log the pages being processed
+        with stats.measure("fetch_pages", len(page_numbers)):
+            page_movies = fetch_tmdb_movie_pages(tmdb, page_numbers)  # Fetch movies for the current pages
         
-        # If no movies are returned, break out of the loop
-        if not movies:
-            break
+        # Stop at the first page without movies, like the sequential loop did
+        reached_end = False
+        for page, movies in zip(page_numbers, page_movies):
+            if movies is None:
+                # TMDb failed after retries: store the pages fetched so far and keep the checkpoint,
+                # so the next run resumes here instead of treating the outage as the end of the list
+                embedded += seed_movies(buffered, genres, movies_collection, model, tmdb, stats)
+                if buffered:
+                    save_checkpoint(ingest_state_collection, last_buffered_page)
+                    mark_catalog_changed(ingest_state_collection)
+                raise RuntimeError(f"Failed to fetch TMDb popular page {page}; rerun to resume "
+                                   f"after page {last_buffered_page}.")
+            if not movies:
+                reached_end = True
+                break
+            buffered.extend(movies)
+            last_buffered_page = page
         
-        # Seed the fetched movies into the database
-        seed_movies(movies, genres)
+        if len(buffered) >= config.INGEST_FLUSH_SIZE:
+            embedded += seed_movies(buffered, genres, movies_collection, model, tmdb, stats)
+            save_checkpoint(ingest_state_collection, last_buffered_page)  # Everything up to this page is stored
+            mark_catalog_changed(ingest_state_collection)
+            buffered = []
+        if reached_end:
+            break
+    
+    # Seed whatever is left in the buffer; the run is complete, so the next one starts fresh
+    embedded += seed_movies(buffered, genres, movies_collection, model, tmdb, stats)
+    clear_checkpoint(ingest_state_collection)
+    mark_catalog_changed(ingest_state_collection)
+    
+    # Update the "more like this" graph for new and re-embedded movies. It finds them by
+    # embedding fingerprint, so this also runs when this run embedded nothing: movies embedded
+    # by an interrupted earlier run (or before the graph was enabled) are picked up too
+    if config.KNN_GRAPH_PATH:
+        from knn_graph import refresh_knn_graph  # Incremental kNN graph update
+        with stats.measure("knn_graph", embedded):
+            refresh_knn_graph(movies_collection, config.KNN_GRAPH_PATH, k=config.KNN_GRAPH_K,
+                              block_size=config.KNN_GRAPH_BLOCK_SIZE)
+    stats.report()
+    return embedded
+
+if __name__ == "__main__":
+    import sys
+    db = connect_database()
+    if "--backfill" in sys.argv:
+        # Only add the pre-filter fields to movies that were stored before they existed
+        backfill_structured_fields(db["movies"])
+        mark_catalog_changed(db["ingest_state"])
+        sys.exit(0)
 
-# Seed the database with movies from the first 500 pages of TMDb's popular movies
-seed_database_from_tmdb(pages=500)
+    # Seed the database with movies from the first 500 pages of TMDb's popular movies
+    model, tmdb = load_embedding_model(), create_tmdb_client()
+    try:
+        seed_database_from_tmdb(db, model, tmdb, pages=500)
+    finally:
+        tmdb.close()
+        if isinstance(model, EmbeddingPool):
+            model.close()  # Stop the worker processes
 
-# Print a completion message after seeding the database
-print("Database seeding completed!")
\ No newline at end of file
+    # Print a completion message after seeding the database
+    print("Database seeding completed!")
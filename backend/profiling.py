@@ -0,0 +1,77 @@
+# Sampled cProfile hooks for finding hot spots under real load
+# A configurable fraction of requests runs under cProfile and the statistics of every
+# sampled request are merged, so the report reflects the production mix of queries.
+# The sample rate can be changed at runtime (see /debug/profiling in app.py).
+import cProfile  # Deterministic profiler for one sampled request
+import io  # For rendering the report
+import pstats  # For merging and sorting profiles
+import random  # For sampling requests
+import threading  # Only one request is profiled at a time
+
+
+class SampledProfiler:
+    """
+    Profile a random sample of requests and accumulate their statistics.
+    Args:
+        sample_rate (float): Fraction of requests to profile (0 disables profiling).
+    """
+
+    def __init__(self, sample_rate=0.0):
+        self.sample_rate = sample_rate
+        self.profiled = 0  # Number of requests merged into the statistics
+        self._busy = threading.Lock()  # cProfile allows one active profiler at a time
+        self._stats_lock = threading.Lock()
+        self._stats = None
+
+    def configure(self, sample_rate=None, reset=False):
+        """Change the sample rate and/or drop the accumulated statistics."""
+        if sample_rate is not None:
+            self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        if reset:
+            with self._stats_lock:
+                self._stats, self.profiled = None, 0
+
+    def start(self):
+        """
+        Decide whether to profile the current request and start profiling it.
+        Returns:
+            cProfile.Profile or None: Running profiler to pass to stop(), or None if not sampled.
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None  # Another request is being profiled
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiling tool is active in this process
+            self._busy.release()
+            return None
+        return profiler
+
+    def stop(self, profiler):
+        """Stop a profiler returned by start() and merge its statistics."""
+        profiler.disable()
+        self._busy.release()
+        with self._stats_lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profiler)
+            else:
+                self._stats.add(profiler)
+            self.profiled += 1
+
+    def report(self, limit=40, sort="cumulative"):
+        """
+        Args:
+            limit (int): Number of functions to list.
+            sort (str): pstats sort key, e.g. "cumulative" or "tottime".
+        Returns:
+            str: Text report of the merged statistics.
+        """
+        with self._stats_lock:
+            if self._stats is None:
+                return f"No profiled requests yet (sample rate {self.sample_rate}).\n"
+            out = io.StringIO()
+            self._stats.stream = out
+            self._stats.sort_stats(sort).print_stats(limit)
+            return f"{self.profiled} profiled requests (sample rate {self.sample_rate})\n" + out.getvalue()
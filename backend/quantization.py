@@ -0,0 +1,55 @@
+# Compact formats for movie embeddings
+# In memory, float16 halves the size of a float32 vector and scalar int8 quantization with
+# one float32 scale per vector cuts it to about a quarter; searches over quantized vectors
+# are followed by exact float32 rescoring of the top candidates (vector_index.QuantizedIndex).
+# In MongoDB, embeddings can be stored as BSON binary float32 vectors instead of arrays of doubles.
+import numpy as np  # For vector conversion
+
+# Supported storage precisions
+PRECISIONS = ("float32", "float16", "int8")
+
+
+def quantize(vectors, precision):
+    """
+    Convert float32 vectors to a compact representation.
+    Args:
+        vectors (array-like): 2-D array of shape (n, dim).
+        precision (str): "float32", "float16" or "int8".
+    Returns:
+        tuple: (codes, scales) where codes has the target dtype and scales is a float32
+            array of shape (n,) for int8 (None for the float formats).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "float32":
+        return np.ascontiguousarray(vectors), None
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+    if precision == "int8":
+        # Symmetric per-vector scale: the largest magnitude component maps to +/-127
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, np.newaxis]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown embedding precision: {precision}")
+
+
+# dtype byte at the start of a BSON binary vector (subtype 9), followed by a padding byte
+_BSON_VECTOR_DTYPES = {0x27: np.float32, 0x03: np.int8}
+
+
+def embedding_to_array(value):
+    """
+    Read a stored movie_embedding as a float32 vector.
+    Handles both storage formats written by ingestion: a list of numbers, or a BSON
+    binary vector (bson.Binary, subtype 9) of float32 or int8 values.
+    Args:
+        value (list or bytes): Stored embedding.
+    Returns:
+        np.ndarray: float32 vector.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        dtype = _BSON_VECTOR_DTYPES.get(value[0])
+        if dtype is None:
+            raise ValueError(f"Unsupported BSON vector dtype: {value[0]:#x}")
+        return np.frombuffer(bytes(value[2:]), dtype=np.dtype(dtype).newbyteorder("<")).astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
@@ -0,0 +1,158 @@
+# Compiled phrase matcher for genre / theme / origin synonyms
+# All synonym tables are compiled once into a token trie, so a query is scanned in a
+# single left-to-right pass and multi-word synonyms like "time travel" match anywhere.
+import re  # For tokenizing queries and synonyms the same way
+from collections import namedtuple  # For lightweight match records
+
+# Words with optional inner hyphens/apostrophes: "sci-fi", "rom-com", "k-drama" stay single tokens
+_TOKEN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+# Marker key for "a phrase ends at this trie node"
+_END = "$end"
+
+# One synonym occurrence: category ("genre"/"theme"/"origin"), mapped label, matched text and its span
+PhraseMatch = namedtuple("PhraseMatch", ["category", "label", "phrase", "start", "end"])
+
+
+def tokenize(text):
+    """
+    Split text into lower-case tokens with their character spans.
+    Args:
+        text (str): Text to tokenize.
+    Returns:
+        list: (token, start, end) tuples.
+    """
+    return [(m.group(), m.start(), m.end()) for m in _TOKEN.finditer(text.lower())]
+
+
+class SynonymMatcher:
+    """
+    Token-trie phrase matcher compiled from synonym tables.
+    Args:
+        tables (dict): Category name -> {label: [synonym phrases]}, e.g. {"genre": GENRE_SYNONYMS}.
+            When a phrase appears under several labels of one category, the first label wins,
+            matching the order in which the old per-table loops checked them.
+    """
+
+    def __init__(self, tables):
+        self.categories = list(tables)
+        self.root = {}
+        self.max_phrase_tokens = 0
+        for category, table in tables.items():
+            for label, synonyms in table.items():
+                for phrase in synonyms:
+                    tokens = [token for token, _, _ in tokenize(phrase)]
+                    if not tokens:
+                        continue
+                    node = self.root
+                    for token in tokens:
+                        node = node.setdefault(token, {})
+                    node.setdefault(_END, {}).setdefault(category, label)
+                    self.max_phrase_tokens = max(self.max_phrase_tokens, len(tokens))
+
+    def _walk(self, words):
+        """Yield (category, label, first word, last word) for every phrase found in the words."""
+        root, max_len, n = self.root, self.max_phrase_tokens, len(words)
+        for i in range(n):
+            node = root.get(words[i])
+            j = i
+            found = []
+            while node is not None:
+                labels = node.get(_END)
+                if labels:
+                    found.extend((category, label, i, j) for category, label in labels.items())
+                j += 1
+                if j >= n or j - i >= max_len:
+                    break
+                node = node.get(words[j])
+            yield from reversed(found)  # Longest phrase at this position first
+
+    def scan(self, text):
+        """
+        Find every synonym occurrence in the text in one pass over its tokens.
+        Each token starts at most one trie walk, bounded by the longest phrase.
+        Args:
+            text (str): Query text.
+        Returns:
+            list: PhraseMatch records ordered by start position (longer phrases first on ties).
+        """
+        tokens = tokenize(text)
+        return [
+            PhraseMatch(category, label, text[tokens[i][1]:tokens[j][2]], tokens[i][1], tokens[j][2])
+            for category, label, i, j in self._walk([token for token, _, _ in tokens])
+        ]
+
+    def match(self, text, keywords=None):
+        """
+        Pick the best label per category for a query.
+        Args:
+            text (str): Query text.
+            keywords (list): Optional keywords from process_query. When given, single-word
+                synonyms only count if they are keywords (so the verb in "I'd love a movie"
+                does not select romance); multi-word synonyms always count.
+        Returns:
+            dict: Category -> {"label", "phrase", "start", "end"}, plus "hits" with every
+                accepted PhraseMatch. A phrase covering exactly the words of a keyword wins first,
+                in keyword order (the precedence of the old per-table keyword loops); only
+                categories without such a keyword fall back to the earliest phrase in the text.
+        """
+        lowered = text.lower()
+        tokens = list(_TOKEN.finditer(lowered))  # One tokenizer pass; spans are only read for hits
+        words = [token.group() for token in tokens]
+        # Keywords are spans of the query, so a phrase is a whole keyword when its text is one
+        keyword_rank, allowed = {}, None
+        if keywords is not None:
+            allowed = set()
+            for rank, keyword in enumerate(keywords):
+                keyword = keyword.lower()
+                keyword_rank.setdefault(keyword, rank)
+                allowed.update(keyword.split())
+        not_a_keyword = len(keywords or ())  # Ranks after every keyword; ties keep the earliest phrase
+
+        best, hits = {}, []  # Category -> (rank, PhraseMatch)
+        for category, label, i, j in self._walk(words):
+            if allowed is not None and i == j and words[i] not in allowed:
+                continue
+            start, end = tokens[i].start(), tokens[j].end()
+            hit = PhraseMatch(category, label, text[start:end], start, end)
+            hits.append(hit)
+            rank = keyword_rank.get(lowered[start:end], not_a_keyword)
+            if category not in best or rank < best[category][0]:
+                best[category] = (rank, hit)
+
+        result = {category: None for category in self.categories}
+        for category, (_, hit) in best.items():
+            result[category] = {"label": hit.label, "phrase": hit.phrase, "start": hit.start, "end": hit.end}
+        result["hits"] = hits
+        return result
+
+    def _whole_keyword_matches(self, keywords):
+        """Yield (category, label, keyword) for every keyword that is exactly a synonym, in keyword order."""
+        for keyword in keywords:
+            node = self.root
+            for token, _, _ in tokenize(keyword):
+                node = node.get(token)
+                if node is None:
+                    break
+            labels = node.get(_END) if node is not None and node is not self.root else None
+            for category, label in (labels or {}).items():
+                yield category, label, keyword
+
+    def first_label(self, keywords, category):
+        """
+        Return the label of the first keyword that is a synonym from one category or, failing
+        that, of the first keyword that contains one (same precedence as match).
+        Args:
+            keywords (list): Keywords, checked in order.
+            category (str): Category to look up.
+        Returns:
+            str or None: Matched label or None.
+        """
+        for hit_category, label, _ in self._whole_keyword_matches(keywords):
+            if hit_category == category:
+                return label
+        for keyword in keywords:
+            for hit_category, label, _, _ in self._walk(_TOKEN.findall(keyword.lower())):
+                if hit_category == category:
+                    return label
+        return None
@@ -0,0 +1,392 @@
+# Lazily constructed shared resources for the recommendation service
+# Nothing heavy happens at import time: the MongoDB client, the spaCy pipeline, the
+# sentence transformer and the caches are built on first use or by warm_up(), which the
+# app factory runs on a background thread so the process can accept traffic immediately.
+import logging  # For logging warm-up progress
+import os  # For the kNN graph manifest timestamp
+import threading  # For thread-safe lazy construction and the warm-up thread
+import time  # For warm-up timings and retry delays
+
+import config  # Runtime settings
+
+_lock = threading.Lock()  # Guards the registries below (never held while building)
+_resources = {}  # Resource name -> constructed object
+_build_locks = {}  # Resource name -> lock held while that resource is built
+_catalog_state = {}  # Index name -> catalog signature it was built from, last check time, rebuild flag
+
+# Warm-up state reported by /readyz
+_ready = threading.Event()
+_warm_up_state = {"started": False, "steps": {}, "failed": {}, "error": None}
+
+
+def _build_lock(name):
+    with _lock:
+        return _build_locks.setdefault(name, threading.Lock())
+
+
+def _get(name, factory):
+    """
+    Return a named resource, constructing it once on first use.
+    Each resource has its own lock, so a slow build (e.g. an index) only blocks callers of
+    that resource; building one resource may build others it depends on.
+    """
+    resource = _resources.get(name)
+    if resource is None:
+        with _build_lock(name):
+            resource = _resources.get(name)
+            if resource is None:  # Another thread may have built it while we waited
+                resource = factory()
+                _resources[name] = resource
+    return resource
+
+
+def peek(name):
+    """Return a resource if it has already been built, without building it (e.g. for metrics)."""
+    return _resources.get(name)
+
+
+def set_resource(name, resource):
+    """Install a prebuilt resource (e.g. a local stand-in used by benchmarks) instead of its factory."""
+    with _lock:
+        _resources[name] = resource
+        _catalog_state.pop(name, None)  # Never replaced by a catalog refresh
+
+
+def reset(*names):
+    """Drop constructed resources (all of them when no names are given) so they are rebuilt on next use."""
+    with _lock:
+        for name in names or list(_resources):
+            _resources.pop(name, None)
+            _catalog_state.pop(name, None)
+
+
+def get_db():
+    """Return the "movie_app" MongoDB database."""
+    def connect():
+        from pymongo import MongoClient  # To interact with MongoDB database
+        from apiKey import MONGO_CONNECTION_STRING  # Import MongoDB connection string from a separate file
+        return MongoClient(MONGO_CONNECTION_STRING)["movie_app"]
+    return _get("db", connect)
+
+
+def get_movies_collection():
+    """Return the "movies" collection."""
+    return get_db()["movies"]
+
+
+def get_history_collection():
+    """Return the "search_history" collection used for query history and cached results."""
+    return get_db()["search_history"]
+
+
+def get_nlp():
+    """Return the spaCy pipeline used by process_query."""
+    def load():
+        from keyword_extraction import load_nlp  # Lean spaCy pipeline for keyword extraction
+        return load_nlp()
+    return _get("nlp", load)
+
+
+def get_model():
+    """Return the sentence transformer used for query embeddings."""
+    def load():
+        from sentence_transformers import SentenceTransformer  # For generating embeddings from text
+        return SentenceTransformer(config.EMBEDDING_MODEL_NAME)
+    return _get("model", load)
+
+
+def get_embedding_service():
+    """
+    Return the encoder used for query embeddings: the model itself, or with EMBEDDING_WORKERS > 1
+    a pool of worker processes for large batches that falls back to the model for small ones.
+    """
+    if config.EMBEDDING_WORKERS <= 1:
+        return get_model()
+    def build():
+        from embedding_pool import EmbeddingPool  # Multi-process encoding
+        return EmbeddingPool.for_model(
+            config.EMBEDDING_MODEL_NAME,
+            workers=config.EMBEDDING_WORKERS,
+            chunk_size=config.EMBEDDING_POOL_CHUNK_SIZE,
+            max_in_flight=config.EMBEDDING_POOL_MAX_IN_FLIGHT or None,
+            local_model=get_model(),
+            min_parallel=config.EMBEDDING_POOL_MIN_PARALLEL,
+        )
+    return _get("embedding_service", build)
+
+
+def get_embedding_cache():
+    """Return the query embedding cache wrapped around the embedding service."""
+    def build():
+        from embedding_cache import EmbeddingCache  # Memoizes query embeddings across requests
+        model = get_embedding_service()
+        return EmbeddingCache(
+            model.encode,
+            max_entries=config.EMBEDDING_CACHE_SIZE,
+            disk_dir=config.EMBEDDING_CACHE_DIR or None,
+            dim=model.get_sentence_embedding_dimension(),
+            disk_capacity=config.EMBEDDING_CACHE_DISK_SLOTS,
+            namespace=config.EMBEDDING_MODEL_NAME,
+        )
+    return _get("embedding_cache", build)
+
+
+def get_result_cache():
+    """Return the result cache stored in the history collection."""
+    def build():
+        from result_cache import ResultCache  # Normalized + semantic cache of full query results
+        return ResultCache(
+            get_history_collection(),
+            ttl_seconds=config.RESULT_CACHE_TTL_SECONDS,
+            max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+            embed=get_embedding_cache().encode if config.RESULT_CACHE_SEMANTIC else None,
+            similarity_threshold=config.RESULT_CACHE_SIMILARITY_THRESHOLD,
+            index_refresh_seconds=config.RESULT_CACHE_INDEX_REFRESH_SECONDS,
+        )
+    return _get("result_cache", build)
+
+
+def get_llm_cache():
+    """Return the in-memory cache of LLM recommendations (keyed on the normalized query + retrieved titles)."""
+    def build():
+        from llm_cache import LLMResponseCache  # Reuses answers for identical prompts
+        return LLMResponseCache(max_entries=config.LLM_CACHE_SIZE, ttl_seconds=config.LLM_CACHE_TTL_SECONDS)
+    return _get("llm_cache", build)
+
+
+def get_snapshot():
+    """Return the memory-mapped catalog snapshot at CATALOG_SNAPSHOT_PATH (None when not configured)."""
+    if not config.CATALOG_SNAPSHOT_PATH:
+        return None
+    def load():
+        from snapshot import open_snapshot  # Zero-copy catalog export
+        return open_snapshot(config.CATALOG_SNAPSHOT_PATH)
+    return _get("snapshot", load)
+
+
+def get_knn_graph():
+    """
+    Return the movie-to-movie kNN graph at KNN_GRAPH_PATH (None when not configured or not built yet).
+    A graph rewritten by a refresh is picked up on the next call; while the refresh is swapping
+    directories the graph already loaded keeps answering (its memory maps outlive the old files).
+    """
+    if not config.KNN_GRAPH_PATH:
+        return None
+    graph = peek("knn_graph")
+    try:
+        mtime = os.path.getmtime(os.path.join(config.KNN_GRAPH_PATH, "manifest.json"))
+    except OSError:
+        return graph  # Not built yet, or between the two renames of snapshot.replace_directory
+    if graph is not None and graph.mtime != mtime:
+        reset("knn_graph")
+    def load():
+        from knn_graph import KnnGraph  # Precomputed "more like this" neighbours
+        return KnnGraph(config.KNN_GRAPH_PATH)
+    try:
+        return _get("knn_graph", load)
+    except OSError:
+        return graph  # The directory was swapped while loading: try again on the next call
+
+
+def _catalog_signature():
+    """Movie count and last ingestion time (written by process_data.mark_catalog_changed)."""
+    db = get_db()
+    state = db["ingest_state"].find_one({"_id": "catalog"}) or {}
+    return db["movies"].estimated_document_count(), state.get("updated_at")
+
+
+def _get_catalog_index(name, factory):
+    """
+    _get for in-process indexes built from the movies collection. At most every
+    CATALOG_REFRESH_SECONDS the catalog signature is compared with the one the index was built
+    from; when ingestion changed the catalog, the index is rebuilt on a background thread and
+    swapped in once done, while requests keep using the previous one. Indexes built from a
+    catalog snapshot follow the snapshot file instead (re-export it and restart).
+    """
+    def build():
+        signature = _catalog_signature() if not config.CATALOG_SNAPSHOT_PATH else None
+        index = factory()
+        _catalog_state[name] = {"signature": signature, "checked": time.monotonic(), "rebuilding": False}
+        return index
+    index = _get(name, build)
+    if config.CATALOG_REFRESH_SECONDS > 0 and not config.CATALOG_SNAPSHOT_PATH:
+        _refresh_catalog_index(name, factory)
+    return index
+
+
+def _refresh_catalog_index(name, factory):
+    """Start a background rebuild of a catalog index whose signature is out of date."""
+    with _lock:
+        state = _catalog_state.get(name)  # None for stand-ins installed with set_resource
+        if state is None or state["rebuilding"] or time.monotonic() - state["checked"] < config.CATALOG_REFRESH_SECONDS:
+            return
+        state["checked"] = time.monotonic()
+    try:
+        signature = _catalog_signature()
+    except Exception:
+        logging.exception(f"Could not check whether the {name} is up to date")
+        return
+    if signature == state["signature"]:
+        return
+    state["rebuilding"] = True
+
+    def rebuild():
+        try:
+            start = time.perf_counter()
+            index = factory()
+            with _lock:
+                _resources[name] = index
+                state["signature"] = signature
+            logging.info(f"Rebuilt {name} after a catalog change in {time.perf_counter() - start:.2f}s.")
+        except Exception:
+            logging.exception(f"Rebuilding {name} failed; keeping the previous one")
+        finally:
+            state["rebuilding"] = False
+    threading.Thread(target=rebuild, name=f"rebuild-{name}", daemon=True).start()
+
+
+def get_local_index():
+    """
+    Return the in-process vector index, built from the snapshot or the movies collection on first
+    use and rebuilt in the background after ingestion changes the collection.
+    """
+    def build():
+        from vector_index import build_index_from_collection  # In-process alternative to Atlas $vectorSearch
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            index = snapshot.build_index(
+                mode=config.VECTOR_SEARCH_BACKEND,
+                n_lists=config.IVF_NUM_LISTS,
+                n_probes=config.IVF_NUM_PROBES,
+                precision=config.LOCAL_INDEX_PRECISION,
+                rescore_factor=config.LOCAL_INDEX_RESCORE_FACTOR,
+            )
+            logging.info(f"Built {config.VECTOR_SEARCH_BACKEND}/{config.LOCAL_INDEX_PRECISION} vector index over "
+                         f"{len(index)} movies from snapshot {config.CATALOG_SNAPSHOT_PATH}.")
+            return index
+        index = build_index_from_collection(
+            get_movies_collection(),
+            mode=config.VECTOR_SEARCH_BACKEND,
+            n_lists=config.IVF_NUM_LISTS,
+            n_probes=config.IVF_NUM_PROBES,
+            precision=config.LOCAL_INDEX_PRECISION,
+            rescore_factor=config.LOCAL_INDEX_RESCORE_FACTOR,
+            rescore_path=config.LOCAL_INDEX_RESCORE_PATH or None,
+        )
+        logging.info(
+            f"Built {config.VECTOR_SEARCH_BACKEND}/{config.LOCAL_INDEX_PRECISION} vector index over "
+            f"{len(index)} movies ({index.index.memory_bytes() / 2**20:.1f} MiB resident vectors)."
+        )
+        return index
+    return _get_catalog_index("local_index", build)
+
+
+def get_lexical_index():
+    """
+    Return the in-process BM25 index over titles, overviews and genre names, rebuilt in the
+    background after ingestion changes the collection, like the vector index.
+    """
+    def build():
+        from lexical_index import LexicalIndex, build_lexical_index_from_collection  # Lexical half of hybrid retrieval
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            return LexicalIndex(snapshot.documents, columns=snapshot.columns)
+        return build_lexical_index_from_collection(get_movies_collection())
+    return _get_catalog_index("lexical_index", build)
+
+
+def _warm_up_steps():
+    """(name, callable, resources it builds) triples run by warm_up, cheapest first."""
+    steps = [
+        ("mongo", lambda: get_db().client.admin.command("ping"), ["db"]),
+        ("nlp", lambda: get_nlp()("warm up query"), ["nlp"]),
+        ("model", lambda: get_model().encode("warm up query"), ["model"]),  # Dummy encode pays the first-call costs
+        ("caches", lambda: (get_embedding_cache(), get_result_cache().ensure_indexes()),
+         ["embedding_cache", "result_cache"]),
+    ]
+    if config.EMBEDDING_WORKERS > 1:
+        steps.append(("embedding_pool", lambda: get_embedding_service().warm_up(), ["embedding_service"]))
+    if config.CATALOG_SNAPSHOT_PATH:
+        steps.append(("snapshot", get_snapshot, ["snapshot"]))
+    if config.VECTOR_SEARCH_BACKEND in ("exact", "ivf"):
+        steps.append(("local_index", get_local_index, ["local_index"]))
+    if config.HYBRID_RETRIEVAL:
+        steps.append(("lexical_index", get_lexical_index, ["lexical_index"]))
+    return steps
+
+
+def warm_up(retry_delay=5.0, max_attempts=None):
+    """
+    Build every resource and run a dummy encode, retrying a failed step up to `max_attempts`
+    times. A step that keeps failing is reported by readiness() and the remaining steps still
+    run. Marks the service ready once all steps have completed.
+    Args:
+        retry_delay (float): Seconds to wait before retrying a failed step.
+        max_attempts (int): Attempts per step (default WARM_UP_MAX_ATTEMPTS, 0 = retry forever).
+    """
+    if max_attempts is None:
+        max_attempts = config.WARM_UP_MAX_ATTEMPTS
+    _warm_up_state["started"] = True
+    for name, step, _ in _warm_up_steps():
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                _warm_up_state["error"] = f"{name}: {e}"
+                if max_attempts and attempt >= max_attempts:
+                    _warm_up_state["failed"][name] = str(e)
+                    logging.exception(f"Warm-up step {name} failed {attempt} times, giving up")
+                    break
+                logging.exception(f"Warm-up step {name} failed, retrying in {retry_delay}s")
+                time.sleep(retry_delay)
+                continue
+            _warm_up_state["steps"][name] = round(time.perf_counter() - start, 3)
+            logging.info(f"Warm-up step {name} done in {_warm_up_state['steps'][name]}s")
+            break
+    if _warm_up_state["failed"]:
+        return
+    _warm_up_state["error"] = None
+    _ready.set()
+
+
+def start_background_warm_up():
+    """Run warm_up on a daemon thread (once per process, never in embedding pool workers)."""
+    import multiprocessing  # To detect pool worker processes
+    if multiprocessing.parent_process() is not None:
+        return  # A spawned worker re-imports the app module; it only needs its own model
+    with _lock:
+        if _warm_up_state["started"]:
+            return
+        _warm_up_state["started"] = True
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def is_ready():
+    """
+    True once warm-up has completed, or once requests have lazily built every resource a
+    warm-up would have (e.g. with WARM_UP_ON_START off, or after a failed step recovers).
+    """
+    if _ready.is_set():
+        return True
+    if all(name in _resources for _, _, names in _warm_up_steps() for name in names):
+        _ready.set()
+        return True
+    return False
+
+
+def readiness():
+    """
+    Returns:
+        dict: Readiness flag, completed warm-up steps with their durations, steps that gave up
+            (name -> error) and the last error.
+    """
+    ready = is_ready()
+    return {
+        "ready": ready,
+        "steps": dict(_warm_up_state["steps"]),
+        "failed": {} if ready else dict(_warm_up_state["failed"]),
+        "error": None if ready else _warm_up_state["error"],
+    }
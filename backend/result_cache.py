@@ -0,0 +1,215 @@
+# Result cache for /api/query backed by the search_history collection
+# Lookups use an indexed normalized query, optionally fall back to embedding similarity against
+# previously cached queries searched with the same pre-filters, and entries are evicted by age
+# (TTL index) and by count.
+import json  # For comparable pre-filter keys
+import logging  # For reporting index problems
+import re  # For stripping punctuation during normalization
+import threading  # To guard the in-memory similarity index
+import time  # For the similarity index refresh interval
+from datetime import datetime, timedelta, timezone  # For entry timestamps and expiry
+
+import numpy as np  # For the cached query embedding matrix
+
+# Anything that is not a letter, digit, whitespace or an in-word hyphen/apostrophe
+_PUNCTUATION = re.compile(r"[^\w\s'-]|(?<!\w)[-']|[-'](?!\w)")
+
+
+def canonical_query(text):
+    """
+    Normalize a query for cache lookups: "Funny movies!" and "funny  movies" share a key.
+    Args:
+        text (str): Raw query text.
+    Returns:
+        str: Lower-cased query without punctuation and with single spaces.
+    """
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+class ResultCache:
+    """
+    Cache of full query results.
+    Args:
+        collection: MongoDB collection holding cached results (search_history).
+        ttl_seconds (int): Age after which an entry is no longer served.
+        max_entries (int): Size cap; the oldest entries are deleted beyond it.
+        embed (callable): Optional text -> vector function enabling the similarity fallback.
+        similarity_threshold (float): Minimum cosine similarity to reuse another query's result.
+        index_refresh_seconds (float): Age after which the in-memory similarity index is reloaded,
+            so entries written by other processes become candidates (0 = never).
+    """
+
+    def __init__(self, collection, ttl_seconds=7 * 24 * 3600, max_entries=10000, embed=None,
+                 similarity_threshold=0.95, index_refresh_seconds=60.0):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.index_refresh_seconds = index_refresh_seconds
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._keys = None  # Normalized queries in the similarity index (loaded lazily)
+        self._filter_keys = None  # Pre-filter key of each cached query
+        self._vectors = None  # Unit-length embeddings, one row per key
+        self._loaded_at = 0.0  # time.monotonic() of the last load
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        """Create the lookup index and the TTL index (idempotent)."""
+        if self._indexes_ready:
+            return
+        # Imported here so canonical_query can be used without loading the MongoDB driver
+        from pymongo.errors import OperationFailure  # Raised when an index exists with other options
+        self.collection.create_index("normalized_query")
+        try:
+            # MongoDB's TTL monitor deletes expired entries in the background
+            self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        except OperationFailure as e:
+            # An existing TTL index with another expiry; reads still filter on age
+            logging.warning(f"Could not create TTL index on search history: {e}")
+        self._indexes_ready = True
+
+    def _fresh_filter(self):
+        # The TTL monitor runs about once a minute, so also filter on age when reading
+        return {"created_at": {"$gte": datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)}}
+
+    @staticmethod
+    def filter_key(filters):
+        """Comparable form of a query's pre-filters (None when unknown)."""
+        return None if filters is None else json.dumps(filters, sort_keys=True, default=str)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _load_similarity_index(self):
+        """Load the embeddings of cached queries, newest first, up to the size cap."""
+        keys, filter_keys, vectors = [], [], []
+        cursor = (
+            self.collection.find(
+                dict(self._fresh_filter(), query_embedding={"$exists": True}, search_filters={"$exists": True}),
+                {"normalized_query": 1, "query_embedding": 1, "search_filters": 1},
+            )
+            .sort("created_at", -1)
+            .limit(self.max_entries)
+        )
+        for doc in cursor:
+            keys.append(doc["normalized_query"])
+            filter_keys.append(doc["search_filters"])
+            vectors.append(doc["query_embedding"])
+        self._keys = keys
+        self._filter_keys = filter_keys
+        self._vectors = self._unit(np.asarray(vectors, dtype=np.float32)) if vectors else None
+        self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _unit(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def _most_similar(self, vector, filter_key):
+        """
+        Return (normalized query, similarity) of the closest cached query searched with the
+        same pre-filters, or (None, 0).
+        """
+        with self._lock:
+            stale = self.index_refresh_seconds and time.monotonic() - self._loaded_at > self.index_refresh_seconds
+            if self._keys is None or stale:
+                self._load_similarity_index()
+            same_filters = [i for i, key in enumerate(self._filter_keys) if key == filter_key]
+            if not same_filters:
+                return None, 0.0
+            scores = self._vectors[same_filters] @ self._unit(vector)
+            best = int(np.argmax(scores))
+            return self._keys[same_filters[best]], float(scores[best])
+
+    def get(self, query, filters=None):
+        """
+        Look up a cached result.
+        Args:
+            query (str): Raw user query.
+            filters (dict): Pre-filters the query will be searched with. The similarity fallback
+                only reuses results of queries with exactly these filters, and is skipped without them.
+        Returns:
+            dict or None: Cached result ({"similar_movies", "recommendation"}) or None on a miss.
+        """
+        self.ensure_indexes()
+        key = canonical_query(query)
+        entry = self.collection.find_one(dict(self._fresh_filter(), normalized_query=key), {"result": 1})
+        if entry:
+            self._count("exact_hits")
+            return entry["result"]
+
+        if self.embed is not None and key and filters is not None:
+            similar_key, similarity = self._most_similar(np.asarray(self.embed(key), dtype=np.float32),
+                                                         self.filter_key(filters))
+            if similar_key is not None and similarity >= self.similarity_threshold:
+                entry = self.collection.find_one(dict(self._fresh_filter(), normalized_query=similar_key), {"result": 1})
+                if entry:
+                    self._count("semantic_hits")
+                    return entry["result"]
+
+        self._count("misses")
+        return None
+
+    def put(self, query, result, filters=None):
+        """
+        Store a result and evict the oldest entries if the cache grew past its cap.
+        Args:
+            query (str): Raw user query.
+            result (dict): Result to cache.
+            filters (dict): Pre-filters the query was searched with; without them the entry is
+                only served to exact (normalized) matches.
+        """
+        self.ensure_indexes()
+        key = canonical_query(query)
+        entry = {"query": query, "normalized_query": key, "result": result, "created_at": datetime.now(timezone.utc)}
+        vector, filter_key = None, self.filter_key(filters)
+        if self.embed is not None and key and filter_key is not None:
+            vector = np.asarray(self.embed(key), dtype=np.float32)
+            entry["query_embedding"] = vector.tolist()
+            entry["search_filters"] = filter_key
+        self.collection.update_one({"normalized_query": key}, {"$set": entry}, upsert=True)
+
+        if vector is not None:
+            with self._lock:
+                if self._keys is not None and key not in self._keys:
+                    row = self._unit(vector)[np.newaxis, :]
+                    self._keys.append(key)
+                    self._filter_keys.append(filter_key)
+                    self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+        self._evict()
+
+    def _evict(self):
+        """Delete the oldest entries beyond max_entries (entries without a timestamp go first)."""
+        excess = self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = self.collection.find({}, {"_id": 1, "normalized_query": 1}).sort("created_at", 1).limit(excess)
+        oldest = list(oldest)
+        self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in oldest]}})
+        evicted = {doc.get("normalized_query") for doc in oldest}
+        with self._lock:
+            if self._keys is not None and evicted & set(self._keys):
+                keep = [i for i, k in enumerate(self._keys) if k not in evicted]
+                self._keys = [self._keys[i] for i in keep]
+                self._filter_keys = [self._filter_keys[i] for i in keep]
+                self._vectors = self._vectors[keep]
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+        Returns:
+            dict: Exact/semantic hit and miss counters and the overall hit rate.
+        """
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
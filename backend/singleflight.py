@@ -0,0 +1,70 @@
+# Request coalescing for identical in-flight work
+# When several threads ask for the same key at the same time, only the first one (the
+# leader) runs the computation; the others wait for it and share its result or exception.
+import threading  # For the in-flight table and completion events
+
+
+class _Call:
+    """One in-flight computation and the outcome shared with its waiters."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time; concurrent duplicates wait for it."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0  # Computations actually run
+        self.coalesced = 0  # Callers that reused another caller's computation
+
+    def do(self, key, function):
+        """
+        Return function(), sharing one execution among concurrent callers with the same key.
+        Args:
+            key (hashable): Identity of the computation (e.g. the normalized query).
+            function (callable): Computation to run when no identical one is in flight.
+        Returns:
+            Whatever function returns (the same object for every coalesced caller).
+        Raises:
+            Exception: The leader's exception, re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the call before waking the waiters, so later callers start a fresh computation
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """
+        Returns:
+            dict: Computations run, callers coalesced onto them and calls currently in flight.
+        """
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,395 @@
+# Versioned, memory-mappable snapshot of the movie catalog
+# A snapshot is a directory of .npy files plus a manifest, written from the movies collection:
+#   manifest.json         - format version, movie count, embedding dimension / model and column list
+#   embeddings.npy        - (count, dim) float32 matrix with unit-length rows
+#   <column>.npy          - numeric columns (vote_average, release_year, genre_mask, origin_code, ...)
+#   <column>.data.npy     - utf-8 bytes of a string column (title, overview, ...), or the flattened
+#   <column>.offsets.npy    values of a list column (genre_ids, ...), with int64 row offsets
+#   id_map.keys.npy       - id map: sorted tmdb_ids and the row of each, for binary-search lookups
+#   id_map.rows.npy
+# Every file is opened with np.load(mmap_mode="r"), so opening a snapshot reads no data: workers
+# share the page cache instead of each scanning MongoDB and holding a private copy of the catalog.
+# Usage (from backend/):
+#   python snapshot.py export catalog_snapshot    # movies collection -> snapshot directory
+#   python snapshot.py import catalog_snapshot    # snapshot directory -> movies collection
+#   python snapshot.py info catalog_snapshot
+import argparse  # For the command line interface
+import json  # For the manifest
+import logging  # For reporting export / import progress
+import os  # For file paths
+import shutil  # For replacing an existing snapshot directory
+import time  # For the creation timestamp and timings
+from array import array  # Compact column buffers while exporting
+
+import numpy as np  # For the column files and memory mapping
+
+from movie_fields import TMDB_GENRE_NAMES, structured_fields  # Genre names and pre-filter fields
+from quantization import embedding_to_array  # Reads both stored embedding formats
+from vector_index import LocalMovieIndex, FilterColumns, normalize_rows  # Index built from a snapshot
+
+# Bumped whenever the file layout changes; snapshots of another version are refused
+SNAPSHOT_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Column name -> kind. "str" / "str_list" / "int_list" columns are stored as data + offsets files
+COLUMNS = {
+    "_id": "str",
+    "tmdb_id": "int64",
+    "title": "str",
+    "overview": "str",
+    "poster_path": "str",
+    "release_date": "str",
+    "popularity": "float64",
+    "vote_average": "float64",  # Also a filter column: NaN when missing
+    "vote_count": "float64",  # Also a filter column: NaN when missing
+    "genre_ids": "int_list",
+    "country_names": "str_list",
+    "original_language": "str",
+    "content_hash": "str",  # Kept so ingestion after an import does not re-embed unchanged movies
+    "embedding_model": "str",
+    "release_year": "float64",  # Filter column: NaN when unknown
+    "genre_mask": "int64",  # Filter column
+    "origin_code": "U8",  # Filter column: "" when unknown
+}
+_LIST_SEPARATOR = "\x1f"  # Joins the items of a "str_list" row (ASCII unit separator)
+
+
+def _column_value(doc, name):
+    """Read the value of a column from a stored movie document."""
+    origin = doc.get("origin") or {}
+    if name == "country_names":
+        return origin.get("country_names") or []
+    if name == "original_language":
+        return origin.get("original_language") or ""
+    if name == "_id":
+        return str(doc["_id"])
+    return doc.get(name)
+
+
+class _ColumnWriter:
+    """Accumulates one column in compact buffers while the collection is scanned."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        if kind in ("str", "str_list"):
+            self.data, self.offsets = bytearray(), array("q", [0])
+        elif kind == "int_list":
+            self.data, self.offsets = array("q"), array("q", [0])
+        elif kind == "int64":
+            self.data = array("q")
+        elif kind == "float64":
+            self.data = array("d")
+        else:  # "U8"
+            self.data = []
+
+    def append(self, value):
+        if self.kind == "str":
+            self.data += (value or "").encode("utf-8")
+            self.offsets.append(len(self.data))
+        elif self.kind == "str_list":
+            self.data += _LIST_SEPARATOR.join(value or []).encode("utf-8")
+            self.offsets.append(len(self.data))
+        elif self.kind == "int_list":
+            self.data.extend(value or [])
+            self.offsets.append(len(self.data))
+        elif self.kind == "int64":
+            self.data.append(int(value or 0))
+        elif self.kind == "float64":
+            self.data.append(float(value) if value is not None else np.nan)
+        else:
+            self.data.append(value or "")
+
+    def save(self, directory, name):
+        """Write the column files and return their names."""
+        if self.kind in ("str", "str_list", "int_list"):
+            if self.kind == "int_list":
+                data = np.asarray(self.data, dtype=np.int32)
+            else:
+                data = np.frombuffer(bytes(self.data), dtype=np.uint8)
+            np.save(os.path.join(directory, f"{name}.data.npy"), data)
+            np.save(os.path.join(directory, f"{name}.offsets.npy"), np.asarray(self.offsets, dtype=np.int64))
+            return [f"{name}.data.npy", f"{name}.offsets.npy"]
+        np.save(os.path.join(directory, f"{name}.npy"), np.asarray(self.data, dtype=self.kind))
+        return [f"{name}.npy"]
+
+
+def replace_directory(staging, path):
+    """
+    Move a fully written directory into place, replacing (and then deleting) the previous one.
+    Not atomic: `path` is missing between the two renames, so readers must handle a missing
+    directory (files and memory maps they already opened stay valid after the delete).
+    """
+    if os.path.exists(path):
+        previous = f"{path}.old"
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(path, previous)
+        os.replace(staging, path)
+        shutil.rmtree(previous, ignore_errors=True)
+    else:
+        os.replace(staging, path)
+
+
+def export_snapshot(collection, path, block_size=16384):
+    """
+    Write every embedded movie of the collection to a snapshot directory.
+    The snapshot is assembled next to `path` and moved into place at the end, so readers
+    never see a half-written snapshot.
+    Args:
+        collection: MongoDB movies collection.
+        path (str): Snapshot directory (replaced if it exists).
+        block_size (int): Rows normalized at a time.
+    Returns:
+        dict: The manifest of the written snapshot.
+    """
+    start = time.perf_counter()
+    query = {"movie_embedding": {"$exists": True}}
+    expected = collection.count_documents(query)
+    if expected == 0:
+        raise ValueError("No movie embeddings found to export")
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    # Embeddings go straight into a memory-mapped file; the other columns into compact buffers
+    writers = {name: _ColumnWriter(kind) for name, kind in COLUMNS.items()}
+    embeddings, count, models = None, 0, set()
+    for doc in collection.find(query):
+        vector = embedding_to_array(doc.pop("movie_embedding"))
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(staging, "embeddings.npy"), mode="w+", dtype=np.float32, shape=(expected, vector.shape[0])
+            )
+        if count == expected:
+            logging.warning("Movies were added during the export; the newest are skipped.")
+            break
+        embeddings[count] = vector
+        fields = structured_fields(doc)  # Recomputed, so snapshots of older documents are complete too
+        for name, writer in writers.items():
+            writer.append(fields[name] if name in fields else _column_value(doc, name))
+        models.add(doc.get("embedding_model") or "")
+        count += 1
+
+    for row in range(0, count, block_size):
+        embeddings[row:row + block_size] = normalize_rows(embeddings[row:row + block_size])
+    dim = embeddings.shape[1]
+    embeddings.flush()
+    del embeddings
+    if count < expected:  # Movies were deleted during the export: drop the unused rows
+        full = np.load(os.path.join(staging, "embeddings.npy"), mmap_mode="r")
+        np.save(os.path.join(staging, "embeddings.tmp.npy"), full[:count])
+        del full
+        os.replace(os.path.join(staging, "embeddings.tmp.npy"), os.path.join(staging, "embeddings.npy"))
+
+    files = {"embeddings": ["embeddings.npy"]}
+    for name, writer in writers.items():
+        files[name] = writer.save(staging, name)
+    tmdb_ids = np.asarray(writers["tmdb_id"].data, dtype=np.int64)
+    order = np.argsort(tmdb_ids, kind="stable")
+    np.save(os.path.join(staging, "id_map.keys.npy"), tmdb_ids[order])
+    np.save(os.path.join(staging, "id_map.rows.npy"), order)
+    files["id_map"] = ["id_map.keys.npy", "id_map.rows.npy"]
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "count": count,
+        "dim": dim,
+        "normalized": True,
+        "embedding_models": sorted(models),
+        "columns": COLUMNS,
+        "files": files,
+    }
+    with open(os.path.join(staging, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    replace_directory(staging, path)
+    logging.info(f"Exported {count} movies ({dim}-d embeddings) to {path} in {time.perf_counter() - start:.1f}s.")
+    return manifest
+
+
+class SnapshotDocuments:
+    """
+    Read-only sequence of movie documents materialized on access from the snapshot columns,
+    so indexes can hold a snapshot "document list" without building every dict up front.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.count
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return self.snapshot.document(int(row))
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.snapshot.document(row)
+
+
+class CatalogSnapshot:
+    """
+    Catalog snapshot opened zero-copy: every column is a read-only memory map.
+    Args:
+        path (str): Snapshot directory written by export_snapshot.
+    Raises:
+        ValueError: If the snapshot was written with another format version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest.get('version')} in {path} "
+                             f"(expected {SNAPSHOT_VERSION}); export it again")
+        self.count = self.manifest["count"]
+        # Plain ndarray views of the maps: same pages, without np.memmap's per-slice overhead
+        self.arrays = {
+            file: np.load(os.path.join(path, file), mmap_mode="r").view(np.ndarray)
+            for files in self.manifest["files"].values() for file in files
+        }
+        self.embeddings = self.arrays["embeddings.npy"]
+        self.columns = FilterColumns.from_arrays(
+            self.arrays["release_year.npy"], self.arrays["vote_average.npy"], self.arrays["vote_count.npy"],
+            self.arrays["genre_mask.npy"], self.arrays["origin_code.npy"],
+        )
+        self.documents = SnapshotDocuments(self)
+
+    def __len__(self):
+        return self.count
+
+    def value(self, name, row):
+        """Read one column value of a row as a plain Python value."""
+        kind = self.manifest["columns"][name]
+        if kind in ("str", "str_list", "int_list"):
+            offsets = self.arrays[f"{name}.offsets.npy"]
+            data = self.arrays[f"{name}.data.npy"][offsets[row]:offsets[row + 1]]
+            if kind == "int_list":
+                return data.tolist()
+            text = data.tobytes().decode("utf-8")
+            return (text.split(_LIST_SEPARATOR) if text else []) if kind == "str_list" else text
+        value = self.arrays[f"{name}.npy"][row]
+        if kind == "float64":
+            return float(value) if np.isfinite(value) else None
+        return str(value) if kind == "U8" else int(value)
+
+    def document(self, row):
+        """
+        Args:
+            row (int): Row number.
+        Returns:
+            dict: The movie document of the row, as stored in MongoDB but without the embedding.
+        """
+        value = self.value
+        genre_ids = value("genre_ids", row)
+        vote_count = value("vote_count", row)
+        year = value("release_year", row)
+        return {
+            "_id": value("_id", row),
+            "tmdb_id": value("tmdb_id", row),
+            "title": value("title", row),
+            "overview": value("overview", row),
+            "poster_path": value("poster_path", row),
+            "release_date": value("release_date", row),
+            "popularity": value("popularity", row),
+            "vote_average": value("vote_average", row),
+            "vote_count": int(vote_count) if vote_count is not None else None,
+            "genre_ids": genre_ids,
+            "genre_names": [TMDB_GENRE_NAMES[genre_id] for genre_id in genre_ids if genre_id in TMDB_GENRE_NAMES],
+            "origin": {"original_language": value("original_language", row),
+                       "country_names": value("country_names", row)},
+            "content_hash": value("content_hash", row),
+            "embedding_model": value("embedding_model", row),
+            "release_year": int(year) if year is not None else None,
+            "genre_mask": value("genre_mask", row),
+            "origin_code": value("origin_code", row) or None,
+        }
+
+    def row_for_tmdb_id(self, tmdb_id):
+        """
+        Args:
+            tmdb_id (int): TMDb movie id.
+        Returns:
+            int or None: Row of the movie, found by binary search over the id map.
+        """
+        keys, rows = self.arrays["id_map.keys.npy"], self.arrays["id_map.rows.npy"]
+        position = int(np.searchsorted(keys, tmdb_id))
+        if position < len(keys) and keys[position] == tmdb_id:
+            return int(rows[position])
+        return None
+
+    def build_index(self, mode="exact", n_lists=0, n_probes=8, precision="float32", rescore_factor=4):
+        """
+        Build a local vector index over the snapshot (see vector_index.build_index_from_collection).
+        The exact float32 index scores the memory-mapped embeddings directly; quantized indexes
+        rescore against them.
+        Returns:
+            LocalMovieIndex: Index ready to answer queries.
+        """
+        return LocalMovieIndex(self.documents, self.embeddings, mode, n_lists, n_probes, precision,
+                               rescore_factor, columns=self.columns, normalized=True)
+
+
+def open_snapshot(path):
+    """Open a snapshot directory (see CatalogSnapshot)."""
+    snapshot = CatalogSnapshot(path)
+    logging.info(f"Opened catalog snapshot {path}: {snapshot.count} movies, "
+                 f"{snapshot.embeddings.shape[1]}-d embeddings.")
+    return snapshot
+
+
+def import_snapshot(path, collection, batch_size=1000, storage="array"):
+    """
+    Upsert every movie of a snapshot into a collection by tmdb_id (e.g. to seed an offline database).
+    Embeddings are written back unit-length, which leaves cosine similarities unchanged.
+    Args:
+        path (str): Snapshot directory.
+        collection: MongoDB movies collection.
+        batch_size (int): Upserts per bulk_write.
+        storage (str): movie_embedding format, "array" or "binary" (see config.EMBEDDING_STORAGE).
+    Returns:
+        int: Number of movies written.
+    """
+    from pymongo import UpdateOne  # For batched upserts
+    snapshot = open_snapshot(path)
+    operations, written = [], 0
+    for row in range(len(snapshot)):
+        doc = snapshot.document(row)
+        del doc["_id"]  # Matched by tmdb_id; existing documents keep their _id
+        vector = np.asarray(snapshot.embeddings[row], dtype=np.float32)
+        if storage == "binary":
+            from bson.binary import Binary, BinaryVectorDtype  # BSON binary float32 vector
+            doc["movie_embedding"] = Binary.from_vector(vector.tolist(), BinaryVectorDtype.FLOAT32)
+        else:
+            doc["movie_embedding"] = vector.tolist()
+        operations.append(UpdateOne({"tmdb_id": doc["tmdb_id"]}, {"$set": doc}, upsert=True))
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    logging.info(f"Imported {written} movies from {path}.")
+    return written
+
+
+if __name__ == "__main__":
+    import config  # Runtime settings (embedding storage format)
+    import resources  # Shared MongoDB client
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export / import memory-mapped catalog snapshots.")
+    parser.add_argument("command", choices=["export", "import", "info"])
+    parser.add_argument("path", help="Snapshot directory")
+    args = parser.parse_args()
+    if args.command == "export":
+        export_snapshot(resources.get_movies_collection(), args.path)
+    elif args.command == "import":
+        import_snapshot(args.path, resources.get_movies_collection(), storage=config.EMBEDDING_STORAGE)
+    else:
+        manifest = open_snapshot(args.path).manifest
+        print(json.dumps({key: manifest[key] for key in ("version", "count", "dim", "embedding_models")}, indent=2))
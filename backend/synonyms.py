@@ -0,0 +1,74 @@
+# Synonym tables used to map words in user queries to genres, origins and themes
+
+# Define genre synonyms to map user input to specific genres
+GENRE_SYNONYMS = {
+    "romance": ["romance", "romantic", "love", "rom-com", "relationship", "heartwarming"],
+    "action": ["action", "adventure", "fight", "combat", "explosions", "chase", "martial arts"],
+    "comedy": ["comedy", "funny", "humor", "satire", "laugh", "parody", "slapstick"],
+    "horror": ["horror", "scary", "thriller", "fear", "ghost", "haunted", "supernatural"],
+    "sci-fi": ["sci-fi", "science fiction", "space", "alien", "future", "technology", "time travel", "robot"],
+    "fantasy": ["fantasy", "magic", "mythical", "dragons", "sorcery", "medieval", "epic quest"],
+    "drama": ["drama", "emotional", "realistic", "life story", "tragedy", "family drama", "serious tone", "slice of life"],
+    "mystery": ["mystery", "detective", "investigation", "whodunit", "suspense", "unsolved", "clues"],
+    "crime": ["crime", "mafia", "heist", "gangster", "law", "courtroom", "underworld", "criminal"],
+    "animation": ["animation", "animated", "cartoon", "pixar", "disney", "anime", "family-friendly"],
+    "documentary": ["documentary", "true story", "non-fiction", "biography", "docuseries", "real events"],
+    "biography": ["biography", "based on true story", "real life", "famous person", "historical figure"],
+    "war": ["war", "military", "battle", "soldier", "army", "conflict", "historical war"],
+    "history": ["history", "historical", "period drama", "ancient", "past events", "timepiece"],
+    "family": ["family", "kids", "wholesome", "all ages", "lighthearted", "feel-good"],
+    "musical": ["musical", "singing", "dancing", "music", "performance", "broadway", "songs"],
+    "sports": ["sports", "athlete", "competition", "football", "basketball", "boxing", "team", "coach"],
+    "western": ["western", "cowboy", "wild west", "gunslinger", "sheriff", "desert"],
+    "spy": ["spy", "espionage", "secret agent", "CIA", "MI6", "undercover", "covert"],
+    "post-apocalyptic": ["post-apocalyptic", "wasteland", "end of the world", "dystopian", "collapse", "survival"],
+    "psychological": ["psychological", "mind-bending", "twist", "mental", "inner conflict", "inception-like"],
+    "superhero": ["superhero", "marvel", "dc", "powers", "hero", "villain", "mutant", "saving the world"],
+    "zombie": ["zombie", "undead", "infected", "outbreak", "virus", "walking dead", "apocalypse"],
+    "samurai": ["samurai", "ronin", "katana", "feudal japan", "bushido", "shogun", "edo era"],
+}
+
+ORIGIN_SYNONYMS = {
+    "korean": ["korean", "south korea", "k-drama", "k-movie", "film korea"],
+    "japanese": ["japanese", "japan", "j-drama", "japanese film", "film jepang"],
+    "indonesian": ["indonesian", "indonesia", "indo", "local film", "film indonesia"],
+    "french": ["french", "france", "film prancis"],
+    "indian": ["indian", "bollywood", "india", "hindi film", "tamil", "telugu", "film india"],
+    "thai": ["thai", "thailand", "film thailand", "thai drama", "thai movie"],
+    "chinese": ["chinese", "china", "film china", "chinese movie", "c-drama"],
+    "british": ["british", "uk", "united kingdom", "film inggris", "british film"],
+    "american": ["american", "usa", "united states", "hollywood", "film amerika"],
+    "spanish": ["spanish", "spain", "film spanyol", "spanish movie"],
+    "german": ["german", "germany", "film jerman"],
+    "turkish": ["turkish", "turkey", "film turki", "turkish drama"],
+    "iranian": ["iranian", "iran", "film iran"],
+    "russian": ["russian", "russia", "film rusia"],
+    "philippine": ["philippine", "filipino", "philippines", "film filipina"]
+}
+
+THEME_SYNONYMS = {
+    "mind-bending": [
+        "mind-bending", "thought-provoking", "complex", "inception", "makes you think", 
+        "twisted plot", "puzzle", "psychological twist", "confusing at first"
+    ],
+    "emotional": [
+        "emotional", "heartbreaking", "tearjerker", "sad", "touching", "soul-crushing", 
+        "makes you cry", "melancholy", "heartfelt", "tragic"
+    ],
+    "inspirational": [
+        "inspiring", "motivational", "life-changing", "uplifting", "powerful message", 
+        "based on true events", "overcoming odds", "heroic journey", "resilience"
+    ],
+    "moral": [
+        "moral lesson", "philosophical", "deep message", "values", "ethical dilemma", 
+        "teaches something", "social commentary", "life meaning", "reflective"
+    ],
+    "psychological": [
+        "psychological", "mental", "manipulative", "dark thoughts", "dual personality", 
+        "internal conflict", "identity crisis", "emotional breakdown", "mind games"
+    ],
+    "twist": [
+        "plot twist", "unexpected ending", "shocking", "surprising turn", "unpredictable", 
+        "revealing twist", "big reveal", "twisted", "double meaning"
+    ]
+}
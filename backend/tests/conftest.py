@@ -0,0 +1,22 @@
+# Shared pytest setup. Run from backend/:  python -m pytest tests
+# Tests use the in-process stand-ins of benchmarks/local_stack.py (no MongoDB, models or network).
+import os  # For locating the backend modules
+import sys  # For extending the import path
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND, os.path.join(BACKEND, "benchmarks")]
+
+import pytest  # noqa: E402
+
+import config  # noqa: E402
+import resources  # noqa: E402
+
+config.WARM_UP_ON_START = False  # create_app() must not warm up real services in tests
+
+
+@pytest.fixture(autouse=True)
+def fresh_resources():
+    """Every test builds its own resources (and stand-ins)."""
+    resources.reset()
+    yield
+    resources.reset()
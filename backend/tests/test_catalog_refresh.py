@@ -0,0 +1,81 @@
+# In-process indexes are rebuilt after ingestion changes the movies collection
+import time  # For waiting on the background rebuild
+
+import numpy as np  # For the added movie's embedding
+
+import config
+import resources
+from local_stack import build_stack, install, synthetic_movies
+
+
+def wait_for_new(name, old, timeout=5.0):
+    """Wait until the background rebuild swapped in a new resource."""
+    end = time.monotonic() + timeout
+    while resources.peek(name) is old and time.monotonic() < end:
+        time.sleep(0.01)
+    return resources.peek(name)
+
+
+def test_local_index_rebuilt_when_a_movie_is_added(monkeypatch):
+    monkeypatch.setattr(config, "VECTOR_SEARCH_BACKEND", "exact")
+    monkeypatch.setattr(config, "CATALOG_SNAPSHOT_PATH", "")
+    monkeypatch.setattr(config, "CATALOG_REFRESH_SECONDS", 0.01)
+    db, encoder = build_stack(50)
+    install(db, encoder)
+    index = resources.get_local_index()
+    assert len(index) == 50
+
+    time.sleep(0.02)
+    assert resources.get_local_index() is index  # Unchanged catalog: nothing rebuilt
+
+    movie = synthetic_movies(51)[50]
+    db["movies"].insert_one(dict(movie, movie_embedding=encoder.encode([movie["title"]])[0].tolist()))
+    time.sleep(0.02)
+    assert resources.get_local_index() is index  # Still served while the rebuild runs
+    rebuilt = wait_for_new("local_index", index)
+    assert len(rebuilt) == 51
+
+
+def test_local_index_rebuilt_when_ingestion_marks_a_change(monkeypatch):
+    monkeypatch.setattr(config, "VECTOR_SEARCH_BACKEND", "exact")
+    monkeypatch.setattr(config, "CATALOG_SNAPSHOT_PATH", "")
+    monkeypatch.setattr(config, "CATALOG_REFRESH_SECONDS", 0.01)
+    db, encoder = build_stack(20)
+    install(db, encoder)
+    index = resources.get_local_index()
+
+    # Re-embedding keeps the count; process_data.mark_catalog_changed bumps the timestamp
+    db["movies"].update_one({"tmdb_id": 100000}, {"$set": {"movie_embedding": np.ones(encoder.dim).tolist()}})
+    db["ingest_state"].update_one({"_id": "catalog"}, {"$set": {"updated_at": 1}}, upsert=True)
+    time.sleep(0.02)
+    resources.get_local_index()
+    rebuilt = wait_for_new("local_index", index)
+    assert rebuilt is not index
+
+
+def test_stand_ins_are_never_rebuilt(monkeypatch):
+    monkeypatch.setattr(config, "CATALOG_REFRESH_SECONDS", 0.01)
+    db, encoder = build_stack(10)
+    install(db, encoder)
+    stand_in = object()
+    resources.set_resource("local_index", stand_in)
+    db["ingest_state"].update_one({"_id": "catalog"}, {"$set": {"updated_at": 1}}, upsert=True)
+    time.sleep(0.02)
+    assert resources.get_local_index() is stand_in
+
+
+def test_lexical_index_rebuilt_when_a_movie_is_added(monkeypatch):
+    monkeypatch.setattr(config, "CATALOG_SNAPSHOT_PATH", "")
+    monkeypatch.setattr(config, "CATALOG_REFRESH_SECONDS", 0.01)
+    db, encoder = build_stack(30)
+    install(db, encoder)
+    index = resources.get_lexical_index()
+    assert len(index) == 30
+
+    movie = dict(synthetic_movies(31)[30], title="Zyzzyva Returns")
+    db["movies"].insert_one(dict(movie, movie_embedding=encoder.encode([movie["title"]])[0].tolist()))
+    time.sleep(0.02)
+    resources.get_lexical_index()
+    rebuilt = wait_for_new("lexical_index", index)
+    assert len(rebuilt) == 31
+    assert [hit["title"] for hit in rebuilt.search("zyzzyva", limit=1)] == ["Zyzzyva Returns"]
@@ -0,0 +1,89 @@
+# Request coalescing: concurrent identical /api/query requests share one upstream computation
+import threading  # For holding the LLM call until every request is in flight
+import time  # For polling the coalescing counters
+from concurrent.futures import ThreadPoolExecutor  # For the concurrent requests
+
+import pytest
+
+import config
+import generator
+from fake_llm import FakeLLM
+from llm_guard import CircuitBreaker
+from local_stack import FakeEncoder, FakeNLP, build_stack, install
+from singleflight import SingleFlight
+
+
+class GatedLLM(FakeLLM):
+    """FakeLLM whose calls wait until the test opens the gate."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def converse(self, prompt):
+        assert self.gate.wait(10), "gate never opened"
+        return super().converse(prompt)
+
+
+def wait_until(condition, timeout=10.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out waiting for the requests"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def stack(monkeypatch):
+    import app
+    monkeypatch.setattr(config, "VECTOR_SEARCH_BACKEND", "atlas")
+    monkeypatch.setattr(config, "SINGLEFLIGHT_ENABLED", True)
+    monkeypatch.setattr(app, "query_flights", SingleFlight())
+    monkeypatch.setattr(generator, "breaker", CircuitBreaker(failure_threshold=100, slow_call_seconds=0))
+    llm = GatedLLM()
+    generator.set_llm_backend(llm)
+    encoder = FakeEncoder()
+    db, _ = build_stack(200, encoder=encoder)
+    install(db, encoder, FakeNLP())
+    app._process_query_cached.cache_clear()
+    encoder.calls = 0
+    yield app, llm, encoder, db["movies"]
+    generator.set_llm_backend(None)
+
+
+def post_all(app, payloads):
+    client = app.create_app(warm_up=False).test_client()
+    pool = ThreadPoolExecutor(max_workers=len(payloads))
+    return pool, [pool.submit(client.post, "/api/query", json=payload) for payload in payloads]
+
+
+def test_identical_queries_make_one_upstream_call_each(stack):
+    app, llm, encoder, movies = stack
+    n = 8
+    searches = movies.calls.get("aggregate", 0)
+    pool, futures = post_all(app, [{"query": "horror movies set in space"}] * n)
+    wait_until(lambda: app.query_flights.stats()["coalesced"] == n - 1)
+    llm.gate.set()
+    responses = [future.result(timeout=10) for future in futures]
+    pool.shutdown()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.get_json()["recommendation"] for response in responses}) == 1
+    assert encoder.calls == 1
+    assert movies.calls.get("aggregate", 0) - searches == 1
+    assert llm.calls == 1
+
+
+def test_different_llm_budgets_are_not_coalesced(stack):
+    app, llm, _, _ = stack
+    payloads = [
+        {"query": "horror movies set in space", "llm_timeout": 2},
+        {"query": "horror movies set in space", "llm_timeout": 5},
+        {"query": "horror movies set in space", "llm_timeout": config.LLM_TIMEOUT_SECONDS * 2},  # Capped
+        {"query": "horror movies set in space"},  # Same effective budget as the capped one
+    ]
+    pool, futures = post_all(app, payloads)
+    wait_until(lambda: app.query_flights.stats()["leaders"] == 3 and app.query_flights.stats()["coalesced"] == 1)
+    llm.gate.set()
+    assert all(future.result(timeout=10).status_code == 200 for future in futures)
+    pool.shutdown()
+    assert app.query_flights.stats() == {"leaders": 3, "coalesced": 1, "in_flight": 0}
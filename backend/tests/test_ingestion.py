@@ -0,0 +1,99 @@
+# Incremental, resumable ingestion (process_data) against the TMDb stub and an in-memory database
+import pytest
+
+import config
+import process_data
+from knn_graph import KnnGraph
+from local_stack import FakeDatabase, FakeEncoder
+from tmdb_client import TMDBClient
+from tmdb_stub import MOVIES_PER_PAGE, start_stub_server
+
+PAGES = 6
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(config, "INGEST_FLUSH_SIZE", 2 * MOVIES_PER_PAGE)  # Checkpoint every 2 pages
+    monkeypatch.setattr(config, "TMDB_MAX_WORKERS", 2)  # Fetch 2 pages per round
+    monkeypatch.setattr(config, "KNN_GRAPH_PATH", "")
+    monkeypatch.setattr(config, "EMBEDDING_STORAGE", "array")
+    server, state, base_url = start_stub_server(pages=PAGES)
+    tmdb = TMDBClient("test-key", base_url=base_url, max_workers=4, rate_per_second=0, max_retries=0)
+    yield state, tmdb
+    tmdb.close()
+    server.shutdown()
+
+
+def test_second_run_embeds_nothing(stub):
+    state, tmdb = stub
+    db, encoder = FakeDatabase(), FakeEncoder(dim=16)
+    assert process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=PAGES) == PAGES * MOVIES_PER_PAGE
+    movies = db["movies"]
+    assert movies.count_documents({}) == PAGES * MOVIES_PER_PAGE
+    assert all(doc["origin_code"] and doc["content_hash"] for doc in movies.docs)
+
+    requests, encodes = state.request_count, encoder.calls
+    assert process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=PAGES) == 0
+    assert encoder.calls == encodes
+    assert state.request_count - requests == 1 + PAGES  # Genres and list pages only, no details
+    # The list entries have no original_language: the stored origin_code must survive
+    assert all(doc["origin_code"] for doc in movies.docs)
+    assert movies.count_documents({}) == PAGES * MOVIES_PER_PAGE
+
+
+def test_missing_origin_fetches_details_without_re_embedding(stub):
+    state, tmdb = stub
+    db, encoder = FakeDatabase(), FakeEncoder(dim=16)
+    process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=1)
+    doc = db["movies"].docs[0]
+    doc.pop("origin")
+    embedding, encodes, requests = doc["movie_embedding"], encoder.calls, state.request_count
+
+    assert process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=1) == 0
+    assert encoder.calls == encodes
+    assert state.request_count - requests == 3  # Genres, the list page and one details call
+    assert doc["origin"]["original_language"] and doc["movie_embedding"] == embedding
+
+
+def test_failed_page_keeps_checkpoint_and_resume_continues(stub):
+    state, tmdb = stub
+    db, encoder = FakeDatabase(), FakeEncoder(dim=16)
+    state.failing_pages = {4}
+    with pytest.raises(RuntimeError, match="page 4"):
+        process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=PAGES)
+    # Pages 1-2 were flushed, page 3 was stored when page 4 failed
+    assert process_data.load_checkpoint(db["ingest_state"]) == 3
+    assert db["movies"].count_documents({}) == 3 * MOVIES_PER_PAGE
+
+    state.failing_pages, state.popular_pages = set(), []
+    embedded = process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=PAGES)
+    assert sorted(state.popular_pages) == [4, 5, 6]
+    assert embedded == 3 * MOVIES_PER_PAGE
+    assert db["movies"].count_documents({}) == PAGES * MOVIES_PER_PAGE
+    assert process_data.load_checkpoint(db["ingest_state"]) == 0  # Completed: the next run starts over
+
+
+def test_knn_graph_refreshed_when_nothing_was_embedded(stub, monkeypatch, tmp_path):
+    state, tmdb = stub
+    db, encoder = FakeDatabase(), FakeEncoder(dim=16)
+    process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=2)  # Graph not enabled yet
+
+    monkeypatch.setattr(config, "KNN_GRAPH_PATH", str(tmp_path / "knn"))
+    monkeypatch.setattr(config, "KNN_GRAPH_K", 5)
+    assert process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=2) == 0
+    assert len(KnnGraph(config.KNN_GRAPH_PATH)) == 2 * MOVIES_PER_PAGE
+
+
+def test_metadata_changes_are_written_without_re_embedding(stub):
+    state, tmdb = stub
+    db, encoder = FakeDatabase(), FakeEncoder(dim=16)
+    process_data.seed_database_from_tmdb(db, encoder, tmdb, pages=1)
+    stored = db["movies"].find_one({"tmdb_id": 1})
+    bumped = dict(process_data.fetch_tmdb_movies(tmdb, 1)[0], popularity=999.0, vote_count=12345)
+    encodes = encoder.calls
+
+    assert process_data.seed_movies([bumped], {}, db["movies"], encoder, tmdb) == 0
+    updated = db["movies"].find_one({"tmdb_id": 1})
+    assert encoder.calls == encodes
+    assert (updated["popularity"], updated["vote_count"]) == (999.0, 12345)
+    assert updated["movie_embedding"] == stored["movie_embedding"]
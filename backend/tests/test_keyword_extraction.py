@@ -0,0 +1,49 @@
+# Keyword extraction: the lean spaCy pipeline gives the same keywords as the full one, and
+# process_query / process_queries memoize and batch without changing them
+import pytest
+
+import resources
+from bench_process_query import SAMPLE_QUERIES, legacy_keywords
+from keyword_extraction import extract_keywords, load_nlp
+from local_stack import FakeNLP
+
+
+@pytest.fixture(scope="module")
+def pipelines():
+    pytest.importorskip("en_core_web_sm", reason="spaCy model en_core_web_sm is not installed")
+    return load_nlp(lean=False), load_nlp()
+
+
+@pytest.mark.parametrize("query", SAMPLE_QUERIES)
+def test_lean_pipeline_keeps_the_keywords(pipelines, query):
+    full, lean = pipelines
+    expected, actual = legacy_keywords(full(query)), extract_keywords(lean(query))
+    assert sorted(actual) == sorted(expected)
+
+
+def test_pipe_matches_single_queries(pipelines):
+    _, lean = pipelines
+    batched = [extract_keywords(doc) for doc in lean.pipe(SAMPLE_QUERIES, batch_size=8)]
+    assert batched == [extract_keywords(lean(query)) for query in SAMPLE_QUERIES]
+
+
+class CountingNLP(FakeNLP):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return super().__call__(text)
+
+
+def test_process_query_is_memoized():
+    import app
+    nlp = CountingNLP()
+    resources.set_resource("nlp", nlp)
+    app._process_query_cached.cache_clear()
+    first = app.process_query("scary ghost movies tonight")
+    first.append("changed by the caller")
+    assert app.process_query("scary ghost movies tonight") == ["scary", "ghost", "movies", "tonight"]
+    assert nlp.calls == 1
+    assert app.process_queries(["scary ghost movies tonight"]) == [["scary", "ghost", "movies", "tonight"]]
+    app._process_query_cached.cache_clear()
@@ -0,0 +1,129 @@
+# LLM deadlines, hedging, the circuit breaker and the degraded fallback, without timing assumptions:
+# slow calls block on events that the test controls, and the breaker runs on a fake clock
+import json  # For reading streamed events
+import threading  # For blocking the fake LLM calls
+
+import pytest
+
+import config
+import generator
+from fake_llm import FakeLLM
+from llm_guard import CircuitBreaker, LLMTimeout, call_with_deadline
+from local_stack import FakeEncoder, FakeNLP, build_stack, install
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def release():
+    """Event that blocked calls wait on; set at teardown so no worker thread hangs."""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_deadline_expires_while_the_call_hangs(release):
+    with pytest.raises(LLMTimeout):
+        call_with_deadline(release.wait, timeout=0.05)
+
+
+def test_answer_and_error_before_the_deadline():
+    def fail():
+        raise ValueError("upstream")
+
+    assert call_with_deadline(lambda: "answer", timeout=30) == "answer"
+    with pytest.raises(ValueError, match="upstream"):
+        call_with_deadline(fail, timeout=30)
+
+
+def test_hedged_attempt_answers_for_a_hung_one(release):
+    attempts, hedges = [], []
+
+    def attempt():
+        attempts.append(None)
+        if len(attempts) == 1:
+            release.wait()  # The first attempt hangs until teardown
+            return "first"
+        return "second"
+
+    assert call_with_deadline(attempt, timeout=30, hedge_after=0.01, on_hedge=lambda: hedges.append(None)) == "second"
+    assert len(attempts) == 2 and len(hedges) == 1
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()  # One failure is below the threshold
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.stats() == {"state": "open", "failures": 2, "trips": 1, "rejected": 1}
+
+    clock.now = 30
+    assert breaker.allow()  # Half-open: one trial call
+    assert not breaker.allow()  # Only one trial at a time
+    breaker.record_failure()  # Failed trial: open again for reset_seconds
+    assert breaker.stats()["state"] == "open" and breaker.stats()["trips"] == 2
+    clock.now = 59
+    assert not breaker.allow()
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_slow_successes_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1.0, clock=FakeClock())
+    breaker.record_success(5.0)
+    breaker.record_success(5.0)
+    assert breaker.stats()["state"] == "open"
+
+
+@pytest.fixture
+def failing_app(monkeypatch):
+    import app
+    monkeypatch.setattr(config, "VECTOR_SEARCH_BACKEND", "atlas")
+    monkeypatch.setattr(config, "LLM_DEGRADED_FALLBACK", True)
+    monkeypatch.setattr(config, "LLM_HEDGE_AFTER_SECONDS", 0)
+    clock = FakeClock()
+    monkeypatch.setattr(generator, "breaker", CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock))
+    llm = FakeLLM(failure_rate=1.0)
+    generator.set_llm_backend(llm)
+    encoder = FakeEncoder()
+    db, _ = build_stack(100, encoder=encoder)
+    install(db, encoder, FakeNLP())
+    app._process_query_cached.cache_clear()
+    yield app.create_app(warm_up=False).test_client(), llm, clock
+    generator.set_llm_backend(None)
+
+
+def test_failed_llm_call_answers_degraded_then_breaker_skips_the_llm(failing_app):
+    client, llm, clock = failing_app
+    body = client.post("/api/query", json={"query": "horror movies set in space"}).get_json()
+    assert body["degraded"] is True and body["similar_movies"]
+    assert llm.calls == 1
+
+    # The breaker is open: the next request falls back without calling the LLM
+    body = client.post("/api/query", json={"query": "funny animated movies"}).get_json()
+    assert body["degraded"] is True
+    assert llm.calls == 1
+
+    lines = client.post("/api/query/stream", json={"query": "funny animated movies"}).get_data(as_text=True)
+    events = [json.loads(line)["type"] for line in lines.splitlines()]
+    assert events == ["movies", "degraded", "token", "done"]
+    assert llm.calls == 1
+
+    # After reset_seconds a recovered LLM closes the breaker again
+    llm.failure_rate = 0.0
+    clock.now = 30
+    body = client.post("/api/query", json={"query": "funny animated movies"}).get_json()
+    assert "degraded" not in body and llm.calls == 2
+    assert generator.breaker.stats()["state"] == "closed"
@@ -0,0 +1,33 @@
+# The compiled synonym matcher keeps the labels of the original per-table keyword loops
+import pytest
+
+from bench_query_matcher import EXPECTED_DIFFERENCES, SAMPLE_QUERIES, compiled_all, legacy_all, legacy_enrich
+from query_matcher import SynonymMatcher
+from synonyms import GENRE_SYNONYMS, ORIGIN_SYNONYMS, THEME_SYNONYMS
+
+MATCHER = SynonymMatcher({"genre": GENRE_SYNONYMS, "theme": THEME_SYNONYMS, "origin": ORIGIN_SYNONYMS})
+
+
+@pytest.mark.parametrize("query, keywords", SAMPLE_QUERIES)
+def test_labels_match_the_legacy_loops(query, keywords):
+    assert compiled_all(MATCHER, query, keywords) == EXPECTED_DIFFERENCES.get(query, legacy_all(keywords))
+
+
+@pytest.mark.parametrize("query, keywords", SAMPLE_QUERIES)
+def test_enrich_query_matches_the_legacy_enrichment(query, keywords):
+    import app
+    if query not in EXPECTED_DIFFERENCES:
+        assert app.enrich_query(query, keywords) == legacy_enrich(keywords)
+
+
+def test_whole_keyword_wins_over_an_earlier_phrase():
+    # The theme comes from the first keyword that is a synonym ("plot twist"), at the place where
+    # that keyword occurs, not from the earlier "twist ending"
+    matches = MATCHER.match("a twist ending and an emotional plot twist", ["plot twist", "twist", "emotional"])
+    assert matches["theme"]["label"] == "twist" and matches["theme"]["phrase"] == "plot twist"
+    assert matches["theme"]["start"] == len("a twist ending and an emotional ")
+
+
+def test_single_words_must_be_keywords():
+    assert MATCHER.match("i'd love a quiet movie", ["quiet movie", "quiet", "movie"])["genre"] is None
+    assert MATCHER.match("love and time travel", ["love", "time travel"])["genre"]["label"] == "romance"
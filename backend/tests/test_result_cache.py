@@ -0,0 +1,48 @@
+# Result cache: normalized lookups and the filter-scoped similarity fallback
+import time  # For the similarity index refresh
+
+from local_stack import FakeCollection, FakeEncoder
+from result_cache import ResultCache
+
+RECENT = {"release_year": {"$gte": 2020}}
+OLD = {"release_year": {"$lt": 2000}}
+
+
+def make_cache(collection=None, **kwargs):
+    encoder = FakeEncoder(dim=64)
+    options = dict(embed=encoder.encode, similarity_threshold=0.5)
+    options.update(kwargs)
+    return ResultCache(collection if collection is not None else FakeCollection(), **options)
+
+
+def test_normalized_query_hits():
+    cache = make_cache(embed=None)
+    cache.put("Funny movies!", {"recommendation": "a"})
+    assert cache.get("funny   movies") == {"recommendation": "a"}
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_similar_query_needs_the_same_filters():
+    cache = make_cache()
+    cache.put("recent horror movies", {"recommendation": "recent"}, RECENT)
+    assert cache.get("horror movies recent", RECENT) == {"recommendation": "recent"}
+    assert cache.get("old horror movies", OLD) is None  # Similar text, other filters
+    assert cache.get("horror movies recent") is None  # Filters unknown: exact lookups only
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_entries_without_filters_are_exact_only():
+    cache = make_cache()
+    cache.put("recent horror movies", {"recommendation": "recent"})
+    assert cache.get("horror movies recent", {}) is None
+    assert cache.get("recent horror movies", {}) == {"recommendation": "recent"}
+
+
+def test_similarity_index_picks_up_other_processes_entries():
+    collection = FakeCollection()
+    reader = make_cache(collection, index_refresh_seconds=0.05)
+    writer = make_cache(collection)
+    assert reader.get("space adventure movies", {}) is None  # Loads an empty index
+    writer.put("adventure movies in space", {"recommendation": "space"}, {})
+    time.sleep(0.1)
+    assert reader.get("space adventure movies", {}) == {"recommendation": "space"}
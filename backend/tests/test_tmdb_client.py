@@ -0,0 +1,93 @@
+# TMDBClient against the local TMDb stub: upstream calls for retries, rate limiting and the cache
+import time  # For the rate limit and Retry-After timings
+
+import pytest
+
+from tmdb_client import TMDBClient
+from tmdb_stub import start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server, state, base_url = start_stub_server(pages=50)
+    yield state, base_url
+    server.shutdown()
+
+
+def make_client(base_url, **kwargs):
+    options = dict(max_workers=4, rate_per_second=0, max_retries=3, backoff=0.01)
+    options.update(kwargs)
+    return TMDBClient("test-key", base_url=base_url, **options)
+
+
+def test_retries_429_and_5xx(stub):
+    state, base_url = stub
+    state.failures = [429, 503, 500]
+    client = make_client(base_url)
+    try:
+        body = client.get("/genre/movie/list")
+    finally:
+        client.close()
+    assert body["genres"]
+    assert state.request_count == 4  # Three failures, then the answer
+
+
+def test_gives_up_after_max_retries_and_on_client_errors(stub):
+    state, base_url = stub
+    state.failures = [503] * 10
+    client = make_client(base_url, max_retries=2)
+    try:
+        assert client.get("/movie/popular", {"page": 1}) is None
+        assert state.request_count == 3
+        state.failures = [404]
+        assert client.get("/movie/popular", {"page": 2}) is None
+        assert state.request_count == 4  # Not retried
+    finally:
+        client.close()
+
+
+def test_retry_after_is_capped(stub):
+    state, base_url = stub
+    state.failures, state.retry_after = [429], "3600"
+    client = make_client(base_url, max_backoff=0.05)
+    start = time.monotonic()
+    try:
+        assert client.get("/genre/movie/list") is not None
+    finally:
+        client.close()
+    assert time.monotonic() - start < 5
+    assert state.request_count == 2
+
+
+def test_cache_hits_skip_the_upstream(stub, tmp_path):
+    state, base_url = stub
+    client = make_client(base_url, cache_dir=str(tmp_path))
+    try:
+        first = client.get_many([("/movie/popular", {"page": page}) for page in range(1, 6)])
+        second = client.get_many([("/movie/popular", {"page": page}) for page in range(1, 6)])
+    finally:
+        client.close()
+    assert first == second
+    assert state.request_count == 5
+
+    uncached = make_client(base_url)
+    try:
+        uncached.get("/movie/popular", {"page": 1})
+    finally:
+        uncached.close()
+    assert state.request_count == 6  # No cache unless a directory is given
+
+
+def test_rate_limit(stub):
+    state, base_url = stub
+    rate = 20
+    client = make_client(base_url, rate_per_second=rate, max_workers=8)
+    start = time.monotonic()
+    try:
+        bodies = client.get_many([("/movie/popular", {"page": page}) for page in range(1, 41)])
+    finally:
+        client.close()
+    elapsed = time.monotonic() - start
+    assert all(bodies) and state.request_count == 40
+    # A full bucket allows a burst of `rate` requests, the other 20 wait for new tokens
+    assert elapsed >= (40 - rate) / rate * 0.9
@@ -0,0 +1,83 @@
+# Timing spans around the stages of the query path
+# Every `with span("encode"):` block is observed in the recommender_stage_duration_seconds
+# histogram served by /metrics (and counted in recommender_stage_errors_total if it raises).
+# While a SpanRecorder is installed (e.g. by benchmarks/bench_query_path.py) the raw
+# durations are also collected under their stage names for percentile reports.
+import threading  # To record spans from concurrent request threads
+import time  # For monotonic high-resolution timings
+from collections import defaultdict  # For per-stage duration lists
+from contextlib import contextmanager  # For the span helper
+
+import numpy as np  # For percentiles
+
+from metrics import STAGE_ERRORS, STAGE_SECONDS  # Prometheus stage metrics
+
+# Recorder that receives span durations, or None when timings are not collected
+_recorder = None
+
+
+class SpanRecorder:
+    """Collect span durations per stage name."""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """Add one duration (in seconds) for a stage."""
+        with self._lock:
+            self.durations[name].append(seconds)
+
+    def summary(self, wall_seconds=None):
+        """
+        Summarize the recorded durations.
+        Args:
+            wall_seconds (float): Wall-clock length of the run, for throughput.
+        Returns:
+            dict: Stage -> {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "total_ms"
+                [, "throughput_per_s"]}.
+        """
+        with self._lock:
+            durations = {name: np.asarray(values) * 1000.0 for name, values in self.durations.items()}
+        stages = {}
+        for name, values in durations.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stages[name] = {
+                "count": int(len(values)),
+                "mean_ms": round(float(values.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "total_ms": round(float(values.sum()), 3),
+            }
+            if wall_seconds:
+                stages[name]["throughput_per_s"] = round(len(values) / wall_seconds, 2)
+        return stages
+
+
+def set_recorder(recorder):
+    """
+    Install the recorder that receives span durations (None stops recording).
+    Returns:
+        SpanRecorder or None: The previously installed recorder.
+    """
+    global _recorder
+    previous, _recorder = _recorder, recorder
+    return previous
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as one occurrence of the named stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        recorder = _recorder
+        if recorder is not None:
+            recorder.record(name, elapsed)
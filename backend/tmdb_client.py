@@ -0,0 +1,200 @@
+# Concurrent, rate-limited client for The Movie Database (TMDb) API
+# All requests share one pooled HTTP session, run on a bounded thread pool, respect a
+# token-bucket rate limit, retry transient failures with backoff and can be served
+# from an on-disk response cache.
+import hashlib  # For content-addressed cache keys
+import json  # For serializing cached responses
+import logging  # For logging retries and failures
+import os  # For cache file handling
+import random  # For jitter in the retry backoff
+import threading  # For the rate limiter lock
+import time  # For rate limiting, backoff and cache expiry
+from concurrent.futures import ThreadPoolExecutor  # For running requests concurrently
+
+import requests  # For making HTTP requests to external APIs
+from requests.adapters import HTTPAdapter  # For sizing the connection pool
+
+# Status codes worth retrying: rate limited or a transient server-side failure
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by all worker threads.
+    Allows bursts of up to `capacity` requests and `rate` requests per second on average.
+    A rate of 0 (or less) disables the limit.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        if self.rate <= 0:
+            return  # Unlimited
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """
+    On-disk cache of JSON responses, one file per request named by the SHA-256 of the request.
+    The API key is left out of the key so rotating keys does not invalidate the cache.
+    """
+
+    def __init__(self, directory, ttl=0):
+        self.directory = directory
+        self.ttl = ttl  # Seconds before an entry is considered stale (0 = never)
+
+    @staticmethod
+    def key(path, params):
+        """Hash a request path and its parameters (minus the API key) into a cache key."""
+        public_params = {k: v for k, v in sorted(params.items()) if k != "api_key"}
+        payload = json.dumps({"path": path, "params": public_params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached response body, or None when missing or stale."""
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, body):
+        """Store a response body atomically (write to a temp file, then rename)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(body, f)
+        os.replace(tmp_path, path)
+
+
+class TMDBClient:
+    """
+    Thread-pool based TMDb client.
+    Args:
+        api_key (str): TMDb API key.
+        base_url (str): API root, e.g. "https://api.themoviedb.org/3" or a local stub server.
+        max_workers (int): Maximum number of requests in flight.
+        rate_per_second (float): Average request rate allowed by the token bucket.
+        max_retries (int): Retries for connection errors and retryable status codes.
+        backoff (float): Base delay in seconds for exponential backoff.
+        max_backoff (float): Longest wait between attempts, also for a server's Retry-After.
+        cache_dir (str): Directory for the response cache (None disables caching).
+        cache_ttl (int): Seconds before a cached response is re-fetched (0 = never).
+        timeout (float): Per-request timeout in seconds.
+    """
+
+    def __init__(self, api_key, base_url="https://api.themoviedb.org/3", max_workers=8,
+                 rate_per_second=40, max_retries=4, backoff=0.5, max_backoff=30.0, cache_dir=None, cache_ttl=0,
+                 timeout=10):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.rate_limiter = TokenBucket(rate_per_second)
+        self.cache = ResponseCache(cache_dir, cache_ttl) if cache_dir else None
+
+        # One session with a connection pool large enough for every worker thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tmdb")
+
+    def _retry_delay(self, attempt, response=None):
+        """
+        Exponential backoff with jitter, honouring a Retry-After header (in seconds) when present.
+        Capped at max_backoff, so a bogus Retry-After cannot stall ingestion.
+        """
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                delay = max(0.0, float(response.headers["Retry-After"]))
+            except ValueError:
+                pass
+        return min(delay, self.max_backoff)
+
+    def get(self, path, params=None):
+        """
+        Send a GET request to a TMDb endpoint.
+        Args:
+            path (str): Endpoint path, e.g. "/movie/popular".
+            params (dict): Query parameters (the API key is added automatically).
+        Returns:
+            dict or None: Parsed JSON body, or None if the request ultimately failed.
+        """
+        params = dict(params or {})
+        cache_key = ResponseCache.key(path, params) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        params["api_key"] = self.api_key
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            response = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Log only the error type: the message contains the full URL, including the API key
+                logging.warning(f"TMDB request {path} failed ({type(e).__name__}), attempt {attempt + 1}")
+            else:
+                if response.status_code == 200:
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        # HTML error page or truncated body behind a 200: retry like a transient failure
+                        logging.warning(f"TMDB request {path} returned an invalid JSON body, attempt {attempt + 1}")
+                    else:
+                        if cache_key:
+                            self.cache.put(cache_key, body)
+                        return body
+                elif response.status_code not in RETRYABLE_STATUS_CODES:
+                    logging.error(f"TMDB request {path} failed: {response.status_code}")
+                    return None
+                else:
+                    logging.warning(f"TMDB request {path} returned {response.status_code}, attempt {attempt + 1}")
+            if attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, response))
+        logging.error(f"TMDB request {path} failed after {self.max_retries + 1} attempts")
+        return None
+
+    def get_many(self, calls):
+        """
+        Run many GET requests concurrently.
+        Args:
+            calls (list): (path, params) tuples.
+        Returns:
+            list: Responses in the same order as the requests (None for failures).
+        """
+        return list(self._executor.map(lambda call: self.get(*call), calls))
+
+    def close(self):
+        """Shut down the worker threads and the HTTP session."""
+        self._executor.shutdown(wait=True)
+        self.session.close()
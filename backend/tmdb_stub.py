@@ -0,0 +1,137 @@
+# Local stand-in for the TMDb API, serving deterministic synthetic movies
+# Point TMDB_BASE_URL at it (e.g. http://127.0.0.1:8765/3) to run ingestion offline.
+# Usage: python tmdb_stub.py --port 8765 --pages 50
+import argparse  # For command line options
+import json  # For encoding responses
+import random  # For optional failure injection
+import threading  # For counting requests across handler threads
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Minimal HTTP server
+from urllib.parse import parse_qs, urlparse  # For parsing request paths and parameters
+
+# A subset of TMDb's real movie genre list
+STUB_GENRES = [
+    {"id": 28, "name": "Action"},
+    {"id": 35, "name": "Comedy"},
+    {"id": 18, "name": "Drama"},
+    {"id": 27, "name": "Horror"},
+    {"id": 878, "name": "Science Fiction"},
+    {"id": 10749, "name": "Romance"},
+]
+STUB_LANGUAGES = [("en", "United States of America"), ("ko", "South Korea"), ("ja", "Japan"), ("fr", "France")]
+MOVIES_PER_PAGE = 20
+
+
+def stub_movie(movie_id):
+    """Build the popular-list entry for a synthetic movie."""
+    return {
+        "id": movie_id,
+        "title": f"Stub Movie {movie_id}",
+        "overview": f"A synthetic overview for stub movie number {movie_id}.",
+        "release_date": f"{1980 + movie_id % 45}-01-01",
+        "popularity": float(movie_id % 100),
+        "poster_path": f"/stub{movie_id}.jpg",
+        "vote_average": round(5 + (movie_id % 50) / 10, 1),
+        "vote_count": movie_id * 7 % 3000,
+        "genre_ids": [STUB_GENRES[movie_id % len(STUB_GENRES)]["id"]],
+        "adult": False,
+    }
+
+
+class StubState:
+    """Configuration and request counters shared by the handler threads."""
+
+    def __init__(self, pages, fail_rate):
+        self.pages = pages
+        self.fail_rate = fail_rate
+        self.request_count = 0
+        self.failures = []  # Status codes answered, in order, by the next requests (e.g. [429, 503])
+        self.retry_after = None  # Retry-After header value sent with a scripted 429
+        self.failing_pages = set()  # Popular-list pages answered with HTTP 503
+        self.popular_pages = []  # Popular-list pages requested, in arrival order
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    """Create a request handler class bound to the given stub state."""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            with state.lock:
+                state.request_count += 1
+                scripted = state.failures.pop(0) if state.failures else None
+            if scripted:
+                headers = {"Retry-After": state.retry_after} if scripted == 429 and state.retry_after else None
+                self._send(scripted, {"status_message": "Scripted failure"}, headers)
+                return
+            if state.fail_rate and random.random() < state.fail_rate:
+                self._send(503, {"status_message": "Injected failure"})
+                return
+
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            path = url.path.removeprefix("/3")
+            if path == "/genre/movie/list":
+                self._send(200, {"genres": STUB_GENRES})
+            elif path == "/movie/popular":
+                page = int(params.get("page", ["1"])[0])
+                with state.lock:
+                    state.popular_pages.append(page)
+                if page in state.failing_pages:
+                    self._send(503, {"status_message": "Injected failure"})
+                    return
+                first_id = (page - 1) * MOVIES_PER_PAGE + 1
+                results = [stub_movie(i) for i in range(first_id, first_id + MOVIES_PER_PAGE)] if page <= state.pages else []
+                self._send(200, {"page": page, "results": results, "total_pages": state.pages})
+            elif path.startswith("/movie/"):
+                movie_id = int(path.rsplit("/", 1)[1])
+                language, country = STUB_LANGUAGES[movie_id % len(STUB_LANGUAGES)]
+                details = dict(stub_movie(movie_id), original_language=language,
+                               production_countries=[{"iso_3166_1": "XX", "name": country}])
+                self._send(200, details)
+            else:
+                self._send(404, {"status_message": "Not found"})
+
+        def log_message(self, format, *args):
+            pass  # Keep test and benchmark output quiet
+
+    return StubHandler
+
+
+def start_stub_server(port=0, pages=10, fail_rate=0.0):
+    """
+    Start the stub server on a background thread.
+    Args:
+        port (int): Port to listen on (0 picks a free port).
+        pages (int): Number of popular-list pages that contain movies.
+        fail_rate (float): Probability of answering a request with HTTP 503.
+    Returns:
+        tuple: (server, state, base_url) - call server.shutdown() to stop it.
+    """
+    state = StubState(pages, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/3"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic TMDb API for offline ingestion runs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, _, base_url = start_stub_server(args.port, args.pages, args.fail_rate)
+    print(f"TMDb stub listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,509 @@
+# In-process vector indexes used as an alternative to MongoDB Atlas $vectorSearch
+# The catalog embeddings are loaded once into a contiguous float32 matrix, so a query
+# costs a matrix-vector product on the local CPU instead of a network round trip.
+import logging  # For reporting index build details
+import os  # For removing the temporary rescoring file
+import tempfile  # For the default location of the float32 rescoring file
+import weakref  # For removing the temporary rescoring file with its index
+
+import numpy as np  # For the embedding matrix and vectorized similarity scoring
+
+from movie_fields import structured_fields, TMDB_GENRE_IDS  # Pre-filter fields derived from stored movies
+from quantization import PRECISIONS, embedding_to_array, quantize  # Compact in-memory vector formats
+
+# Fields returned for every search hit (mirrors the $project stage used with Atlas)
+PROJECTED_FIELDS = ["tmdb_id", "title", "overview", "poster_path", "vote_average", "vote_count", "release_date"]
+
+
+def normalize_rows(vectors):
+    """
+    L2-normalize every row of a matrix so that a dot product equals cosine similarity.
+    Args:
+        vectors (array-like): 2-D array of shape (n, dim).
+    Returns:
+        np.ndarray: Contiguous float32 array with unit-length rows (zero rows stay zero).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # Avoid dividing by zero for empty embeddings
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+
+def _top_k(scores, k):
+    """Return the indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]  # Unordered top-k in O(n)
+    return top[np.argsort(-scores[top], kind="stable")]  # Order only the k winners
+
+
+def _drop_excluded(rows, scores):
+    """Remove the rows a pre-filter masked out (scored -inf) from a top-k result."""
+    keep = np.isfinite(scores)
+    return rows[keep], scores[keep]
+
+
+class BruteForceIndex:
+    """
+    Exact nearest-neighbour search: one contiguous float32 matrix and one dot product per query.
+    Already normalized vectors (e.g. a memory-mapped snapshot) are used as they are, without a copy.
+    """
+
+    def __init__(self, vectors, normalized=False):
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def memory_bytes(self):
+        """Resident size of the vectors."""
+        return self.vectors.nbytes
+
+    def search(self, query_vector, k, allowed=None):
+        """
+        Find the k rows most similar to the query vector.
+        Args:
+            query_vector (array-like): Query embedding of shape (dim,).
+            k (int): Number of neighbours to return.
+            allowed (np.ndarray): Optional boolean row mask; other rows are never returned.
+        Returns:
+            tuple: (row indices, cosine similarities), both ordered best first.
+        """
+        query = normalize_rows(np.asarray(query_vector).reshape(1, -1))[0]
+        scores = self.vectors @ query
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+        rows = _top_k(scores, k)
+        return _drop_excluded(rows, scores[rows])
+
+    def search_many(self, query_vectors, k, allowed=None, block_size=256):
+        """
+        Batch version of search: queries are scored against the matrix with one matrix
+        multiply per block of queries.
+        Args:
+            query_vectors (array-like): Query embeddings of shape (n_queries, dim).
+            k (int): Number of neighbours per query.
+            allowed (list): Optional boolean row mask (or None) per query.
+            block_size (int): Queries per matrix multiply, bounding the score matrix size.
+        Returns:
+            list: One (row indices, cosine similarities) tuple per query.
+        """
+        queries = normalize_rows(query_vectors)
+        results = []
+        for start in range(0, len(queries), block_size):
+            scores = queries[start:start + block_size] @ self.vectors.T  # (block, n_vectors)
+            for offset, row_scores in enumerate(scores):
+                mask = allowed[start + offset] if allowed is not None else None
+                if mask is not None:
+                    row_scores[~mask] = -np.inf
+                rows = _top_k(row_scores, k)
+                results.append(_drop_excluded(rows, row_scores[rows]))
+        return results
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour search with an inverted-file index.
+    Vectors are clustered with spherical k-means; a query only scores the vectors
+    stored in the `n_probes` lists whose centroids are closest to it.
+    """
+
+    def __init__(self, vectors, n_lists=0, n_probes=8, n_iterations=10, seed=0):
+        vectors = normalize_rows(vectors)
+        n_vectors = vectors.shape[0]
+        if n_lists <= 0:
+            n_lists = max(1, int(np.sqrt(n_vectors)))  # Common default: sqrt(N) lists
+        n_lists = min(n_lists, max(1, n_vectors))
+        self.n_probes = n_probes
+        self.centroids = self._train_centroids(vectors, n_lists, n_iterations, seed)
+
+        # Store the lists as one contiguous matrix sorted by list id plus offsets into it
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1) if n_vectors else np.empty(0, dtype=np.int64)
+        order = np.argsort(assignments, kind="stable")
+        self.row_ids = order  # Position in the sorted matrix -> original row index
+        self.vectors = np.ascontiguousarray(vectors[order])
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def memory_bytes(self):
+        """Resident size of the vectors and centroids."""
+        return self.vectors.nbytes + self.centroids.nbytes + self.row_ids.nbytes
+
+    @staticmethod
+    def _train_centroids(vectors, n_lists, n_iterations, seed):
+        """Run spherical k-means and return unit-length centroids of shape (n_lists, dim)."""
+        if vectors.shape[0] == 0:
+            return np.zeros((n_lists, vectors.shape[1]), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(vectors.shape[0], n_lists, replace=False)].copy()
+        for _ in range(n_iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]  # Keep the previous centroid for empty clusters
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def search(self, query_vector, k, allowed=None):
+        """
+        Find approximately the k rows most similar to the query vector.
+        With a pre-filter, the number of probed lists doubles until the probed lists
+        hold at least k allowed rows (or every list has been probed).
+        Args:
+            query_vector (array-like): Query embedding of shape (dim,).
+            k (int): Number of neighbours to return.
+            allowed (np.ndarray): Optional boolean row mask; other rows are never returned.
+        Returns:
+            tuple: (row indices, cosine similarities), both ordered best first.
+        """
+        query = normalize_rows(np.asarray(query_vector).reshape(1, -1))[0]
+        centroid_scores = self.centroids @ query
+        n_probes = self.n_probes
+        while True:
+            probes = _top_k(centroid_scores, n_probes)
+            positions = np.concatenate(
+                [np.arange(self.offsets[p], self.offsets[p + 1]) for p in probes]
+            ) if len(probes) else np.empty(0, dtype=np.int64)
+            if allowed is not None:
+                positions = positions[allowed[self.row_ids[positions]]]
+            if allowed is None or len(positions) >= k or n_probes >= len(self.centroids):
+                break
+            n_probes *= 2  # Too few rows pass the filter in the closest lists: look further
+        scores = self.vectors[positions] @ query
+        best = _top_k(scores, k)
+        return self.row_ids[positions[best]], scores[best]
+
+
+class QuantizedIndex:
+    """
+    Exact-mode search over compact (float16 or int8) vectors with float32 rescoring.
+    The quantized matrix stays resident and is scored in blocks; the top
+    `k * rescore_factor` candidates are then rescored exactly against float32 vectors,
+    which can be a np.memmap so that only candidate rows are ever paged in.
+    With normalized=False the rows are normalized into a new in-memory array (the caller's
+    array is never modified); pass unit-length rows with normalized=True to keep a memmap on disk.
+    """
+
+    def __init__(self, vectors, precision="int8", rescore_factor=4, block_size=16384, normalized=False):
+        self.precision = precision
+        self.rescore_factor = max(1, rescore_factor)
+        self.block_size = block_size
+        n_vectors, dim = vectors.shape
+        self.codes = np.empty((n_vectors, dim), dtype=np.float16 if precision == "float16" else np.int8)
+        self.scales = np.ones(n_vectors, dtype=np.float32) if precision == "int8" else None
+        if not normalized:
+            vectors = normalize_rows(vectors)  # Copy: the caller's array (or read-only memmap) is left untouched
+        # Quantize block by block, so a memmap is never loaded whole
+        for start in range(0, n_vectors, block_size):
+            block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+            codes, scales = quantize(block, precision)
+            self.codes[start:start + block_size] = codes
+            if scales is not None:
+                self.scales[start:start + block_size] = scales
+        self.full_vectors = vectors  # float32 rows, read only for rescoring
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    def memory_bytes(self):
+        """Resident size of the quantized vectors (the rescoring vectors can stay on disk)."""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def approximate_scores(self, query):
+        """Score every row against a unit-length query using only the quantized vectors."""
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            # Upcast one block at a time so the temporary float32 copy stays small
+            scores[start:start + self.block_size] = self.codes[start:start + self.block_size].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, query_vector, k, allowed=None):
+        """
+        Find the k rows most similar to the query vector.
+        Args:
+            query_vector (array-like): Query embedding of shape (dim,).
+            k (int): Number of neighbours to return.
+            allowed (np.ndarray): Optional boolean row mask; other rows are never returned.
+        Returns:
+            tuple: (row indices, exact cosine similarities), both ordered best first.
+        """
+        query = normalize_rows(np.asarray(query_vector).reshape(1, -1))[0]
+        scores = self.approximate_scores(query)
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+        candidates = _top_k(scores, k * self.rescore_factor)
+        candidates = np.sort(candidates[np.isfinite(scores[candidates])])  # Sorted for sequential reads
+        exact = np.asarray(self.full_vectors[candidates], dtype=np.float32) @ query
+        best = _top_k(exact, k)
+        return candidates[best], exact[best]
+
+
+def matches_filters(doc, filters):
+    """
+    Check a document against a simple MongoDB-style filter document.
+    Supports plain equality and the $eq / $gte / $lte / $gt / $lt / $in operators
+    ($in also matches array fields that contain any of the values).
+    Args:
+        doc (dict): Movie document.
+        filters (dict): MongoDB-style filter document.
+    Returns:
+        bool: True if the document passes every filter.
+    """
+    for field, condition in filters.items():
+        value = doc.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, bound in condition.items():
+            if value is None:
+                return False
+            if operator == "$eq" and not value == bound:
+                return False
+            if operator == "$gte" and not value >= bound:
+                return False
+            if operator == "$lte" and not value <= bound:
+                return False
+            if operator == "$gt" and not value > bound:
+                return False
+            if operator == "$lt" and not value < bound:
+                return False
+            if operator == "$in":
+                values = value if isinstance(value, list) else [value]
+                if not any(v in bound for v in values):
+                    return False
+    return True
+
+
+# Vectorized comparisons for numeric filter columns
+_COMPARISONS = {
+    "$eq": np.equal,
+    "$gte": np.greater_equal,
+    "$lte": np.less_equal,
+    "$gt": np.greater,
+    "$lt": np.less,
+}
+
+
+class FilterColumns:
+    """
+    Structured columns of the indexed movies, used to turn a filter document into a row mask
+    before scoring. Missing values are NaN / 0 / "" and never pass a filter.
+    """
+
+    NUMERIC_FIELDS = ("release_year", "vote_average", "vote_count")
+
+    def __init__(self, documents):
+        fields = [structured_fields(doc) for doc in documents]
+        self.numeric = {
+            "release_year": np.array(
+                [f["release_year"] if f["release_year"] is not None else np.nan for f in fields], dtype=np.float64
+            ),
+            "vote_average": np.array([doc.get("vote_average", np.nan) for doc in documents], dtype=np.float64),
+            "vote_count": np.array([doc.get("vote_count", np.nan) for doc in documents], dtype=np.float64),
+        }
+        self.genre_mask = np.array([f["genre_mask"] for f in fields], dtype=np.int64)
+        self.origin_code = np.array([f["origin_code"] or "" for f in fields], dtype="U8")
+
+    @classmethod
+    def from_arrays(cls, release_year, vote_average, vote_count, genre_mask, origin_code):
+        """
+        Wrap precomputed columns (e.g. memory-mapped from a snapshot) without reading any document.
+        Args:
+            release_year, vote_average, vote_count (np.ndarray): float64 columns, NaN when missing.
+            genre_mask (np.ndarray): int64 genre bitmasks.
+            origin_code (np.ndarray): "U8" original-language codes ("" when missing).
+        Returns:
+            FilterColumns: Columns sharing the given arrays.
+        """
+        columns = cls.__new__(cls)
+        columns.numeric = {"release_year": release_year, "vote_average": vote_average, "vote_count": vote_count}
+        columns.genre_mask = genre_mask
+        columns.origin_code = origin_code
+        return columns
+
+    def mask(self, filters, documents):
+        """
+        Evaluate a filter document against every row.
+        Args:
+            filters (dict): Field -> condition (see app.build_search_filters).
+            documents (list): Indexed documents, for fields without a column.
+        Returns:
+            np.ndarray: Boolean mask of the rows that pass every filter.
+        """
+        allowed = np.ones(len(self.genre_mask), dtype=bool)
+        for field, condition in filters.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            if field in self.numeric and set(condition) <= set(_COMPARISONS):
+                column = self.numeric[field]
+                with np.errstate(invalid="ignore"):  # NaN compares False, which is what we want
+                    for operator, bound in condition.items():
+                        allowed &= _COMPARISONS[operator](column, bound)
+            elif field == "genre_ids" and set(condition) == {"$in"} and set(condition["$in"]) <= set(TMDB_GENRE_IDS):
+                wanted = 0
+                for bit, genre_id in enumerate(TMDB_GENRE_IDS):
+                    if genre_id in condition["$in"]:
+                        wanted |= 1 << bit
+                allowed &= (self.genre_mask & wanted) != 0
+            elif field == "origin_code" and set(condition) <= {"$in", "$eq"}:
+                codes = condition.get("$in", []) + ([condition["$eq"]] if "$eq" in condition else [])
+                allowed &= np.isin(self.origin_code, codes)
+            else:
+                # Slow path for anything without a column: check the documents one by one
+                allowed &= np.fromiter(
+                    (matches_filters(doc, {field: condition}) for doc in documents), dtype=bool, count=len(documents)
+                )
+        return allowed
+
+
+class LocalMovieIndex:
+    """
+    Movie search over an in-process vector index.
+    Returns the same document shape as the Atlas $vectorSearch pipeline, including `score`.
+    `documents` only needs indexing and len(), and `columns` / `normalized` let a catalog
+    snapshot pass its memory-mapped filter columns and unit-length vectors without copies.
+    """
+
+    def __init__(self, documents, vectors, mode="exact", n_lists=0, n_probes=8, precision="float32",
+                 rescore_factor=4, columns=None, normalized=False):
+        self.documents = documents
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown local index precision {precision!r}; expected one of {', '.join(PRECISIONS)}")
+        if precision != "float32":
+            if mode != "exact":
+                raise ValueError("Quantized vectors are only supported with the exact backend")
+            self.index = QuantizedIndex(vectors, precision=precision, rescore_factor=rescore_factor,
+                                        normalized=normalized)
+        elif mode == "exact":
+            self.index = BruteForceIndex(vectors, normalized=normalized)
+        elif mode == "ivf":
+            self.index = IVFIndex(vectors, n_lists=n_lists, n_probes=n_probes)
+        else:
+            raise ValueError(f"Unknown local vector index mode: {mode}")
+        self.columns = columns if columns is not None else FilterColumns(documents)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query_vector, limit=20, filters=None):
+        """
+        Retrieve the most similar movies that pass the filters.
+        Filters are applied before scoring (like the Atlas $vectorSearch "filter"), so up to
+        `limit` results come back whenever that many movies pass them.
+        Args:
+            query_vector (array-like): Query embedding.
+            limit (int): Maximum number of results.
+            filters (dict): Optional filters from build_search_filters.
+        Returns:
+            list: Movie documents with PROJECTED_FIELDS, `_id` and `score`.
+        """
+        allowed = self.columns.mask(filters, self.documents) if filters else None
+        if allowed is not None and not allowed.any():
+            return []
+        rows, similarities = self.index.search(query_vector, limit, allowed)
+        return self._hits(rows, similarities)
+
+    def search_many(self, query_vectors, limit=20, filters=None):
+        """
+        Batch version of search. The exact float32 index scores all queries with one matrix
+        multiply per block; the other indexes answer the queries one by one.
+        Args:
+            query_vectors (array-like): Query embeddings of shape (n_queries, dim).
+            limit (int): Maximum number of results per query.
+            filters (list): Optional filter document (or None) per query.
+        Returns:
+            list: One result list per query, as returned by search.
+        """
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        filters = filters or [None] * len(query_vectors)
+        if not hasattr(self.index, "search_many"):
+            return [self.search(vector, limit, query_filters) for vector, query_filters in zip(query_vectors, filters)]
+        allowed = [self.columns.mask(f, self.documents) if f else None for f in filters]
+        found = self.index.search_many(query_vectors, limit, allowed)
+        return [self._hits(rows, similarities) for rows, similarities in found]
+
+    def _hits(self, rows, similarities):
+        """Turn (rows, cosine similarities) into result documents."""
+        results = []
+        for row, similarity in zip(rows, similarities):
+            doc = self.documents[row]
+            hit = {"_id": doc["_id"]}
+            hit.update({field: doc[field] for field in PROJECTED_FIELDS if field in doc})
+            # Atlas reports cosine similarity rescaled to [0, 1]; use the same scale
+            hit["score"] = float((1.0 + similarity) / 2.0)
+            results.append(hit)
+        return results
+
+
+def build_index_from_collection(collection, mode="exact", n_lists=0, n_probes=8, precision="float32",
+                                rescore_factor=4, rescore_path=None):
+    """
+    Load every movie embedding from MongoDB and build a local index over them.
+    Args:
+        collection: MongoDB collection holding movies with a `movie_embedding` field.
+        mode (str): "exact" for brute force or "ivf" for approximate search.
+        n_lists (int): Number of IVF lists (0 = automatic).
+        n_probes (int): Number of IVF lists scanned per query.
+        precision (str): Resident vector format: "float32", "float16" or "int8".
+        rescore_factor (int): Candidates rescored in float32 per requested result (quantized only).
+        rescore_path (str): File backing the float32 rescoring vectors (quantized only;
+            by default a temporary file, removed once the index is garbage collected or at exit).
+    Returns:
+        LocalMovieIndex: Index ready to answer queries.
+    """
+    query = {"movie_embedding": {"$exists": True}}
+    projection = {field: 1 for field in PROJECTED_FIELDS}
+    projection.update({"genre_ids": 1, "origin.original_language": 1})  # Sources of the filter columns
+    projection["movie_embedding"] = 1
+    expected = collection.count_documents(query)
+    if expected == 0:
+        raise ValueError("No movie embeddings found to build a local vector index")
+
+    # Fill one preallocated float32 matrix row by row instead of building Python lists of floats;
+    # for quantized indexes it lives in a memory-mapped file so it does not stay resident, and
+    # its rows are normalized as they are written so the index never copies it into memory
+    quantized = precision != "float32"
+    documents, vectors = [], None
+    for doc in collection.find(query, projection):
+        vector = embedding_to_array(doc.pop("movie_embedding"))
+        if vectors is None:
+            shape = (expected, vector.shape[0])
+            if not quantized:
+                vectors = np.empty(shape, dtype=np.float32)
+            elif rescore_path:
+                vectors = np.lib.format.open_memmap(rescore_path, mode="w+", dtype=np.float32, shape=shape)
+            else:
+                with tempfile.NamedTemporaryFile(suffix=".npy", delete=False) as f:
+                    path = f.name
+                vectors = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+                # Slices keep the memmap alive, so the file goes away with the last index using it
+                weakref.finalize(vectors, _remove_file, path)
+        if len(documents) == expected:
+            logging.warning("Movies were added while building the vector index; the newest are skipped.")
+            break
+        if quantized:
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+        vectors[len(documents)] = vector
+        doc["_id"] = str(doc["_id"])  # Match clean_document so results are JSON-serializable
+        documents.append(doc)
+    if vectors is None:
+        raise ValueError("No movie embeddings found to build a local vector index (all removed while building)")
+    return LocalMovieIndex(documents, vectors[:len(documents)], mode, n_lists, n_probes, precision, rescore_factor,
+                           normalized=quantized)
+
+
+def _remove_file(path):
+    """Delete a temporary file, ignoring one that is already gone."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -29,13 +29,35 @@ export default function MoviesPage() {
   const handleSearch = async () => {
     setLoading(true);
     try {
-      const response = await fetch("http://localhost:5001/api/query", {
+      const response = await fetch("http://localhost:5001/api/query/stream", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ query }),
       });
-      const data = await response.json();
-      setResult(data);
+
+      // Read newline-delimited JSON events: movies first, then recommendation tokens
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      const handleEvent = (event) => {
+        if (event.type === "movies") {
+          setResult({ similar_movies: event.similar_movies, recommendation: "" });
+          setLoading(false);
+        } else if (event.type === "token") {
+          setResult((prev) => ({ ...prev, recommendation: prev.recommendation + event.content }));
+        } else if (event.type === "error") {
+          console.error("Error streaming recommendation:", event.message);
+        }
+      };
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+      }
+
       if (!history.includes(query)) {
         setHistory((prev) => [...prev, query]);
       }